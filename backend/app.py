@@ -18,112 +18,208 @@ Response JSON (examples):
 
 CORS:
     For local development, CORS is opened with Access-Control-Allow-Origin: *
+    (see cors.py for CORS_ALLOW_ORIGIN / CORS_MAX_AGE). Preflight requests
+    are answered by middleware before routing and cached by browsers.
+
+Rate limits:
+    Requests over the per-IP or per-code-index limits get 429 with
+    Retry-After; requests beyond the database concurrency ceiling get 503
+    (see rate_limit.py).
+
+Metrics:
+    GET /metrics serves request, database and cache metrics in Prometheus
+    text format (see metrics.py).
+
+Startup:
+    ``create_app()`` builds the app and its services from the environment
+    (see config.AppConfig) and warms them up before traffic arrives: pooled
+    database connections, practice/course content, the token cache and the
+    request code paths (see warmup.py). GET /healthz reports liveness and
+    GET /readyz returns 503 until warm-up has succeeded. ``app.app`` is
+    created on first access, so ``gunicorn app:app`` keeps working.
+
+Admin:
+    /api/admin/* endpoints require ``Authorization: Bearer <ADMIN_TOKEN>``
+    and are disabled while ADMIN_TOKEN is unset.
 """
 
 from __future__ import annotations
 
+import time
+
+# Start of the "imports" phase in the startup log (see create_app)
+_IMPORT_STARTED = time.perf_counter()
+
+import atexit
+import logging
 import os
 import secrets
-from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, g, request
 
 # Load environment variables from .env file
-import config  # noqa: F401
-
-from code_verifier import is_code_valid, verify_code_format
-from db import Database, UserRepository, UserCourseProgressRepository
+from config import AppConfig
+
+import jsonutil
+import metrics
+from attempt_log import AttemptLogBuffer, AttemptRepository, events_from_grade
+from code_verifier import generate_code, is_code_valid, verify_code_format
+from cors import CorsPolicy, CorsPreflightMiddleware
+from course_catalog import DEFAULT_LIMIT, MAX_LIMIT, CourseCatalog
+import export
+from course_stats import CourseStatsReconciler, CourseStatsRepository
+from generate_codes import parse_prefixes
+from db import (
+    PROGRESS_COLUMNS,
+    UserRepository,
+    UserCourseProgressRepository,
+    database_from_env,
+    start_request_routing,
+)
+from grading import grade
+from payloads import EncodedPayload, select_variant
+from practice_store import PracticeStore
+from progress_buffer import ProgressUpdate, ProgressWriteBuffer
+import provisioning
+from rate_limit import LoginGuard, retry_after_header
+from token_cache import TokenCache
+from validation import parse_optional_int
+from warmup import Step, Warmup
+
+
+def json_response(payload: Any) -> Response:
+    """JSON response for every endpoint, encoded in one pass (see jsonutil.py)."""
+    return Response(jsonutil.dumps(payload), content_type=jsonutil.CONTENT_TYPE)
 
 
 def _generate_token() -> str:
     """Generate a secure random token for authentication."""
     return secrets.token_urlsafe(32)
 
-app = Flask(__name__)
+api = Blueprint("api", __name__)
 
-# Initialize database and repositories
-_db = Database.from_env()
-_user_repo = UserRepository(_db)
-_progress_repo = UserCourseProgressRepository(_db)
 
+def _services() -> "Services":
+    return current_app.extensions["exammaster"]
+
+
+# --- Request metrics ---
+# Set in the WSGI environ of requests sent by warm-up, which /metrics ignores
+WARMUP_ENVIRON_KEY = "exammaster.warmup"
+
+
+@api.before_app_request
+def start_request_metrics():
+    metrics.start_request()
+    if not request.environ.get(WARMUP_ENVIRON_KEY):
+        g.metrics_started = time.perf_counter()
+    # Reads go to replicas again until this request writes (see db.ReplicatedDatabase)
+    start_request_routing()
+
+
+@api.after_app_request
+def record_request_metrics(response):  # type: ignore[override]
+    started = g.get("metrics_started")
+    if started is not None:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.finish_request(route, request.method, response.status_code, time.perf_counter() - started)
+    else:
+        metrics.discard_request()
+    return response
+
+
+@api.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
-# --- CORS handling ---
-def _get_allowed_origins() -> list[str]:
-    """Parse allowed origins from CORS_ALLOW_ORIGIN env variable.
-    
-    Format: comma-separated list of origins
-    Example: http://localhost:5174,https://example.com,https://app.example.com
-    Special value '*' allows all origins (not recommended for production)
-    """
-    cors_env = os.getenv("CORS_ALLOW_ORIGIN", "*")
-    if cors_env == "*":
-        return ["*"]
-    return [origin.strip() for origin in cors_env.split(",") if origin.strip()]
 
+# --- Probes ---
+@api.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return json_response({"status": "ok", "warmup": _services().warmup.state}), 200
 
-@app.after_request
+
+@api.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: 200 once warm-up has succeeded, 503 before (or while it keeps failing)."""
+    warmup = _services().warmup
+    return json_response(warmup.status()), 200 if warmup.ready else 503
+
+
+# --- CORS handling ---
+# Preflights are answered by CorsPreflightMiddleware before routing (see create_app)
+@api.after_app_request
 def add_cors_headers(response):  # type: ignore[override]
-    allowed_origins = _get_allowed_origins()
-    origin = request.headers.get("Origin")
-    
-    # Check if origin is allowed
-    if "*" in allowed_origins:
-        # Allow all origins
-        response.headers["Access-Control-Allow-Origin"] = "*"
-    elif origin and origin in allowed_origins:
-        # Allow specific origin
-        response.headers["Access-Control-Allow-Origin"] = origin
-    elif allowed_origins and origin:
-        # Check for wildcard domain matching (e.g., *.example.com)
-        for allowed in allowed_origins:
-            if allowed.startswith("*."):
-                domain_part = allowed[2:]  # Remove '*.' prefix
-                if origin.endswith(domain_part):
-                    response.headers["Access-Control-Allow-Origin"] = origin
-                    break
-    
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-    response.headers["Access-Control-Allow-Credentials"] = "true"
+    for name, value in _services().cors.headers(request.headers.get("Origin")):
+        response.headers[name] = value
     return response
 
 
-@app.route("/api/verify-code", methods=["POST", "OPTIONS"])
+def _too_many_attempts(retry_after: float):
+    return json_response({"valid": False, "message": "Too many attempts, please retry later"}), 429, {
+        "Retry-After": retry_after_header(retry_after)
+    }
+
+
+def _server_busy():
+    return json_response({"valid": False, "message": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+
+
+@api.route("/api/verify-code", methods=["POST", "OPTIONS"])
 def verify_code_endpoint():
     # Handle CORS preflight
     if request.method == "OPTIONS":
         return ("", 204)
 
+    guard = _services().login_guard
+    client = None
+    if guard is not None:
+        client = guard.client(request.remote_addr, request.headers.get("X-Forwarded-For"))
+        retry_after = guard.check_client(client)
+        if retry_after:
+            return _too_many_attempts(retry_after)
+
     try:
         payload: Dict[str, Any] = request.get_json(force=True) or {}
     except Exception:
         return (
-            jsonify({"valid": False, "message": "Invalid JSON body"}),
+            json_response({"valid": False, "message": "Invalid JSON body"}),
             400,
         )
 
     # Check if token exists in request and verify it first
     token = _extract_token_from_request()
     if token:
+        if guard is not None and not guard.try_enter():
+            return _server_busy()
         try:
-            user_obj = _user_repo.get_by_token(token)
+            user_obj = _services().user_repo.get_by_token(token)
         except Exception as exc:  # pragma: no cover - defensive logging
-            app.logger.exception("Failed to load user by token", exc_info=exc)
-            return jsonify({
+            current_app.logger.exception("Failed to load user by token", exc_info=exc)
+            return json_response({
                 "valid": False,
                 "message": "Failed to verify token",
             }), 500
+        finally:
+            if guard is not None:
+                guard.leave()
 
         if user_obj is None:
-            return jsonify({"valid": False, "message": "Invalid or expired token"}), 401
+            return json_response({"valid": False, "message": "Invalid or expired token"}), 401
 
         # Token is valid, return the existing user
-        return jsonify({"valid": True, "user": user_obj.to_dict()}), 200
+        return json_response({"valid": True, "user": user_obj.to_dict()}), 200
 
     code = payload.get("code")
     if not isinstance(code, str) or not code.strip():
         return (
-            jsonify({"valid": False, "message": "Missing or invalid 'code'"}),
+            json_response({"valid": False, "message": "Missing or invalid 'code'"}),
             400,
         )
 
@@ -133,32 +229,40 @@ def verify_code_endpoint():
     # Basic format check (same as frontend verifyCodeFormat).
     # Any prefix letter A–Z is allowed; X00010-8AB is just an example.
     if not verify_code_format(code):
-        return jsonify({"valid": False, "message": "Code format must be like X00010-8AB (prefix letter + 5 digits + '-' + 3 hex chars)"}), 200
+        return json_response({"valid": False, "message": "Code format must be like X00010-8AB (prefix letter + 5 digits + '-' + 3 hex chars)"}), 200
+
+    # Refuse guesses for an index that has seen too many wrong hashes
+    # before revealing whether this one is right
+    if guard is not None:
+        retry_after = guard.check_code(code, client)
+        if retry_after:
+            return _too_many_attempts(retry_after)
 
     # Hash-based validation using shared salt/algorithm
     if not is_code_valid(code):
-        return jsonify({"valid": False, "message": "Invalid verification code"}), 200
-
-    # At this point the code is structurally valid: get or create the user via repository.
+        if guard is not None:
+            guard.record_failure(code, client)
+        return json_response({"valid": False, "message": "Invalid verification code"}), 200
+
+    # At this point the code is structurally valid: get or create the user and
+    # rotate its token in a single transaction.
+    if guard is not None and not guard.try_enter():
+        return _server_busy()
     try:
-        user_obj = _user_repo.get_or_create_by_code(code)
-        
-        # Generate a new token for this user
-        token = _generate_token()
-        _user_repo.update_token(user_obj.id, token)
-        
-        # Update the user object with the new token
-        user_obj.token = token
+        user_obj = _services().user_repo.login_with_code(code, _generate_token())
     except Exception as exc:  # pragma: no cover - defensive logging
         # Log the underlying error so you can see it in the server console/logs.
-        app.logger.exception("Failed to load or create user", exc_info=exc)
-        return jsonify({
+        current_app.logger.exception("Failed to load or create user", exc_info=exc)
+        return json_response({
             "valid": False,
             "message": "Failed to load or create user",
             "error": str(exc),  # helpful during development
         }), 500
+    finally:
+        if guard is not None:
+            guard.leave()
 
-    return jsonify({"valid": True, "user": user_obj.to_dict()}), 200
+    return json_response({"valid": True, "user": user_obj.to_dict()}), 200
 
 
 def _extract_token_from_request() -> Optional[str]:
@@ -169,7 +273,61 @@ def _extract_token_from_request() -> Optional[str]:
     return None
 
 
-@app.route("/api/course-progress", methods=["GET"])
+def _resolve_user_id_from_body(payload: Dict[str, Any]) -> Tuple[Optional[int], Optional[Any]]:
+    """Resolve the user for a write request.
+
+    Authentication: Bearer token in Authorization header (preferred)
+    Fallback: user_id or code in the JSON body
+
+    Returns ``(user_id, None)`` on success or ``(None, error_response)``.
+    """
+
+    token = _extract_token_from_request()
+
+    if token:
+        # Primary auth: token-based
+        try:
+            user_obj = _services().user_repo.get_by_token(token)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            current_app.logger.exception("Failed to load user by token", exc_info=exc)
+            return None, (json_response({
+                "success": False,
+                "message": "Failed to load user by token",
+            }), 500)
+
+        if user_obj is None:
+            return None, (json_response({"success": False, "message": "Invalid or expired token"}), 401)
+
+        return user_obj.id, None
+
+    # Fallback: user_id or code (for backward compatibility)
+    user_id_raw = payload.get("user_id")
+    code = payload.get("code")
+
+    if user_id_raw is not None:
+        try:
+            return int(user_id_raw), None
+        except (TypeError, ValueError):
+            return None, (json_response({"success": False, "message": "'user_id' must be an integer"}), 400)
+    elif isinstance(code, str) and code.strip():
+        try:
+            user_obj = _services().user_repo.get_by_code(code.strip().upper())
+        except Exception as exc:  # pragma: no cover - defensive logging
+            current_app.logger.exception("Failed to load user by code", exc_info=exc)
+            return None, (json_response({
+                "success": False,
+                "message": "Failed to load user by code",
+            }), 500)
+
+        if user_obj is None:
+            return None, (json_response({"success": False, "message": "User not found for provided code"}), 404)
+
+        return user_obj.id, None
+
+    return None, (json_response({"success": False, "message": "Missing Authorization token or 'user_id'/'code'"}), 400)
+
+
+@api.route("/api/course-progress", methods=["GET"])
 def get_course_progress():
     """Get course progress for a user.
 
@@ -183,16 +341,16 @@ def get_course_progress():
     # Primary auth: token-based
     if token:
         try:
-            user_obj = _user_repo.get_by_token(token)
+            user_obj = _services().user_repo.get_by_token(token)
         except Exception as exc:  # pragma: no cover - defensive logging
-            app.logger.exception("Failed to load user by token", exc_info=exc)
-            return jsonify({
+            current_app.logger.exception("Failed to load user by token", exc_info=exc)
+            return json_response({
                 "success": False,
                 "message": "Failed to load user by token",
             }), 500
 
         if user_obj is None:
-            return jsonify({"success": False, "message": "Invalid or expired token"}), 401
+            return json_response({"success": False, "message": "Invalid or expired token"}), 401
 
         user_id = user_obj.id
     else:
@@ -204,24 +362,24 @@ def get_course_progress():
             try:
                 user_id = int(user_id_raw)
             except (TypeError, ValueError):
-                return jsonify({"success": False, "message": "Invalid 'user_id' query parameter"}), 400
+                return json_response({"success": False, "message": "Invalid 'user_id' query parameter"}), 400
         elif code:
             # Look up user by verification code
             try:
-                user_obj = _user_repo.get_by_code(code.strip().upper())
+                user_obj = _services().user_repo.get_by_code(code.strip().upper())
             except Exception as exc:  # pragma: no cover - defensive logging
-                app.logger.exception("Failed to load user by code", exc_info=exc)
-                return jsonify({
+                current_app.logger.exception("Failed to load user by code", exc_info=exc)
+                return json_response({
                     "success": False,
                     "message": "Failed to load user by code",
                 }), 500
 
             if user_obj is None:
-                return jsonify({"success": False, "message": "User not found for provided code"}), 404
+                return json_response({"success": False, "message": "User not found for provided code"}), 404
 
             user_id = user_obj.id
         else:
-            return jsonify({"success": False, "message": "Missing 'user_id', 'code', or Authorization token"}), 400
+            return json_response({"success": False, "message": "Missing 'user_id', 'code', or Authorization token"}), 400
 
     course_id_raw = request.args.get("course_id")
     course_id: Optional[int] = None
@@ -229,24 +387,24 @@ def get_course_progress():
         try:
             course_id = int(course_id_raw)
         except (TypeError, ValueError):
-            return jsonify({"success": False, "message": "Invalid 'course_id' query parameter"}), 400
+            return json_response({"success": False, "message": "Invalid 'course_id' query parameter"}), 400
 
     try:
-        progress_items = _progress_repo.get_for_user(user_id=user_id, course_id=course_id)
+        progress_items = _services().progress_repo.get_for_user(user_id=user_id, course_id=course_id)
     except Exception as exc:  # pragma: no cover - defensive logging
-        app.logger.exception("Failed to fetch course progress", exc_info=exc)
-        return jsonify({
+        current_app.logger.exception("Failed to fetch course progress", exc_info=exc)
+        return json_response({
             "success": False,
             "message": "Failed to fetch course progress",
         }), 500
 
-    return jsonify({
+    return json_response({
         "success": True,
         "items": [p.to_dict() for p in progress_items],
     }), 200
 
 
-@app.route("/api/course-progress", methods=["POST", "OPTIONS"])
+@api.route("/api/course-progress", methods=["POST", "OPTIONS"])
 def upsert_course_progress():
     """Create or update a user's course progress.
 
@@ -274,84 +432,29 @@ def upsert_course_progress():
     try:
         payload: Dict[str, Any] = request.get_json(force=True) or {}
     except Exception:
-        return jsonify({"success": False, "message": "Invalid JSON body"}), 400
+        return json_response({"success": False, "message": "Invalid JSON body"}), 400
 
     # Resolve user_id from token or fallback to user_id/code
-    user_id: Optional[int] = None
-    token = _extract_token_from_request()
-
-    if token:
-        # Primary auth: token-based
-        try:
-            user_obj = _user_repo.get_by_token(token)
-        except Exception as exc:  # pragma: no cover - defensive logging
-            app.logger.exception("Failed to load user by token", exc_info=exc)
-            return jsonify({
-                "success": False,
-                "message": "Failed to load user by token",
-            }), 500
-
-        if user_obj is None:
-            return jsonify({"success": False, "message": "Invalid or expired token"}), 401
-
-        user_id = user_obj.id
-    else:
-        # Fallback: user_id or code (for backward compatibility)
-        user_id_raw = payload.get("user_id")
-        code = payload.get("code")
-
-        if user_id_raw is not None:
-            try:
-                user_id = int(user_id_raw)
-            except (TypeError, ValueError):
-                return jsonify({"success": False, "message": "'user_id' must be an integer"}), 400
-        elif isinstance(code, str) and code.strip():
-            try:
-                user_obj = _user_repo.get_by_code(code.strip().upper())
-            except Exception as exc:  # pragma: no cover - defensive logging
-                app.logger.exception("Failed to load user by code", exc_info=exc)
-                return jsonify({
-                    "success": False,
-                    "message": "Failed to load user by code",
-                }), 500
-
-            if user_obj is None:
-                return jsonify({"success": False, "message": "User not found for provided code"}), 404
-
-            user_id = user_obj.id
-        else:
-            return jsonify({"success": False, "message": "Missing Authorization token or 'user_id'/'code'"}), 400
+    user_id, error = _resolve_user_id_from_body(payload)
+    if error is not None:
+        return error
 
     # course_id is required
     course_id_raw = payload.get("course_id")
     try:
         course_id = int(course_id_raw)
     except (TypeError, ValueError):
-        return jsonify({"success": False, "message": "'course_id' must be an integer"}), 400
-
-    def _parse_optional_int(name: str, minimum: int = 0, maximum: Optional[int] = None) -> Optional[int]:
-        value = payload.get(name)
-        if value is None:
-            return None
-        try:
-            int_value = int(value)
-        except (TypeError, ValueError):
-            raise ValueError(f"'{name}' must be an integer")
-        if int_value < minimum:
-            raise ValueError(f"'{name}' must be >= {minimum}")
-        if maximum is not None and int_value > maximum:
-            raise ValueError(f"'{name}' must be <= {maximum}")
-        return int_value
+        return json_response({"success": False, "message": "'course_id' must be an integer"}), 400
 
     try:
-        progress_percent = _parse_optional_int("progress_percent", minimum=0, maximum=100)
-        total_answered = _parse_optional_int("total_answered", minimum=0)
-        total_correct = _parse_optional_int("total_correct", minimum=0)
+        progress_percent = parse_optional_int(payload, "progress_percent", minimum=0, maximum=100)
+        total_answered = parse_optional_int(payload, "total_answered", minimum=0)
+        total_correct = parse_optional_int(payload, "total_correct", minimum=0)
     except ValueError as exc:
-        return jsonify({"success": False, "message": str(exc)}), 400
+        return json_response({"success": False, "message": str(exc)}), 400
 
     try:
-        progress_obj = _progress_repo.upsert_progress(
+        progress_obj = _services().progress_repo.upsert_progress(
             user_id=user_id,
             course_id=course_id,
             progress_percent=progress_percent,
@@ -359,16 +462,614 @@ def upsert_course_progress():
             total_correct=total_correct,
         )
     except Exception as exc:  # pragma: no cover - defensive logging
-        app.logger.exception("Failed to upsert course progress", exc_info=exc)
-        return jsonify({
+        current_app.logger.exception("Failed to upsert course progress", exc_info=exc)
+        return json_response({
             "success": False,
             "message": "Failed to save course progress",
         }), 500
 
-    return jsonify({"success": True, "progress": progress_obj.to_dict()}), 200
+    return json_response({"success": True, "progress": progress_obj.to_dict()}), 200
+
+
+@api.route("/api/course-progress/batch", methods=["POST", "OPTIONS"])
+def upsert_course_progress_batch():
+    """Create or update progress for many courses in one request.
+
+    Authentication is the same as ``POST /api/course-progress`` and happens
+    once per request.
+
+    Request JSON body:
+        {"items": [{"course_id": 1, "progress_percent": 40}, ...]}
+
+        Each item accepts the same fields and validation rules as the
+        single-course endpoint. Valid items are written with one multi-row
+        statement; invalid items are reported and skipped.
+
+    Response JSON:
+        {"success": true, "results": [
+            {"index": 0, "course_id": 1, "success": true, "progress": {...}},
+            {"index": 1, "success": false, "message": "'course_id' must be an integer"}
+        ]}
+    """
+
+    # Handle CORS preflight
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    try:
+        payload: Dict[str, Any] = request.get_json(force=True) or {}
+    except Exception:
+        return json_response({"success": False, "message": "Invalid JSON body"}), 400
+
+    if not isinstance(payload, dict) or not isinstance(payload.get("items"), list):
+        return json_response({"success": False, "message": "'items' must be a list"}), 400
+
+    raw_items = payload["items"]
+    max_items = _services().config.progress_batch_max_items
+    if len(raw_items) > max_items:
+        return json_response({"success": False, "message": f"'items' must not contain more than {max_items} entries"}), 400
+
+    user_id, error = _resolve_user_id_from_body(payload)
+    if error is not None:
+        return error
+
+    results: list[Dict[str, Any]] = []
+    updates: list[ProgressUpdate] = []
+    for index, item in enumerate(raw_items):
+        if not isinstance(item, dict):
+            results.append({"index": index, "success": False, "message": "Item must be an object"})
+            continue
+        try:
+            course_id = int(item.get("course_id"))  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            results.append({"index": index, "success": False, "message": "'course_id' must be an integer"})
+            continue
+        try:
+            update = ProgressUpdate(
+                user_id=user_id,  # type: ignore[arg-type]
+                course_id=course_id,
+                progress_percent=parse_optional_int(item, "progress_percent", minimum=0, maximum=100),
+                total_answered=parse_optional_int(item, "total_answered", minimum=0),
+                total_correct=parse_optional_int(item, "total_correct", minimum=0),
+            )
+        except ValueError as exc:
+            results.append({"index": index, "course_id": course_id, "success": False, "message": str(exc)})
+            continue
+        updates.append(update)
+        results.append({"index": index, "course_id": course_id, "success": True})
+
+    if updates:
+        try:
+            _services().progress_repo.upsert_many(updates)
+            stored = {
+                p.course_id: p.to_dict()
+                for p in _services().progress_repo.get_for_user(user_id=user_id)  # type: ignore[arg-type]
+            }
+        except Exception as exc:  # pragma: no cover - defensive logging
+            current_app.logger.exception("Failed to upsert course progress batch", exc_info=exc)
+            return json_response({
+                "success": False,
+                "message": "Failed to save course progress",
+            }), 500
+
+        for result in results:
+            if result["success"]:
+                result["progress"] = stored.get(result["course_id"])
+
+    return json_response({"success": True, "results": results}), 200
+
+
+def _payload_response(payload: EncodedPayload, cache_control: str) -> Response:
+    """Serve a pre-encoded payload (content negotiation + ETag/304)."""
+    status, body, headers = select_variant(
+        payload,
+        request.headers.get("Accept-Encoding"),
+        request.headers.get("If-None-Match"),
+        cache_control,
+    )
+    response = Response(body, status=status)
+    for name, value in headers:
+        response.headers[name] = value
+    return response
+
+
+@api.route("/api/practice/<chapter_id>", methods=["GET", "OPTIONS"])
+def get_practice(chapter_id: str):
+    """Serve a practice chapter (same JSON as /practice/<chapter_id>.json).
+
+    Responses carry a strong ETag and are revalidated with If-None-Match
+    (304 without a body); the body is pre-compressed per Accept-Encoding.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    chapter = _services().practice_store.get(chapter_id)
+    if chapter is None:
+        return json_response({"success": False, "message": f"Practice chapter '{chapter_id}' not found"}), 404
+
+    config = _services().config
+    payload = chapter.payload if config.practice_serve_answer_keys else chapter.public_payload
+    return _payload_response(payload, config.practice_cache_control)
+
+
+@api.route("/api/practice/<chapter_id>/submit", methods=["POST", "OPTIONS"])
+def submit_practice(chapter_id: str):
+    """Grade a practice submission and record it as course progress.
+
+    Authentication: same as POST /api/course-progress.
+
+    Request JSON body:
+        {"practice_id": "practice-001",            # optional if the chapter has one practice
+         "answers": {"q-001": "B", "q-002": "A"}}  # question id -> chosen option id
+
+    Every question of the practice counts as answered (unanswered ones are
+    wrong); the totals are written to the course with id ``chapter_id``, and
+    each answer is queued for the attempt log when it is enabled.
+    Response: per-question results plus totals and the stored progress row.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    try:
+        payload: Dict[str, Any] = request.get_json(force=True) or {}
+    except Exception:
+        return json_response({"success": False, "message": "Invalid JSON body"}), 400
+
+    user_id, error = _resolve_user_id_from_body(payload)
+    if error is not None:
+        return error
+
+    chapter = _services().practice_store.get(chapter_id)
+    if chapter is None:
+        return json_response({"success": False, "message": f"Practice chapter '{chapter_id}' not found"}), 404
+    try:
+        course_id = int(chapter_id)
+    except ValueError:
+        return json_response({"success": False, "message": f"Chapter '{chapter_id}' is not linked to a course"}), 400
+
+    answers = payload.get("answers")
+    if not isinstance(answers, dict):
+        return json_response({"success": False, "message": "'answers' must be an object of question id -> option id"}), 400
+    practice_id = payload.get("practice_id")
+    try:
+        result = grade(chapter.answer_key, None if practice_id is None else str(practice_id), answers)
+    except ValueError as exc:
+        return json_response({"success": False, "message": str(exc)}), 400
+
+    try:
+        progress_obj = _services().progress_repo.upsert_progress(
+            user_id=user_id,  # type: ignore[arg-type]
+            course_id=course_id,
+            total_answered=result.total_answered,
+            total_correct=result.total_correct,
+        )
+    except Exception as exc:  # pragma: no cover - defensive logging
+        current_app.logger.exception("Failed to save practice result", exc_info=exc)
+        return json_response({"success": False, "message": "Failed to save course progress"}), 500
+
+    attempt_log = _services().attempt_log
+    if attempt_log is not None:
+        try:
+            attempt_log.add_many(events_from_grade(user_id, course_id, result, datetime.now()))  # type: ignore[arg-type]
+        except ValueError as exc:
+            current_app.logger.warning("Not logging attempts for chapter %s: %s", chapter_id, exc)
+
+    return json_response({
+        "success": True,
+        "practice_id": result.practice_id,
+        "results": result.results,
+        "total_answered": result.total_answered,
+        "total_correct": result.total_correct,
+        "correct_rate": result.correct_rate,
+        "progress": progress_obj.to_dict() if progress_obj is not None else None,
+    }), 200
+
+
+@api.route("/api/courses", methods=["GET", "OPTIONS"])
+def list_courses():
+    """List courses from the catalog, filtered and paginated.
+
+    Query parameters (all optional):
+    - tag: repeatable; a course must have every given tag
+    - min_duration / max_duration: inclusive range in seconds
+    - limit: page size (default 50, max 500)
+    - cursor: ``next_cursor`` from the previous page
+
+    Response: ``{"meta", "courses", "next_cursor", "total"}`` where ``total``
+    counts all matches; ``next_cursor`` is null on the last page.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    index = _services().course_catalog.index()
+    if index is None:
+        return json_response({"success": False, "message": "Course catalog is not available"}), 503
+
+    try:
+        min_duration = parse_optional_int(request.args, "min_duration", minimum=0)
+        max_duration = parse_optional_int(request.args, "max_duration", minimum=0)
+        limit = parse_optional_int(request.args, "limit", minimum=1, maximum=MAX_LIMIT)
+        payload = index.response_payload(
+            tags=request.args.getlist("tag"),
+            min_duration=min_duration,
+            max_duration=max_duration,
+            cursor=request.args.get("cursor"),
+            limit=limit if limit is not None else DEFAULT_LIMIT,
+        )
+    except ValueError as exc:  # includes course_catalog.InvalidCursor
+        return json_response({"success": False, "message": str(exc)}), 400
+
+    return _payload_response(payload, _services().config.courses_cache_control)
+
+
+@api.route("/api/courses/<course_id>", methods=["GET", "OPTIONS"])
+def get_course(course_id: str):
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    index = _services().course_catalog.index()
+    course = index.get(course_id) if index is not None else None
+    if course is None:
+        return json_response({"success": False, "message": f"Course '{course_id}' not found"}), 404
+    return json_response({"success": True, "course": course}), 200
+
+
+@api.route("/api/course-stats", methods=["GET", "OPTIONS"])
+def get_course_stats():
+    """Per-course completion and accuracy summaries for dashboards.
+
+    Query parameters:
+    - course_id: optional, repeatable; all courses when omitted
+
+    Response: ``{"success": true, "items": [{course_id, learners,
+    completed_learners, avg_progress_percent, total_answered, total_correct,
+    correct_rate, reconciled_at}, ...]}`` ordered by course_id.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    raw_ids = request.args.getlist("course_id")
+    course_ids: Optional[List[int]] = None
+    if raw_ids:
+        try:
+            course_ids = [int(value) for value in raw_ids]
+        except ValueError:
+            return json_response({"success": False, "message": "'course_id' must be an integer"}), 400
+
+    try:
+        items = _services().course_stats_repo.get_many(course_ids)
+    except Exception as exc:  # pragma: no cover - defensive logging
+        current_app.logger.exception("Failed to load course stats", exc_info=exc)
+        return json_response({"success": False, "message": "Failed to load course stats"}), 500
+
+    return json_response({"success": True, "items": [item.to_dict() for item in items]}), 200
+
+
+# --- Admin endpoints ---
+def _require_admin():
+    """Return an error response unless the request carries ADMIN_TOKEN."""
+    admin_token = _services().config.admin_token
+    if not admin_token:
+        return json_response({"success": False, "message": "Admin API is disabled"}), 403
+    token = _extract_token_from_request()
+    if token is None or not secrets.compare_digest(token, admin_token):
+        return json_response({"success": False, "message": "Invalid admin token"}), 401
+    return None
+
+
+def _parse_optional_datetime(args, name: str) -> Optional[datetime]:
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 date or datetime")
+
+
+@api.route("/api/admin/progress/export", methods=["GET"])
+def export_progress():
+    """Stream every user_course_progress row as CSV or NDJSON.
+
+    Query parameters (all optional):
+    - format: ``csv`` (default) or ``ndjson``
+    - course_id: only this course
+    - submitted_from / submitted_to: ``submit_at`` range, ISO 8601,
+      from inclusive, to exclusive
+
+    Rows are read through an unbuffered cursor and written out batch by
+    batch with chunked transfer encoding, so memory use does not grow with
+    the size of the export. A database error midway ends the stream early
+    (it is logged); the response status has already been sent.
+    """
+    error = _require_admin()
+    if error is not None:
+        return error
+
+    fmt = request.args.get("format", "csv")
+    try:
+        course_id = parse_optional_int(request.args, "course_id", minimum=0)
+        submitted_from = _parse_optional_datetime(request.args, "submitted_from")
+        submitted_to = _parse_optional_datetime(request.args, "submitted_to")
+        body = export.encode(
+            fmt,
+            export.column_names(PROGRESS_COLUMNS),
+            _services().progress_repo.iter_export(course_id, submitted_from, submitted_to),
+        )
+    except ValueError as exc:
+        return json_response({"success": False, "message": str(exc)}), 400
+
+    # The body is streamed after the app context is gone: bind the logger now
+    logger = current_app.logger
+
+    def logged(chunks):
+        try:
+            yield from chunks
+        except Exception as exc:
+            logger.exception("Progress export failed", exc_info=exc)
+
+    return Response(
+        logged(body),
+        content_type=export.CONTENT_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="user_course_progress.{fmt}"'},
+    )
+
+
+# Larger runs belong to the CLI (python backend/provisioning.py)
+MAX_PROVISION_CODES = 100000
+
+
+@api.route("/api/admin/users/provision", methods=["POST"])
+def provision_users():
+    """Create users in bulk ahead of an exam (see provisioning.py).
+
+    Request body, one of:
+    - JSON ``{"codes": ["T00010-5E7", ...]}``
+    - JSON ``{"prefix": "A-C", "start": 0, "count": 1000}``: generated codes
+    - ``text/plain``: a code list such as T20.txt (``index<TAB>code`` lines)
+
+    JSON bodies may also set ``name`` for the new users. At most
+    MAX_PROVISION_CODES codes per request; existing users are left as they are.
+
+    Response JSON:
+        {"success": true, "report": {"total": 20, "valid": 20, "invalid": 0,
+         "inserted": 18, "existing": 2, "seconds": 0.004, "invalid_samples": []}}
+    """
+    error = _require_admin()
+    if error is not None:
+        return error
+
+    name = "Exam User"
+    validate = True
+    if request.mimetype == "text/plain":
+        codes = list(provisioning.parse_code_lines(request.get_data(as_text=True).splitlines()))
+        size = len(codes)
+    else:
+        try:
+            payload: Dict[str, Any] = request.get_json(force=True) or {}
+        except Exception:
+            return json_response({"success": False, "message": "Invalid JSON body"}), 400
+        if not isinstance(payload, dict):
+            return json_response({"success": False, "message": "Invalid JSON body"}), 400
+        if isinstance(payload.get("name"), str) and payload["name"].strip():
+            name = payload["name"].strip()[:100]
+
+        if "codes" in payload:
+            codes = payload["codes"]
+            if not isinstance(codes, list) or not all(isinstance(c, str) for c in codes):
+                return json_response({"success": False, "message": "'codes' must be a list of strings"}), 400
+            size = len(codes)
+        elif "prefix" in payload:
+            start, count = payload.get("start", 0), payload.get("count")
+            if not isinstance(start, int) or not isinstance(count, int) or isinstance(start, bool) or isinstance(count, bool):
+                return json_response({"success": False, "message": "'start' and 'count' must be integers"}), 400
+            try:
+                prefixes = parse_prefixes(str(payload["prefix"]))
+                codes = provisioning.generate_range(prefixes, start, count)
+            except ValueError as exc:
+                return json_response({"success": False, "message": str(exc)}), 400
+            size = len(prefixes) * count
+            validate = False
+        else:
+            return json_response({"success": False, "message": "Provide 'codes' or 'prefix'"}), 400
+
+    if size > MAX_PROVISION_CODES:
+        return json_response(
+            {"success": False, "message": f"At most {MAX_PROVISION_CODES} codes per request"}
+        ), 413
+
+    try:
+        report = provisioning.provision(_services().user_repo, codes, name=name, validate=validate)
+    except Exception as exc:  # pragma: no cover - defensive logging
+        current_app.logger.exception("Failed to provision users", exc_info=exc)
+        return json_response({"success": False, "message": "Failed to provision users"}), 500
+
+    return json_response({"success": True, "report": report.to_dict()}), 200
+
+
+# --- Application factory ---
+_imports_recorded = False
+
+
+@dataclass
+class Services:
+    """What the endpoints use; one per app, at ``app.extensions["exammaster"]``."""
+
+    config: AppConfig
+    db: Any
+    user_repo: UserRepository
+    progress_repo: UserCourseProgressRepository
+    course_stats_repo: CourseStatsRepository
+    practice_store: PracticeStore
+    course_catalog: CourseCatalog
+    cors: CorsPolicy
+    warmup: Warmup
+    login_guard: Optional[LoginGuard] = None
+    attempt_log: Optional[AttemptLogBuffer] = None
+    course_stats_reconciler: Optional[CourseStatsReconciler] = None
+    # (name, collector) pairs this app registered with metrics
+    collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = field(default_factory=list)
+
+    def close(self) -> None:
+        """Stop background work, flush buffers and close the database.
+
+        Registered with atexit by ``create_app``; call it directly to dispose
+        of an app early (tests, benchmarks). Also drops the app's collectors.
+        """
+
+        atexit.unregister(self.close)
+        for name, collect in self.collectors:
+            metrics.unregister_collector(name, collect)
+        self.collectors.clear()
+        self.warmup.close()
+        if self.course_stats_reconciler is not None:
+            self.course_stats_reconciler.close()
+        if self.attempt_log is not None:
+            self.attempt_log.close()
+        # Flush buffered progress before closing the pool
+        self.progress_repo.close()
+        self.db.close()
+
+
+def _warmup_steps(app: Flask, services: Services) -> List[Step]:
+    config = services.config
+
+    def db() -> str:
+        return f"{services.db.warm_up(config.warmup_db_connections)} connections"
+
+    def content() -> str:
+        chapters = services.practice_store.load_all()
+        index = services.course_catalog.load()
+        return f"{len(chapters)} chapters, {len(index.courses) if index is not None else 0} courses"
+
+    def token_cache() -> str:
+        return f"{services.user_repo.warm_token_cache(config.warmup_token_cache)} tokens"
+
+    def code_paths() -> None:
+        # First calls compile routing, encoders and the verifier's tables
+        is_code_valid(generate_code(0))
+        client = app.test_client()
+        environ = {WARMUP_ENVIRON_KEY: True}
+        client.get("/healthz", environ_base=environ)
+        client.get("/api/courses?limit=1", environ_base=environ)
+
+    return [("db", db), ("content", content), ("token_cache", token_cache), ("code_paths", code_paths)]
+
+
+def create_app(config: Optional[AppConfig] = None, db: Any = None) -> Flask:
+    """Build the Flask app and its services, then warm them up.
+
+    *config* defaults to ``AppConfig.from_env()`` and *db* to
+    ``database_from_env()``. With ``config.warmup == "sync"`` the warm-up
+    steps (see ``_warmup_steps``) run before this returns; if they fail they
+    are retried in the background and /readyz reports 503 meanwhile.
+    """
+
+    imports_done = time.perf_counter()
+    config = config or AppConfig.from_env()
+    app = Flask(__name__)
+    if app.logger.level == logging.NOTSET:
+        # Let the startup breakdown through without configuring logging first
+        app.logger.setLevel(logging.INFO)
+
+    db = db if db is not None else database_from_env()
+    user_repo = UserRepository(db, token_cache=TokenCache.from_env())
+    progress_repo = UserCourseProgressRepository(db, write_buffer=ProgressWriteBuffer.from_env())
+    course_stats_repo = CourseStatsRepository(db)
+    services = Services(
+        config=config,
+        db=db,
+        user_repo=user_repo,
+        progress_repo=progress_repo,
+        course_stats_repo=course_stats_repo,
+        # Practice chapters are parsed and compressed once, then served from memory
+        practice_store=PracticeStore.from_env(),
+        # Course catalog with tag/duration indexes; reloaded when courses.json changes
+        course_catalog=CourseCatalog.from_env(),
+        # Compiled once; preflights are answered by the middleware before routing
+        cors=CorsPolicy.from_env(),
+        warmup=Warmup(retry_interval=config.warmup_retry_interval, log=app.logger),
+        # Brute-force limits and load shedding for /api/verify-code (see rate_limit.py)
+        login_guard=LoginGuard.from_env(),
+        # Per-question attempt log (off unless ATTEMPT_LOG_ENABLED=1); queued in
+        # memory and written in batches by a background thread
+        attempt_log=AttemptLogBuffer.from_env(),
+        # Per-course summaries, kept current by triggers; reconciled by cron unless
+        # COURSE_STATS_RECONCILE_INTERVAL enables the in-process job
+        course_stats_reconciler=CourseStatsReconciler.from_env(course_stats_repo),
+    )
+    app.extensions["exammaster"] = services
+    app.register_blueprint(api)
+    app.wsgi_app = CorsPreflightMiddleware(app.wsgi_app, services.cors)  # type: ignore[method-assign]
+
+    if services.attempt_log is not None:
+        services.attempt_log.start(AttemptRepository(db).insert_many)
+    if services.course_stats_reconciler is not None:
+        services.course_stats_reconciler.start()
+    atexit.register(services.close)
+
+    _register_collectors(services)
+
+    warmup = services.warmup
+    warmup.steps.extend(_warmup_steps(app, services))
+    global _imports_recorded
+    if not _imports_recorded:
+        # Only the first app in a process paid for the imports
+        warmup.record("imports", imports_done - _IMPORT_STARTED)
+        _imports_recorded = True
+    warmup.record("services", time.perf_counter() - imports_done)
+    if config.warmup == "sync":
+        if not warmup.run():
+            warmup.start_background()
+    elif config.warmup == "background":
+        warmup.start_background()
+    else:
+        warmup.mark_ready()
+    return app
+
+
+def _register_collectors(services: Services) -> None:
+    """Gauges exposed at /metrics next to the request and DB metrics."""
+
+    db = services.db
+
+    def register(name: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        metrics.register_collector(name, collect)
+        services.collectors.append((name, collect))
+
+    if services.user_repo.token_cache is not None:
+        register("token_cache", services.user_repo.token_cache.stats)
+    if services.progress_repo.write_buffer is not None:
+        register("progress_buffer", services.progress_repo.write_buffer.stats)
+    if services.attempt_log is not None:
+        register("attempt_log", services.attempt_log.stats)
+    if db.pool is not None:
+        register("db_pool", db.pool.stats)
+    if db.replicated:
+        register("db_replicas", db.stats)
+    if services.course_stats_reconciler is not None:
+        register("course_stats_reconcile", services.course_stats_reconciler.stats)
+    if services.login_guard is not None:
+        register("login_guard", services.login_guard.stats)
+    register("practice_store", services.practice_store.stats)
+    register("course_catalog", services.course_catalog.stats)
+
+
+_app: Optional[Flask] = None
+
+
+def __getattr__(name: str) -> Any:
+    # ``app.app`` (e.g. ``gunicorn app:app``) is built from the environment on
+    # first access, so importing this module does not connect to anything.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     # Example: python backend/app.py
     port = int(os.getenv("PORT", "8000"))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    create_app().run(host="0.0.0.0", port=port, debug=True)
@@ -1,7 +1,52 @@
-"""ASGI wrapper for Flask app to run with uvicorn."""
+"""ASGI wrapper for Flask app to run with uvicorn.
+
+By default every request goes through ``WsgiToAsgi`` into the Flask app.
+
+With ASGI_NATIVE=1 the hot endpoints (verify-code, course-progress GET/POST)
+are served by the native asyncio app in asgi_native.py and everything else
+still falls through to Flask. The async database driver is selected with:
+- ASYNC_DB_DRIVER: ``mysql`` (requires aiomysql) or ``sqlite``; defaults to
+  the DB_BACKEND of the Flask app
+- ASYNC_SQLITE_PATH: database file for the sqlite driver (default:
+  SQLITE_PATH, so both paths share one WAL database)
+
+The token cache, write-behind buffer and verify-code rate limits are shared
+with the Flask app, so both paths see the same cached tokens, unflushed
+progress and per-client budgets.
+"""
+
+import os
 
 from asgiref.wsgi import WsgiToAsgi
-from app import app
+from app import create_app
+
+# Built and warmed up before uvicorn starts accepting connections
+app = create_app()
+_services = app.extensions["exammaster"]
 
 # Wrap Flask WSGI app as ASGI
 asgi_app = WsgiToAsgi(app)
+
+if os.getenv("ASGI_NATIVE", "0").lower() in ("1", "true", "yes"):
+    from async_db import (
+        AiomysqlDriver,
+        AsyncUserCourseProgressRepository,
+        AsyncUserRepository,
+        SQLiteAsyncDriver,
+    )
+    from asgi_native import NativeApp
+    from sqlite_db import DEFAULT_PATH
+
+    if os.getenv("ASYNC_DB_DRIVER", os.getenv("DB_BACKEND", "mysql").lower()) == "sqlite":
+        _driver = SQLiteAsyncDriver(os.getenv("ASYNC_SQLITE_PATH", os.getenv("SQLITE_PATH", str(DEFAULT_PATH))))
+    else:
+        _driver = AiomysqlDriver.from_env()
+
+    asgi_app = NativeApp(
+        AsyncUserRepository(_driver, token_cache=_services.user_repo.token_cache),
+        AsyncUserCourseProgressRepository(_driver, write_buffer=_services.progress_repo.write_buffer),
+        driver=_driver,
+        fallback=asgi_app,
+        cors=_services.cors,
+        login_guard=_services.login_guard,
+    )
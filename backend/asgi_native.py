@@ -0,0 +1,374 @@
+"""Native asyncio implementation of the hot API endpoints.
+
+Serves the three endpoints hit on every page view without going through
+``WsgiToAsgi`` and its thread pool:
+
+    POST /api/verify-code
+    GET  /api/course-progress
+    POST /api/course-progress
+
+Status codes, JSON bodies (encoded by jsonutil.py, as in the Flask app) and
+CORS headers match the Flask app in app.py.
+CORS preflights for any path are answered directly. Any other route is
+forwarded to the optional ``fallback`` ASGI app, normally the wrapped Flask
+app, so the rest of the API keeps working unchanged.
+
+See asgi.py for how the app is assembled from environment settings.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import jsonutil
+import metrics
+from async_db import AsyncDriver, AsyncUserCourseProgressRepository, AsyncUserRepository
+from code_verifier import is_code_valid, verify_code_format
+from cors import CorsPolicy, is_preflight
+from rate_limit import LoginGuard, retry_after_header
+from validation import parse_optional_int
+
+logger = logging.getLogger(__name__)
+
+ASGIApp = Callable[[Dict[str, Any], Callable[[], Awaitable[Dict[str, Any]]], Callable[[Dict[str, Any]], Awaitable[None]]], Awaitable[None]]
+
+# (payload, status) or (payload, status, extra headers)
+_Response = Tuple[Any, ...]
+
+
+class _InvalidJSON(Exception):
+    pass
+
+
+class _Request:
+    __slots__ = ("method", "headers", "query", "body", "remote_addr")
+
+    def __init__(
+        self,
+        method: str,
+        headers: Dict[str, str],
+        query: Dict[str, List[str]],
+        body: bytes,
+        remote_addr: Optional[str] = None,
+    ) -> None:
+        self.method = method
+        self.headers = headers
+        self.query = query
+        self.body = body
+        self.remote_addr = remote_addr
+
+    def arg(self, name: str) -> Optional[str]:
+        values = self.query.get(name)
+        return values[0] if values else None
+
+    def json(self) -> Dict[str, Any]:
+        """Parse the body like Flask's ``request.get_json(force=True) or {}``."""
+
+        try:
+            payload = json.loads(self.body)
+        except (ValueError, UnicodeDecodeError):
+            raise _InvalidJSON()
+        return payload or {}
+
+    def token(self) -> Optional[str]:
+        """Extract Bearer token from Authorization header."""
+        auth_header = self.headers.get("authorization", "")
+        if auth_header.startswith("Bearer "):
+            return auth_header[7:]
+        return None
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    """Value of the (lower-case) request header *name*, or None."""
+    for k, v in scope.get("headers", []):
+        if k.lower() == name:
+            return v.decode("latin-1")
+    return None
+
+
+def _too_many_attempts(retry_after: float) -> _Response:
+    return (
+        {"valid": False, "message": "Too many attempts, please retry later"},
+        429,
+        {"Retry-After": retry_after_header(retry_after)},
+    )
+
+
+_SERVER_BUSY: _Response = ({"valid": False, "message": "Server busy, please retry"}, 503, {"Retry-After": "1"})
+
+
+class NativeApp:
+    """ASGI application for the hot endpoints with a pluggable fallback."""
+
+    def __init__(
+        self,
+        user_repo: AsyncUserRepository,
+        progress_repo: AsyncUserCourseProgressRepository,
+        driver: Optional[AsyncDriver] = None,
+        fallback: Optional[ASGIApp] = None,
+        cors: Optional[CorsPolicy] = None,
+        login_guard: Optional[LoginGuard] = None,
+    ) -> None:
+        self._user_repo = user_repo
+        self._progress_repo = progress_repo
+        self._driver = driver
+        self._fallback = fallback
+        self._cors = cors if cors is not None else CorsPolicy.from_env()
+        self._login_guard = login_guard
+        self._routes: Dict[Tuple[str, str], Callable[[_Request], Awaitable[_Response]]] = {
+            ("/api/verify-code", "POST"): self.verify_code,
+            ("/api/verify-code", "OPTIONS"): self._preflight,
+            ("/api/course-progress", "GET"): self.get_course_progress,
+            ("/api/course-progress", "POST"): self.upsert_course_progress,
+            ("/api/course-progress", "OPTIONS"): self._preflight,
+        }
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            if self._fallback is not None:
+                await self._fallback(scope, receive, send)
+            return
+
+        # CORS preflights for any path are answered here, before routing
+        if scope["method"] == "OPTIONS" and is_preflight("OPTIONS", _header(scope, b"access-control-request-method")):
+            started = time.perf_counter()
+            await self._send(send, scope, 204, b"", b"text/html; charset=utf-8", preflight=True)
+            metrics.finish_request("preflight", "OPTIONS", 204, time.perf_counter() - started)
+            return
+
+        handler = self._routes.get((scope["path"], scope["method"]))
+        if handler is None:
+            if self._fallback is not None:
+                await self._fallback(scope, receive, send)
+            else:
+                await self._send(send, scope, 404, b"Not Found", b"text/plain; charset=utf-8")
+            return
+
+        started = time.perf_counter()
+        metrics.start_request()
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        client = scope.get("client")
+        request = _Request(scope["method"], headers, query, body, client[0] if client else None)
+
+        payload, status, *extra = await handler(request)
+        if status == 204:
+            await self._send(send, scope, 204, b"", b"text/html; charset=utf-8")
+        else:
+            await self._send(send, scope, status, jsonutil.dumps(payload), b"application/json", extra=extra[0] if extra else None)
+        # Same labels as the Flask app, so both paths land in one series
+        metrics.finish_request(scope["path"], scope["method"], status, time.perf_counter() - started)
+
+    async def _send(
+        self,
+        send,
+        scope,
+        status: int,
+        body: bytes,
+        content_type: bytes,
+        preflight: bool = False,
+        extra: Optional[Dict[str, str]] = None,
+    ) -> None:
+        origin = _header(scope, b"origin")
+        headers = [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if extra:
+            headers.extend((name.lower().encode(), value.encode("latin-1")) for name, value in extra.items())
+        cors = self._cors.preflight_headers(origin) if preflight else self._cors.headers(origin)
+        headers.extend((name.lower().encode(), value.encode("latin-1")) for name, value in cors)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._driver is not None:
+                    await self._driver.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _preflight(self, request: _Request) -> _Response:
+        return None, 204
+
+    async def _resolve_user_id(self, request: _Request, source: Dict[str, Any], get: bool) -> Tuple[Optional[int], Optional[_Response]]:
+        """Token auth with user_id/code fallback, mirroring the Flask endpoints.
+
+        ``get`` selects the messages used by the GET endpoint (query string).
+        """
+
+        token = request.token()
+        if token:
+            try:
+                user_obj = await self._user_repo.get_by_token(token)
+            except Exception:
+                logger.exception("Failed to load user by token")
+                return None, ({"success": False, "message": "Failed to load user by token"}, 500)
+            if user_obj is None:
+                return None, ({"success": False, "message": "Invalid or expired token"}, 401)
+            return user_obj.id, None
+
+        # Fallback: user_id or code (for backward compatibility)
+        user_id_raw = source.get("user_id")
+        code = source.get("code")
+        if user_id_raw is not None:
+            try:
+                return int(user_id_raw), None
+            except (TypeError, ValueError):
+                message = "Invalid 'user_id' query parameter" if get else "'user_id' must be an integer"
+                return None, ({"success": False, "message": message}, 400)
+        if isinstance(code, str) and (code if get else code.strip()):
+            try:
+                user_obj = await self._user_repo.get_by_code(code.strip().upper())
+            except Exception:
+                logger.exception("Failed to load user by code")
+                return None, ({"success": False, "message": "Failed to load user by code"}, 500)
+            if user_obj is None:
+                return None, ({"success": False, "message": "User not found for provided code"}, 404)
+            return user_obj.id, None
+
+        if get:
+            return None, ({"success": False, "message": "Missing 'user_id', 'code', or Authorization token"}, 400)
+        return None, ({"success": False, "message": "Missing Authorization token or 'user_id'/'code'"}, 400)
+
+    async def verify_code(self, request: _Request) -> _Response:
+        guard = self._login_guard
+        client = None
+        if guard is not None:
+            client = guard.client(request.remote_addr, request.headers.get("x-forwarded-for"))
+            retry_after = guard.check_client(client)
+            if retry_after:
+                return _too_many_attempts(retry_after)
+
+        try:
+            payload = request.json()
+        except _InvalidJSON:
+            return {"valid": False, "message": "Invalid JSON body"}, 400
+
+        # Check if token exists in request and verify it first
+        token = request.token()
+        if token:
+            if guard is not None and not guard.try_enter():
+                return _SERVER_BUSY
+            try:
+                user_obj = await self._user_repo.get_by_token(token)
+            except Exception:
+                logger.exception("Failed to load user by token")
+                return {"valid": False, "message": "Failed to verify token"}, 500
+            finally:
+                if guard is not None:
+                    guard.leave()
+            if user_obj is None:
+                return {"valid": False, "message": "Invalid or expired token"}, 401
+            return {"valid": True, "user": user_obj.to_dict()}, 200
+
+        code = payload.get("code")
+        if not isinstance(code, str) or not code.strip():
+            return {"valid": False, "message": "Missing or invalid 'code'"}, 400
+
+        code = code.strip().upper()
+        if not verify_code_format(code):
+            return {"valid": False, "message": "Code format must be like X00010-8AB (prefix letter + 5 digits + '-' + 3 hex chars)"}, 200
+        if guard is not None:
+            retry_after = guard.check_code(code, client)
+            if retry_after:
+                return _too_many_attempts(retry_after)
+        if not is_code_valid(code):
+            if guard is not None:
+                guard.record_failure(code, client)
+            return {"valid": False, "message": "Invalid verification code"}, 200
+
+        if guard is not None and not guard.try_enter():
+            return _SERVER_BUSY
+        try:
+            user_obj = await self._user_repo.login_with_code(code, secrets.token_urlsafe(32))
+        except Exception as exc:
+            logger.exception("Failed to load or create user")
+            return {
+                "valid": False,
+                "message": "Failed to load or create user",
+                "error": str(exc),  # helpful during development
+            }, 500
+        finally:
+            if guard is not None:
+                guard.leave()
+
+        return {"valid": True, "user": user_obj.to_dict()}, 200
+
+    async def get_course_progress(self, request: _Request) -> _Response:
+        source = {"user_id": request.arg("user_id"), "code": request.arg("code")}
+        user_id, error = await self._resolve_user_id(request, source, get=True)
+        if error is not None:
+            return error
+
+        course_id_raw = request.arg("course_id")
+        course_id: Optional[int] = None
+        if course_id_raw is not None:
+            try:
+                course_id = int(course_id_raw)
+            except (TypeError, ValueError):
+                return {"success": False, "message": "Invalid 'course_id' query parameter"}, 400
+
+        try:
+            items = await self._progress_repo.get_for_user(user_id=user_id, course_id=course_id)  # type: ignore[arg-type]
+        except Exception:
+            logger.exception("Failed to fetch course progress")
+            return {"success": False, "message": "Failed to fetch course progress"}, 500
+
+        return {"success": True, "items": [p.to_dict() for p in items]}, 200
+
+    async def upsert_course_progress(self, request: _Request) -> _Response:
+        try:
+            payload = request.json()
+        except _InvalidJSON:
+            return {"success": False, "message": "Invalid JSON body"}, 400
+
+        user_id, error = await self._resolve_user_id(request, payload, get=False)
+        if error is not None:
+            return error
+
+        try:
+            course_id = int(payload.get("course_id"))  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            return {"success": False, "message": "'course_id' must be an integer"}, 400
+
+        try:
+            progress_percent = parse_optional_int(payload, "progress_percent", minimum=0, maximum=100)
+            total_answered = parse_optional_int(payload, "total_answered", minimum=0)
+            total_correct = parse_optional_int(payload, "total_correct", minimum=0)
+        except ValueError as exc:
+            return {"success": False, "message": str(exc)}, 400
+
+        try:
+            progress_obj = await self._progress_repo.upsert_progress(
+                user_id=user_id,  # type: ignore[arg-type]
+                course_id=course_id,
+                progress_percent=progress_percent,
+                total_answered=total_answered,
+                total_correct=total_correct,
+            )
+        except Exception:
+            logger.exception("Failed to upsert course progress")
+            return {"success": False, "message": "Failed to save course progress"}, 500
+
+        return {"success": True, "progress": progress_obj.to_dict()}, 200  # type: ignore[union-attr]
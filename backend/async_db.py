@@ -0,0 +1,389 @@
+"""Async repositories for the native ASGI request path.
+
+Mirrors ``UserRepository`` / ``UserCourseProgressRepository`` from db.py, but
+every query is awaited through an ``AsyncDriver`` so a single event loop can
+serve many slow clients without a thread per request.
+
+Drivers:
+- ``AiomysqlDriver``: MySQL via aiomysql (optional dependency, installed
+  separately, see requirements-optional.txt). Uses the same DB_* variables as
+  ``Database.from_env``, including DB_POOL_SIZE and DB_POOL_RECYCLE.
+- ``SQLiteAsyncDriver``: stdlib sqlite3, e.g. ``:memory:`` for tests. Queries
+  run on a dedicated thread so a locked database never blocks the event loop.
+
+Repositories keep the PyMySQL parameter style (``%s``); drivers translate it
+if their backend needs something else.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import metrics
+from db import (
+    PROGRESS_COLUMNS,
+    TOKEN_LIFETIME,
+    USER_COLUMNS,
+    User,
+    UserCourseProgress,
+    UserCourseProgressRepository,
+    UserRepository,
+)
+from progress_buffer import ProgressWriteBuffer
+from sqlite_support import apply_migrations, configure_wal, connect, translate_params
+from token_cache import MISSING, TokenCache
+
+Params = Union[Sequence[Any], Dict[str, Any]]
+
+
+class AsyncDriver(ABC):
+    """Minimal async query interface used by the async repositories.
+
+    Rows are returned as dicts keyed by column name, like PyMySQL's DictCursor.
+    ``dialect`` is ``"mysql"`` or ``"sqlite"`` and selects dialect-specific SQL.
+    """
+
+    dialect: str = "mysql"
+
+    @abstractmethod
+    async def fetchone(self, sql: str, params: Params = ()) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def fetchall(self, sql: str, params: Params = ()) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def execute(self, sql: str, params: Params = ()) -> int:
+        """Run a write statement and return ``lastrowid``."""
+
+    @abstractmethod
+    async def execute_and_fetchone(
+        self, sql: str, params: Params, select_sql: str, select_params: Params
+    ) -> Optional[Dict[str, Any]]:
+        """Run a write and a read on one connection, in one transaction."""
+
+    async def close(self) -> None:
+        pass
+
+
+async def _timed_execute(cursor, sql: str, params: Params) -> None:
+    started = time.perf_counter()
+    try:
+        await cursor.execute(sql, params)
+    finally:
+        metrics.record_db_statement(time.perf_counter() - started)
+
+
+class AiomysqlDriver(AsyncDriver):
+    """MySQL driver backed by an aiomysql connection pool (created lazily)."""
+
+    dialect = "mysql"
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        name: str,
+        pool_size: int = 10,
+        pool_recycle: float = 3600.0,
+    ) -> None:
+        self._config = dict(host=host, port=port, user=user, password=password, db=name)
+        self._pool_size = max(pool_size, 1)
+        self._pool_recycle = pool_recycle
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AiomysqlDriver":
+        return cls(
+            host=os.getenv("DB_HOST", "127.0.0.1"),
+            port=int(os.getenv("DB_PORT", "3306")),
+            user=os.getenv("DB_USER", "root"),
+            password=os.getenv("DB_PASSWORD", "123456"),
+            name=os.getenv("DB_NAME", "exammaster"),
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            pool_recycle=float(os.getenv("DB_POOL_RECYCLE", "3600")),
+        )
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    try:
+                        import aiomysql
+                    except ImportError as exc:  # pragma: no cover - depends on environment
+                        raise RuntimeError("AiomysqlDriver requires aiomysql (pip install aiomysql)") from exc
+                    self._pool = await aiomysql.create_pool(
+                        minsize=1,
+                        maxsize=self._pool_size,
+                        pool_recycle=int(self._pool_recycle),
+                        autocommit=True,
+                        cursorclass=aiomysql.DictCursor,
+                        **self._config,
+                    )
+        return self._pool
+
+    async def fetchone(self, sql: str, params: Params = ()) -> Optional[Dict[str, Any]]:
+        pool = await self._get_pool()
+        metrics.record_db_connection()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await _timed_execute(cursor, sql, params)
+                return await cursor.fetchone()
+
+    async def fetchall(self, sql: str, params: Params = ()) -> List[Dict[str, Any]]:
+        pool = await self._get_pool()
+        metrics.record_db_connection()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await _timed_execute(cursor, sql, params)
+                return list(await cursor.fetchall() or [])
+
+    async def execute(self, sql: str, params: Params = ()) -> int:
+        pool = await self._get_pool()
+        metrics.record_db_connection()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await _timed_execute(cursor, sql, params)
+                return cursor.lastrowid
+
+    async def execute_and_fetchone(
+        self, sql: str, params: Params, select_sql: str, select_params: Params
+    ) -> Optional[Dict[str, Any]]:
+        pool = await self._get_pool()
+        metrics.record_db_connection()
+        async with pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    await _timed_execute(cursor, sql, params)
+                    await _timed_execute(cursor, select_sql, select_params)
+                    row = await cursor.fetchone()
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+            return row
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+
+class SQLiteAsyncDriver(AsyncDriver):
+    """SQLite driver for tests and single-node deployments.
+
+    Applies migrations/sqlite on first use. sqlite3 calls block (a write may
+    wait up to busy_timeout for the WAL lock), so statements run on one
+    dedicated thread, which also serializes them over the single connection;
+    the event loop only awaits the result. File databases use WAL mode, so
+    they can be shared with a ``sqlite_db.SQLiteDatabase`` in the same process.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self._conn = connect(path, check_same_thread=False)
+        if path != ":memory:":
+            configure_wal(self._conn)
+        apply_migrations(self._conn)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-async")
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        metrics.record_db_connection()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _run(self, sql: str, params: Params):
+        started = time.perf_counter()
+        try:
+            return self._conn.execute(translate_params(sql), params)
+        finally:
+            metrics.record_db_statement(time.perf_counter() - started)
+
+    async def fetchone(self, sql: str, params: Params = ()) -> Optional[Dict[str, Any]]:
+        return await self._call(lambda: self._run(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: Params = ()) -> List[Dict[str, Any]]:
+        return await self._call(lambda: self._run(sql, params).fetchall())
+
+    async def execute(self, sql: str, params: Params = ()) -> int:
+        return await self._call(lambda: self._run(sql, params).lastrowid)
+
+    async def execute_and_fetchone(
+        self, sql: str, params: Params, select_sql: str, select_params: Params
+    ) -> Optional[Dict[str, Any]]:
+        return await self._call(self._execute_and_fetchone, sql, params, select_sql, select_params)
+
+    def _execute_and_fetchone(
+        self, sql: str, params: Params, select_sql: str, select_params: Params
+    ) -> Optional[Dict[str, Any]]:
+        self._conn.execute("BEGIN")
+        try:
+            self._run(sql, params)
+            row = self._run(select_sql, select_params).fetchone()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return row
+
+    async def close(self) -> None:
+        await self._call(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+
+class AsyncUserRepository:
+    """Async counterpart of ``db.UserRepository``."""
+
+    _SELECT = f"SELECT {USER_COLUMNS} FROM users"
+
+    def __init__(self, driver: AsyncDriver, token_cache: Optional[TokenCache] = None) -> None:
+        self._driver = driver
+        self._token_cache = token_cache
+
+    async def get_by_code(self, code: str) -> Optional[User]:
+        row = await self._driver.fetchone(f"{self._SELECT} WHERE code = %s", (code,))
+        return User(**row) if row else None
+
+    async def create(self, code: str, name: Optional[str] = None, token: Optional[str] = None) -> User:
+        user_id = await self._driver.execute(
+            "INSERT INTO users (code, name, token) VALUES (%s, %s, %s)",
+            (code, name, token),
+        )
+        return User(id=user_id, code=code, name=name, email=None, grade=None, token=token)
+
+    async def get_by_token(self, token: str) -> Optional[User]:
+        """Retrieve user by authentication token if it hasn't expired."""
+        cache = self._token_cache
+        if cache is not None:
+            cached = cache.get(token)
+            if cached is not MISSING:
+                return None if cached is None else cached.copy()
+
+        row = await self._driver.fetchone(f"{self._SELECT} WHERE token = %s", (token,))
+        user = User(**row) if row else None
+        if user is not None and user.token_expires_at and user.token_expires_at < datetime.now():
+            user = None  # Token expired
+
+        if cache is not None:
+            if user is None:
+                cache.put_missing(token)
+            else:
+                cache.put(token, user.copy())
+        return user
+
+    async def update_token(self, user_id: int, token: str) -> None:
+        """Update the token for a user with 2-day expiration."""
+        expires_at = datetime.now() + TOKEN_LIFETIME
+        await self._driver.execute(
+            "UPDATE users SET token = %s, token_expires_at = %s WHERE id = %s",
+            (token, expires_at, user_id),
+        )
+        if self._token_cache is not None:
+            self._token_cache.invalidate_user(user_id)
+            self._token_cache.invalidate(token)
+
+    # Same statements as the sync repository
+    _LOGIN_UPSERT_SQL = UserRepository._LOGIN_UPSERT_SQL
+
+    async def login_with_code(self, code: str, token: str, default_name: str = "Exam User") -> User:
+        """Get-or-create the user for *code* and rotate its token in one transaction."""
+
+        expires_at = datetime.now() + TOKEN_LIFETIME
+        row = await self._driver.execute_and_fetchone(
+            self._LOGIN_UPSERT_SQL[self._driver.dialect],
+            {"code": code, "name": default_name, "token": token, "expires_at": expires_at},
+            f"{self._SELECT} WHERE code = %s",
+            (code,),
+        )
+        user = User(**row)  # type: ignore[arg-type]
+        if self._token_cache is not None:
+            self._token_cache.invalidate_user(user.id)
+            self._token_cache.put(token, user.copy())
+        return user
+
+    async def get_or_create_by_code(self, code: str, default_name: str = "Exam User") -> User:
+        user = await self.get_by_code(code)
+        if user is not None:
+            return user
+        return await self.create(code=code, name=default_name)
+
+
+class AsyncUserCourseProgressRepository:
+    """Async counterpart of ``db.UserCourseProgressRepository``.
+
+    A ``write_buffer`` shared with the sync repository may be passed; it must
+    already be started by its owner, since flushing happens on its own thread.
+    """
+
+    _SELECT = f"SELECT {PROGRESS_COLUMNS} FROM user_course_progress"
+
+    _UPSERT_SQL = UserCourseProgressRepository._UPSERT_SQL
+
+    def __init__(self, driver: AsyncDriver, write_buffer: Optional[ProgressWriteBuffer] = None) -> None:
+        self._driver = driver
+        self._write_buffer = write_buffer
+
+    async def get_for_user(self, user_id: int, course_id: Optional[int] = None) -> List[UserCourseProgress]:
+        """Return all progress rows for a user, optionally filtered by course_id."""
+
+        query = f"{self._SELECT} WHERE user_id = %s"
+        params: List[Any] = [user_id]
+        if course_id is not None:
+            query += " AND course_id = %s"
+            params.append(course_id)
+
+        rows = await self._driver.fetchall(query, params)
+        items = [UserCourseProgress(**row) for row in rows]
+        if self._write_buffer is not None:
+            items = UserCourseProgressRepository._overlay_pending(
+                items, self._write_buffer.pending_for(user_id, course_id)
+            )
+        return items
+
+    async def upsert_progress(
+        self,
+        user_id: int,
+        course_id: int,
+        progress_percent: Optional[int] = None,
+        total_answered: Optional[int] = None,
+        total_correct: Optional[int] = None,
+        fetch: bool = True,
+    ) -> Optional[UserCourseProgress]:
+        """Create or update a user/course progress row (see the sync repository)."""
+
+        if self._write_buffer is not None:
+            self._write_buffer.add(
+                user_id=user_id,
+                course_id=course_id,
+                progress_percent=progress_percent,
+                total_answered=total_answered,
+                total_correct=total_correct,
+            )
+        else:
+            await self._driver.execute(
+                self._UPSERT_SQL[self._driver.dialect],
+                {
+                    "user_id": user_id,
+                    "course_id": course_id,
+                    "progress_percent": progress_percent,
+                    "total_answered": total_answered,
+                    "total_correct": total_correct,
+                    "submit_at": None,
+                },
+            )
+        if not fetch:
+            return None
+        items = await self.get_for_user(user_id=user_id, course_id=course_id)
+        return items[0] if items else None
@@ -0,0 +1,381 @@
+"""Append-only log of per-question practice attempts.
+
+Every graded submission (POST /api/practice/<chapter_id>/submit) yields one
+``AttemptEvent`` per question. Events are queued in memory by
+``AttemptLogBuffer`` and written by a background thread with multi-row
+INSERTs into ``practice_attempts`` (migrations/004_create_practice_attempts.sql),
+so a click never waits on a database write.
+
+Ids are stored as small integers: ``practice-003`` -> 3, ``q-012`` -> 12 and
+options ``A``..``Z`` -> 1..26 (0 means unanswered); see the ``encode_*`` /
+``decode_*`` helpers.
+
+The queue is bounded: when it is full, new events are dropped and counted
+(``dropped`` in ``stats()``) rather than slowing requests down. On a failed
+write the batch is put back at the front of the queue as far as it fits.
+
+Maintenance, from the backend directory (MySQL partitions are monthly and
+migration 004 only creates them through 2027-06, so run the first command
+from a monthly cron job)::
+
+    python attempt_log.py add-partitions --months-ahead 3
+    python attempt_log.py question-stats 12 --since 2026-09-01
+
+Configuration (see ``AttemptLogBuffer.from_env``):
+- ATTEMPT_LOG_ENABLED (default: 0; set to 1 once migration 004 is applied)
+- ATTEMPT_LOG_MAX_QUEUE (default: 50000 events)
+- ATTEMPT_LOG_BATCH_SIZE (default: 1000 rows per INSERT)
+- ATTEMPT_LOG_FLUSH_INTERVAL (default: 1.0 seconds)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from grading import GradeResult
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_INT_RE = re.compile(r"(\d+)$")
+
+
+def _trailing_int(value: str, what: str) -> int:
+    match = _TRAILING_INT_RE.search(value)
+    if match is None:
+        raise ValueError(f"{what} {value!r} has no numeric suffix")
+    return int(match.group(1))
+
+
+def encode_practice_id(practice_id: str) -> int:
+    """``practice-003`` -> 3."""
+    return _trailing_int(practice_id, "practice id")
+
+
+def encode_question_id(question_id: str) -> int:
+    """``q-012`` -> 12."""
+    return _trailing_int(question_id, "question id")
+
+
+def encode_option_id(option_id: Optional[str]) -> int:
+    """``A``..``Z`` -> 1..26, numeric ids as themselves, None -> 0 (unanswered)."""
+
+    if option_id is None:
+        return 0
+    if len(option_id) == 1 and option_id.isalpha():
+        return ord(option_id.upper()) - ord("A") + 1
+    return _trailing_int(option_id, "option id")
+
+
+def decode_practice_id(practice_no: int) -> str:
+    return f"practice-{practice_no:03d}"
+
+
+def decode_question_id(question_no: int) -> str:
+    return f"q-{question_no:03d}"
+
+
+def decode_option_id(option_no: int) -> Optional[str]:
+    if option_no == 0:
+        return None
+    return chr(ord("A") + option_no - 1) if option_no <= 26 else str(option_no)
+
+
+@dataclass
+class AttemptEvent:
+    user_id: int
+    chapter_id: int
+    practice_no: int
+    question_no: int
+    option_no: int
+    is_correct: bool
+    attempted_at: datetime
+
+
+def events_from_grade(user_id: int, chapter_id: int, result: GradeResult, attempted_at: datetime) -> List[AttemptEvent]:
+    """One event per graded question of a submission."""
+
+    practice_no = encode_practice_id(result.practice_id)
+    return [
+        AttemptEvent(
+            user_id=user_id,
+            chapter_id=chapter_id,
+            practice_no=practice_no,
+            question_no=encode_question_id(r["question_id"]),
+            option_no=encode_option_id(r["selected_option_id"]),
+            is_correct=r["correct"],
+            attempted_at=attempted_at,
+        )
+        for r in result.results
+    ]
+
+
+class AttemptRepository:
+    """Writes and aggregates rows of ``practice_attempts``."""
+
+    _COLUMNS = "(user_id, chapter_id, practice_no, question_no, option_no, is_correct, attempted_at)"
+    _ROW = "(%s, %s, %s, %s, %s, %s, %s)"
+
+    def __init__(self, db: Any) -> None:
+        self._db = db
+
+    def insert_many(self, events: Sequence[AttemptEvent]) -> None:
+        """Insert events with a single multi-row INSERT."""
+
+        if not events:
+            return
+        params: List[Any] = []
+        for e in events:
+            params.extend(
+                (e.user_id, e.chapter_id, e.practice_no, e.question_no, e.option_no, int(e.is_correct), e.attempted_at)
+            )
+        query = f"INSERT INTO practice_attempts {self._COLUMNS} VALUES " + ", ".join([self._ROW] * len(events))
+        with self._db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+
+    def question_stats(
+        self, chapter_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Attempts, correct answers and distinct users per question of a chapter.
+
+        A time range lets MySQL prune partitions to the months involved.
+        """
+
+        query = (
+            "SELECT practice_no, question_no, COUNT(*) AS attempts, SUM(is_correct) AS correct, "
+            "COUNT(DISTINCT user_id) AS users FROM practice_attempts WHERE chapter_id = %s"
+        )
+        params: List[Any] = [chapter_id]
+        if since is not None:
+            query += " AND attempted_at >= %s"
+            params.append(since)
+        if until is not None:
+            query += " AND attempted_at < %s"
+            params.append(until)
+        query += " GROUP BY practice_no, question_no ORDER BY practice_no, question_no"
+
+        with self._db.get_read_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall() or []
+        return [
+            {
+                "practice_id": decode_practice_id(row["practice_no"]),
+                "question_id": decode_question_id(row["question_no"]),
+                "attempts": int(row["attempts"]),
+                "correct": int(row["correct"] or 0),
+                "users": int(row["users"]),
+            }
+            for row in rows
+        ]
+
+    def add_month_partitions(self, months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+        """Split ``p_future`` so monthly partitions exist ``months_ahead`` months out.
+
+        MySQL only (SQLite tables are not partitioned). Run it from a monthly
+        cron job; returns the names of the partitions created.
+        """
+
+        if self._db.dialect != "mysql":
+            return []
+        today = today or date.today()
+        wanted = []
+        year, month = today.year, today.month
+        for _ in range(months_ahead + 1):
+            wanted.append((year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+        with self._db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'practice_attempts'"
+                )
+                existing = {row["name"] for row in cursor.fetchall() or []}
+                # Partitions must stay in ascending order, so only months after
+                # the last existing one can be split off p_future.
+                last = max((name for name in existing if name.startswith("p") and name[1:].isdigit()), default="p000000")
+                created = []
+                parts = []
+                for y, m in wanted:
+                    name = f"p{y:04d}{m:02d}"
+                    if name in existing or name <= last:
+                        continue
+                    ny, nm = (y + 1, 1) if m == 12 else (y, m + 1)
+                    parts.append(f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{ny:04d}-{nm:02d}-01'))")
+                    created.append(name)
+                if parts:
+                    cursor.execute(
+                        "ALTER TABLE practice_attempts REORGANIZE PARTITION p_future INTO ("
+                        + ", ".join(parts)
+                        + ", PARTITION p_future VALUES LESS THAN MAXVALUE)"
+                    )
+        return created
+
+
+class AttemptLogBuffer:
+    """Bounded in-memory queue of attempt events, flushed in batches by a thread."""
+
+    def __init__(self, max_queue: int = 50000, batch_size: int = 1000, flush_interval: float = 1.0) -> None:
+        if batch_size < 1 or max_queue < batch_size:
+            raise ValueError("need 1 <= batch_size <= max_queue")
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._write_fn: Optional[Callable[[Sequence[AttemptEvent]], None]] = None
+
+        self._queue: Deque[AttemptEvent] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.events_received = 0
+        self.events_written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.flush_seconds_last = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["AttemptLogBuffer"]:
+        """Build a buffer from ATTEMPT_LOG_* variables, or None if logging is off."""
+
+        if os.getenv("ATTEMPT_LOG_ENABLED", "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_queue=int(os.getenv("ATTEMPT_LOG_MAX_QUEUE", "50000")),
+            batch_size=int(os.getenv("ATTEMPT_LOG_BATCH_SIZE", "1000")),
+            flush_interval=float(os.getenv("ATTEMPT_LOG_FLUSH_INTERVAL", "1.0")),
+        )
+
+    def start(self, write_fn: Callable[[Sequence[AttemptEvent]], None]) -> None:
+        """Attach the batch writer and start the background flusher."""
+
+        self._write_fn = write_fn
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="attempt-log", daemon=True)
+            self._thread.start()
+
+    def add_many(self, events: Sequence[AttemptEvent]) -> int:
+        """Queue events; returns how many were accepted (the rest are dropped)."""
+
+        with self._lock:
+            self.events_received += len(events)
+            room = self._max_queue - len(self._queue)
+            accepted = events if len(events) <= room else events[:max(room, 0)]
+            self._queue.extend(accepted)
+            self.dropped += len(events) - len(accepted)
+            ready = len(self._queue) >= self._batch_size
+        if ready:
+            self._wakeup.set()
+        return len(accepted)
+
+    def flush(self) -> int:
+        """Write everything queued so far. Returns the number of rows written."""
+
+        written = 0
+        with self._flush_lock:
+            started = time.perf_counter()
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self._batch_size, len(self._queue)))]
+                if not batch:
+                    break
+                try:
+                    self._write_fn(batch)  # type: ignore[misc]
+                except Exception:
+                    logger.exception("Failed to write %d practice attempt events", len(batch))
+                    with self._lock:
+                        self.flush_errors += 1
+                        room = self._max_queue - len(self._queue)
+                        keep = batch[:max(room, 0)]
+                        self.dropped += len(batch) - len(keep)
+                        self._queue.extendleft(reversed(keep))
+                    break
+                written += len(batch)
+            with self._lock:
+                if written:
+                    self.flushes += 1
+                    self.events_written += written
+                    self.flush_seconds_last = time.perf_counter() - started
+        return written
+
+    def close(self) -> None:
+        """Stop the background flusher and write whatever is still queued."""
+
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self._flush_interval * 2, 5.0))
+            self._thread = None
+        if self._write_fn is not None:
+            self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "queued": len(self._queue),
+                "events_received": self.events_received,
+                "events_written": self.events_written,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+                "flush_seconds_last": self.flush_seconds_last,
+            }
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - flush already logs
+                logger.exception("Attempt log flusher failed")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import config  # noqa: F401  (loads backend/.env)
+    from db import database_from_env
+
+    parser = argparse.ArgumentParser(description="Maintain and query the practice_attempts log.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    partitions = commands.add_parser("add-partitions", help="Create the monthly partitions of the coming months")
+    partitions.add_argument("--months-ahead", type=int, default=3, help="Months after the current one (default: 3)")
+    stats = commands.add_parser("question-stats", help="Attempts and correct answers per question of a chapter")
+    stats.add_argument("chapter_id", type=int)
+    stats.add_argument("--since", type=date.fromisoformat, help="First day included (YYYY-MM-DD)")
+    stats.add_argument("--until", type=date.fromisoformat, help="First day excluded (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    db = database_from_env()
+    try:
+        repo = AttemptRepository(db)
+        if args.command == "add-partitions":
+            created = repo.add_month_partitions(args.months_ahead)
+            print(f"created partitions: {', '.join(created)}" if created else "no partitions to create")
+        else:
+            since = None if args.since is None else datetime.combine(args.since, datetime.min.time())
+            until = None if args.until is None else datetime.combine(args.until, datetime.min.time())
+            for row in repo.question_stats(args.chapter_id, since, until):
+                print(json.dumps(row))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
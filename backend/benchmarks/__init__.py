@@ -0,0 +1 @@
+"""Microbenchmarks for the backend (see run.py)."""
@@ -0,0 +1,114 @@
+"""In-memory stand-ins for the repositories in db.py.
+
+They implement the methods the API calls with the same semantics, so the
+Flask endpoints can be benchmarked without a MySQL server.
+"""
+
+from __future__ import annotations
+
+import itertools
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from db import TOKEN_LIFETIME, User, UserCourseProgress
+from progress_buffer import ProgressUpdate
+
+
+class MemoryUserRepository:
+    def __init__(self) -> None:
+        self._ids = itertools.count(1)
+        self._by_code: Dict[str, User] = {}
+        self._by_token: Dict[str, User] = {}
+
+    def get_by_code(self, code: str) -> Optional[User]:
+        return self._by_code.get(code)
+
+    def create(self, code: str, name: Optional[str] = None, token: Optional[str] = None) -> User:
+        user = User(id=next(self._ids), code=code, name=name, token=token)
+        self._by_code[code] = user
+        if token:
+            self._by_token[token] = user
+        return user
+
+    def get_by_token(self, token: str) -> Optional[User]:
+        user = self._by_token.get(token)
+        if user is None or (user.token_expires_at and user.token_expires_at < datetime.now()):
+            return None
+        return user
+
+    def update_token(self, user_id: int, token: str) -> None:
+        for user in self._by_code.values():
+            if user.id == user_id:
+                self._set_token(user, token)
+                return
+
+    def get_or_create_by_code(self, code: str, default_name: str = "Exam User") -> User:
+        return self.get_by_code(code) or self.create(code=code, name=default_name)
+
+    def login_with_code(self, code: str, token: str, default_name: str = "Exam User") -> User:
+        user = self.get_or_create_by_code(code, default_name)
+        self._set_token(user, token)
+        return user
+
+    def _set_token(self, user: User, token: str) -> None:
+        if user.token:
+            self._by_token.pop(user.token, None)
+        user.token = token
+        user.token_expires_at = datetime.now() + TOKEN_LIFETIME
+        self._by_token[token] = user
+
+
+class MemoryProgressRepository:
+    def __init__(self) -> None:
+        self._ids = itertools.count(1)
+        self._rows: Dict[Tuple[int, int], UserCourseProgress] = {}
+
+    def get_for_user(self, user_id: int, course_id: Optional[int] = None) -> List[UserCourseProgress]:
+        return [
+            row
+            for (uid, cid), row in self._rows.items()
+            if uid == user_id and (course_id is None or cid == course_id)
+        ]
+
+    def upsert_progress(
+        self,
+        user_id: int,
+        course_id: int,
+        progress_percent: Optional[int] = None,
+        total_answered: Optional[int] = None,
+        total_correct: Optional[int] = None,
+        fetch: bool = True,
+    ) -> Optional[UserCourseProgress]:
+        row = self._rows.get((user_id, course_id))
+        if row is None:
+            row = UserCourseProgress(
+                id=next(self._ids),
+                user_id=user_id,
+                course_id=course_id,
+                progress_percent=0,
+                total_answered=0,
+                total_correct=0,
+                correct_rate=0.0,
+                submit_at=None,
+            )
+            self._rows[(user_id, course_id)] = row
+        if progress_percent is not None:
+            row.progress_percent = progress_percent
+        if total_answered is not None:
+            row.total_answered = total_answered
+        if total_correct is not None:
+            row.total_correct = total_correct
+        row.correct_rate = (
+            round(row.total_correct * 100.0 / row.total_answered, 2) if row.total_answered > 0 else 0.0
+        )
+        row.submit_at = datetime.now()
+        return row if fetch else None
+
+    def upsert_many(self, updates: Sequence[ProgressUpdate]) -> None:
+        for u in updates:
+            self.upsert_progress(
+                u.user_id, u.course_id, u.progress_percent, u.total_answered, u.total_correct, fetch=False
+            )
+
+    def close(self) -> None:
+        pass
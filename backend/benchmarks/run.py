@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Microbenchmark runner for the backend.
+
+Usage examples (from the backend directory):
+
+    # Run everything and print a table
+    python -m benchmarks.run
+
+    # Only the verifier cases, results saved as JSON
+    python -m benchmarks.run --filter verifier --json results.json
+
+    # Save a baseline, then fail (exit 1) if anything gets >15% slower
+    python -m benchmarks.run --json baseline.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.15
+
+Each case is calibrated to run for at least ``--min-time`` seconds per round
+and is measured for ``--rounds`` rounds; the median ns/op is what gets
+compared. Repository cases run the real repositories on an in-memory SQLite
+database; endpoint cases drive the Flask app through its test client with the
+in-memory repositories from memory_repos.py. No MySQL server is needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_Setup = Callable[[], Callable[[], Any]]
+CASES: List[Tuple[str, _Setup]] = []
+
+
+def case(name: str) -> Callable[[_Setup], _Setup]:
+    """Register a benchmark. The decorated function returns the timed callable."""
+
+    def register(setup: _Setup) -> _Setup:
+        CASES.append((name, setup))
+        return setup
+
+    return register
+
+
+# --- code_verifier ---
+
+@case("verifier.is_code_valid.valid")
+def _is_code_valid_valid():
+    from code_verifier import is_code_valid
+
+    return lambda: is_code_valid("T00010-5E7")
+
+
+@case("verifier.is_code_valid.invalid")
+def _is_code_valid_invalid():
+    from code_verifier import is_code_valid
+
+    return lambda: is_code_valid("T00010-000")
+
+
+@case("verifier.generate_code")
+def _generate_code():
+    from code_verifier import generate_code
+
+    return lambda: generate_code(12345, prefix="T")
+
+
+# --- rate limiting ---
+
+@case("rate_limit.login_guard.check_client")
+def _login_guard_check():
+    from rate_limit import LoginGuard, TokenBucketLimiter
+
+    guard = LoginGuard(ip_limiter=TokenBucketLimiter(1e9, 1e9, maxsize=1000))
+    return lambda: guard.check_client(guard.client("203.0.113.7", None))
+
+
+@case("rate_limit.token_bucket.acquire_evicting")
+def _token_bucket_evicting():
+    from itertools import count
+
+    from rate_limit import TokenBucketLimiter
+
+    limiter = TokenBucketLimiter(1.0, 10, maxsize=10000)
+    keys = (f"T{i % 100000:05d}" for i in count())
+    return lambda: limiter.acquire(next(keys))
+
+
+# --- model serialization ---
+
+@case("serialize.User.to_dict")
+def _user_to_dict():
+    from db import TOKEN_LIFETIME, User
+
+    user = User(id=1, code="T00010-5E7", name="Exam User", token="x" * 43,
+                token_expires_at=datetime.now() + TOKEN_LIFETIME)
+    return user.to_dict
+
+
+@case("serialize.UserCourseProgress.to_dict")
+def _progress_to_dict():
+    from db import UserCourseProgress
+
+    row = UserCourseProgress(id=1, user_id=1, course_id=3, progress_percent=40, total_answered=10,
+                             total_correct=7, correct_rate=70.0, submit_at=datetime.now())
+    return row.to_dict
+
+
+@case("serialize.progress_response_22_courses")
+def _progress_response():
+    from db import UserCourseProgress
+    from jsonutil import dumps
+
+    rows = [UserCourseProgress(i, 1, i, 40, 10, 7, 70.0, datetime.now()) for i in range(1, 23)]
+    return lambda: dumps({"success": True, "items": [row.to_dict() for row in rows]})
+
+
+# --- repositories on embedded SQLite (in-memory, so no disk I/O is timed) ---
+
+def _sqlite_repos():
+    from db import UserCourseProgressRepository, UserRepository
+    from sqlite_db import SQLiteDatabase
+
+    db = SQLiteDatabase(":memory:")
+    return UserRepository(db), UserCourseProgressRepository(db)
+
+
+@case("repository.sqlite.login_with_code")
+def _sqlite_login():
+    users, _ = _sqlite_repos()
+    return lambda: users.login_with_code("T00010-5E7", "token")
+
+
+@case("repository.sqlite.upsert_progress")
+def _sqlite_upsert():
+    users, progress = _sqlite_repos()
+    user_id = users.login_with_code("T00010-5E7", "token").id
+    return lambda: progress.upsert_progress(user_id, 3, progress_percent=45)
+
+
+@case("repository.sqlite.get_for_user_22_courses")
+def _sqlite_get_for_user():
+    users, progress = _sqlite_repos()
+    user_id = users.login_with_code("T00010-5E7", "token").id
+    for course_id in range(1, 23):
+        progress.upsert_progress(user_id, course_id, progress_percent=50, fetch=False)
+    return lambda: progress.get_for_user(user_id)
+
+
+@case("repository.sqlite.attempt_log_insert_500")
+def _sqlite_attempt_insert():
+    from attempt_log import AttemptEvent, AttemptRepository
+    from sqlite_db import SQLiteDatabase
+
+    repo = AttemptRepository(SQLiteDatabase(":memory:"))
+    now = datetime.now()
+    events = [AttemptEvent(1, 10, 1, i % 20 + 1, i % 4 + 1, i % 3 == 0, now) for i in range(500)]
+    return lambda: repo.insert_many(events)
+
+
+# --- endpoints (Flask test client + in-memory repositories) ---
+
+def _client_with_user(courses: int = 0):
+    """Return (client, auth headers) for a logged-in user with *courses* progress rows."""
+
+    from app import create_app
+    from benchmarks.memory_repos import MemoryProgressRepository, MemoryUserRepository
+    from config import AppConfig
+    from sqlite_db import SQLiteDatabase
+
+    app = create_app(AppConfig(warmup="off"), db=SQLiteDatabase(":memory:"))
+    services = app.extensions["exammaster"]
+    services.user_repo = MemoryUserRepository()
+    services.progress_repo = MemoryProgressRepository()
+    # Every case logs in from one address; the limits are benchmarked separately
+    services.login_guard = None
+    client = app.test_client()
+    user = client.post("/api/verify-code", json={"code": "T00010-5E7"}).get_json()["user"]
+    for course_id in range(1, courses + 1):
+        services.progress_repo.upsert_progress(user["id"], course_id, progress_percent=50)
+    return client, {"Authorization": f"Bearer {user['token']}"}
+
+
+@case("endpoint.verify_code.login")
+def _endpoint_login():
+    client, _ = _client_with_user()
+    return lambda: client.post("/api/verify-code", json={"code": "T00010-5E7"})
+
+
+@case("endpoint.verify_code.token")
+def _endpoint_verify_token():
+    client, headers = _client_with_user()
+    return lambda: client.post("/api/verify-code", json={}, headers=headers)
+
+
+@case("endpoint.course_progress.get_22_courses")
+def _endpoint_get_progress():
+    client, headers = _client_with_user(courses=22)
+    return lambda: client.get("/api/course-progress", headers=headers)
+
+
+@case("endpoint.course_progress.post")
+def _endpoint_post_progress():
+    client, headers = _client_with_user()
+    body = {"course_id": 3, "progress_percent": 45}
+    return lambda: client.post("/api/course-progress", json=body, headers=headers)
+
+
+@case("endpoint.course_progress.batch_22")
+def _endpoint_post_batch():
+    client, headers = _client_with_user()
+    body = {"items": [{"course_id": c, "progress_percent": 80} for c in range(1, 23)]}
+    return lambda: client.post("/api/course-progress/batch", json=body, headers=headers)
+
+
+@case("endpoint.cors.preflight")
+def _endpoint_preflight():
+    client, _ = _client_with_user()
+    headers = {"Origin": "http://localhost:5174", "Access-Control-Request-Method": "POST"}
+    return lambda: client.open("/api/course-progress", method="OPTIONS", headers=headers)
+
+
+@case("endpoint.practice.get_gzip")
+def _endpoint_practice_gzip():
+    client, _ = _client_with_user()
+    headers = {"Accept-Encoding": "gzip, br"}
+    return lambda: client.get("/api/practice/1", headers=headers)
+
+
+@case("endpoint.practice.not_modified")
+def _endpoint_practice_304():
+    client, _ = _client_with_user()
+    etag = client.get("/api/practice/1").headers["ETag"]
+    headers = {"If-None-Match": etag}
+    return lambda: client.get("/api/practice/1", headers=headers)
+
+
+@case("endpoint.courses.list_first_page")
+def _endpoint_courses_list():
+    client, _ = _client_with_user()
+    return lambda: client.get("/api/courses")
+
+
+@case("endpoint.courses.filtered")
+def _endpoint_courses_filtered():
+    client, _ = _client_with_user()
+    return lambda: client.get("/api/courses?tag=%E6%8A%80%E5%B7%A7%E7%B1%BB&min_duration=300&max_duration=600&limit=5")
+
+
+# --- runner ---
+
+def measure(fn: Callable[[], Any], rounds: int, min_time: float) -> Dict[str, Any]:
+    # Calibrate: grow the loop count until one round takes at least min_time
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        iterations *= 10 if elapsed < min_time / 10 else 2
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter_ns() - started) / iterations)
+
+    median = statistics.median(samples)
+    return {
+        "iterations": iterations,
+        "rounds": rounds,
+        "ns_per_op": {"min": min(samples), "median": median, "max": max(samples)},
+        "ops_per_sec": 1e9 / median if median else None,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return the names of cases whose median got slower than the threshold allows."""
+
+    regressions = []
+    print(f"\n{'case':48} {'baseline ns':>14} {'current ns':>14} {'change':>9}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:48} {'-':>14} {current['ns_per_op']['median']:>14.0f} {'new':>9}")
+            continue
+        before = base["ns_per_op"]["median"]
+        after = current["ns_per_op"]["median"]
+        change = after / before - 1.0 if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:48} {before:>14.0f} {after:>14.0f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run backend microbenchmarks")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=5, help="Measured rounds per case (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per round (default: 0.1)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15,
+        help="Allowed slowdown vs. baseline before failing, as a fraction (default: 0.15)",
+    )
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    print(f"{'case':48} {'ns/op':>14} {'ops/s':>14}")
+    for name, setup in CASES:
+        if args.filter not in name:
+            continue
+        result = measure(setup(), args.rounds, args.min_time)
+        results[name] = result
+        print(f"{name:48} {result['ns_per_op']['median']:>14.0f} {result['ops_per_sec']:>14.0f}")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: "
+                  + ", ".join(regressions), file=sys.stderr)
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,14 @@ Implements the same algorithm as the frontend `src/utils/codeVerification.js`:
 
 The salt is read from the CODE_SALT environment variable, defaulting to
 ``default-salt-key`` so it is compatible with existing test codes.
+
+The JS hash is a polynomial rolling hash mod 2**32, so
+``hash(index + SALT) = hash(index) * 31**len(SALT) + hash(SALT)``. Both salt
+terms are folded into constants at import time; hashing an index then costs
+one multiply-add per index character instead of a loop over the salt.
+``generate_codes_bulk`` applies the same identity to whole index ranges with
+NumPy (optional dependency, only needed for bulk generation; listed in
+requirements-optional.txt).
 """
 
 from __future__ import annotations
@@ -15,7 +23,12 @@ from __future__ import annotations
 import ctypes
 import os
 import re
-from typing import Optional
+from typing import Iterable, Optional
+
+try:  # NumPy is only required for generate_codes_bulk
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None  # type: ignore[assignment]
 
 DEFAULT_SALT = "exammaster-xinmi"
 SALT = os.getenv("CODE_SALT", DEFAULT_SALT)
@@ -23,8 +36,60 @@ SALT = os.getenv("CODE_SALT", DEFAULT_SALT)
 # One-letter prefix (A–Z), 5 digits, dash, 3 hex chars
 _CODE_REGEX = re.compile(r"^[A-Z]\d{5}-[0-9A-F]{3}$", re.IGNORECASE)
 
+_MASK32 = 0xFFFFFFFF
+_INDEX_LEN = 6  # prefix letter + 5 digits
+
+# Powers of 31 mod 2**32, indexed by exponent; enough for any index we hash
+# on the fast path.
+_POW31 = [pow(31, k, 1 << 32) for k in range(_INDEX_LEN + 1)]
+
+
+def _rolling_hash(text: str) -> int:
+    """Unsigned 32-bit rolling hash of *text* (``h = h * 31 + ord(ch)``)."""
+
+    h = 0
+    for ch in text:
+        h = (h * 31 + ord(ch)) & _MASK32
+    return h
+
+
+# hash(index + SALT) == hash(index) * _SALT_POW + _SALT_HASH  (mod 2**32)
+_SALT_POW = pow(31, len(SALT), 1 << 32)
+_SALT_HASH = _rolling_hash(SALT)
+
+
+def _finish_hash(h: int) -> str:
+    """Map an unsigned 32-bit hash to the JS ``Math.abs(hash).toString(16)`` prefix."""
+
+    if h & 0x80000000:
+        h = (1 << 32) - h  # abs() of the signed 32-bit value
+    return format(h, "x")[:3].upper()
+
 
 def _generate_hash(index: str) -> str:
+    """Generate the 3-character hash for a given index.
+
+    Bit-for-bit compatible with ``_generate_hash_reference`` (the JS
+    algorithm), but the salt contribution is precomputed.
+    """
+
+    n = len(index)
+    if n == _INDEX_LEN:
+        pw = _POW31
+        h = (
+            ord(index[0]) * pw[5]
+            + ord(index[1]) * pw[4]
+            + ord(index[2]) * pw[3]
+            + ord(index[3]) * pw[2]
+            + ord(index[4]) * pw[1]
+            + ord(index[5])
+        )
+    else:
+        h = _rolling_hash(index)
+    return _finish_hash((h * _SALT_POW + _SALT_HASH) & _MASK32)
+
+
+def _generate_hash_reference(index: str) -> str:
     """Generate the 3-character hash for a given index using the JS-like algorithm.
 
     This replicates the JavaScript implementation:
@@ -117,3 +182,67 @@ def is_code_valid(code: str) -> bool:
 
     normalized = code.strip().upper()
     return verify_code_hash(normalized)
+
+
+def generate_codes_bulk(prefixes: Iterable[str], start: int = 0, stop: int = 100000):
+    """Generate codes for every prefix and every index in ``range(start, stop)``.
+
+    Returns a NumPy ``S10`` array of shape ``(len(prefixes), stop - start)``;
+    row *i* holds the codes for ``prefixes[i]`` in index order, as ASCII bytes
+    (e.g. ``b"T00010-5E7"``). All 26 x 100000 codes take a single vectorized
+    pass. Requires NumPy.
+    """
+
+    if np is None:
+        raise RuntimeError("generate_codes_bulk requires numpy (pip install numpy)")
+
+    prefix_list = [p.upper() for p in prefixes]
+    for p in prefix_list:
+        if len(p) != 1 or not p.isalpha() or not p.isascii():
+            raise ValueError("prefix must be a single alphabetic character (A–Z)")
+    if not 0 <= start <= stop <= 100000:
+        raise ValueError("require 0 <= start <= stop <= 100000")
+
+    count = stop - start
+    idx = np.arange(start, stop, dtype=np.uint64)
+
+    # Digit characters, most significant first
+    digits = np.empty((5, count), dtype=np.uint64)
+    rest = idx.copy()
+    for pos in range(4, -1, -1):
+        digits[pos] = rest % 10 + ord("0")
+        rest //= 10
+
+    # hash(index) without the prefix letter; every value fits easily in uint64
+    digit_hash = np.zeros(count, dtype=np.uint64)
+    for pos in range(5):
+        digit_hash += digits[pos] * np.uint64(_POW31[4 - pos])
+
+    prefix_codes = np.array([ord(p) for p in prefix_list], dtype=np.uint64)
+    index_hash = (prefix_codes[:, None] * np.uint64(_POW31[5]) + digit_hash[None, :]) & np.uint64(_MASK32)
+    # The product stays exact mod 2**64, hence also mod 2**32
+    h = (index_hash * np.uint64(_SALT_POW) + np.uint64(_SALT_HASH)) & np.uint64(_MASK32)
+
+    # abs() of the signed 32-bit value
+    h = np.where(h & np.uint64(0x80000000), np.uint64(1 << 32) - h, h)
+
+    # Number of hex digits of h (at least 1), then its leading <= 3 digits
+    ndigits = np.ones(h.shape, dtype=np.uint64)
+    for k in range(1, 9):
+        ndigits += h >= np.uint64(16 ** k)
+    length = np.minimum(ndigits, np.uint64(3))
+    top = h >> (np.uint64(4) * (ndigits - length))
+
+    hex_chars = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+    out = np.zeros(h.shape + (10,), dtype=np.uint8)
+    out[..., 0] = prefix_codes[:, None].astype(np.uint8)
+    out[..., 1:6] = digits.T.astype(np.uint8)[None, :, :]
+    out[..., 6] = ord("-")
+    for j in range(3):
+        present = length > j
+        shift = np.where(present, np.uint64(4) * (length - 1 - j), np.uint64(0))
+        nibble = (top >> shift) & np.uint64(0xF)
+        # Missing trailing digits stay NUL, which the S10 dtype strips
+        out[..., 7 + j] = np.where(present, hex_chars[nibble.astype(np.intp)], 0)
+
+    return out.reshape(-1).view("S10").reshape(h.shape)
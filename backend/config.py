@@ -1,8 +1,69 @@
-"""Load environment variables from .env file."""
+"""Load environment variables from .env file.
 
+``AppConfig`` collects the settings ``app.create_app`` reads itself; the
+components it builds (database, caches, buffers, ...) still read their own
+variables through their ``from_env`` constructors.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
 from pathlib import Path
+
 from dotenv import load_dotenv
 
 # Load .env file from backend directory
 env_file = Path(__file__).parent / ".env"
 load_dotenv(env_file)
+
+WARMUP_MODES = ("sync", "background", "off")
+
+
+@dataclass
+class AppConfig:
+    """Application settings for ``create_app``.
+
+    Configuration is taken from environment variables:
+    - ADMIN_TOKEN (default: empty, which disables /api/admin/*)
+    - PRACTICE_CACHE_CONTROL / COURSES_CACHE_CONTROL (default: public, no-cache)
+    - PRACTICE_SERVE_ANSWER_KEYS (default: 1)
+    - PROGRESS_BATCH_MAX_ITEMS (default: 500 items per
+      POST /api/course-progress/batch request)
+    - WARMUP: ``sync`` (default; warm up before create_app returns),
+      ``background`` (serve at once, /readyz reports 503 until warm) or ``off``
+    - WARMUP_DB_CONNECTIONS (default: 2 pooled connections opened per database)
+    - WARMUP_TOKEN_CACHE (default: 1000 most recently issued tokens preloaded)
+    - WARMUP_RETRY_INTERVAL (default: 5 seconds between attempts after a
+      failed warm-up)
+    """
+
+    admin_token: str = ""
+    practice_cache_control: str = "public, no-cache"
+    courses_cache_control: str = "public, no-cache"
+    # Set to False once clients grade through POST /api/practice/<id>/submit:
+    # the chapter is then served without correctAnswerId/explanation fields.
+    practice_serve_answer_keys: bool = True
+    progress_batch_max_items: int = 500
+    warmup: str = "sync"
+    warmup_db_connections: int = 2
+    warmup_token_cache: int = 1000
+    warmup_retry_interval: float = 5.0
+
+    def __post_init__(self) -> None:
+        if self.warmup not in WARMUP_MODES:
+            raise ValueError(f"warmup must be one of: {', '.join(WARMUP_MODES)}")
+
+    @classmethod
+    def from_env(cls) -> "AppConfig":
+        return cls(
+            admin_token=os.getenv("ADMIN_TOKEN", ""),
+            practice_cache_control=os.getenv("PRACTICE_CACHE_CONTROL", "public, no-cache"),
+            courses_cache_control=os.getenv("COURSES_CACHE_CONTROL", "public, no-cache"),
+            practice_serve_answer_keys=os.getenv("PRACTICE_SERVE_ANSWER_KEYS", "1").lower() in ("1", "true", "yes"),
+            progress_batch_max_items=int(os.getenv("PROGRESS_BATCH_MAX_ITEMS", "500")),
+            warmup=os.getenv("WARMUP", "sync").lower(),
+            warmup_db_connections=int(os.getenv("WARMUP_DB_CONNECTIONS", "2")),
+            warmup_token_cache=int(os.getenv("WARMUP_TOKEN_CACHE", "1000")),
+            warmup_retry_interval=float(os.getenv("WARMUP_RETRY_INTERVAL", "5")),
+        )
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""Build the practice chapters into validated, pre-rendered static bundles.
+
+The SPA loads ``public/practice/<chapterId>.json`` and renders each markdown
+``passage`` with ReactMarkdown on every view; a malformed file only shows up
+when someone opens it. This command moves that work to build time:
+
+- every chapter file is checked against the chapter schema (see
+  ``validate_chapter``); any error fails the build and nothing is written
+- passages are rendered once to sanitized HTML (``render_markdown``) and
+  shipped as ``passageHtml``, which the SPA inserts as is
+- each chapter is written minified under a content-hashed name, with
+  precompressed ``.gz`` (and ``.br`` if the optional ``brotli`` package is
+  installed) siblings, so the host can serve them with
+  ``Cache-Control: public, max-age=31536000, immutable``
+- ``manifest.json`` maps chapter ids to their current file; it is the only
+  output that must be revalidated (``no-cache``)
+
+Builds are incremental: the manifest records the hash of each source file,
+and chapters whose source and build options are unchanged are not rebuilt.
+Files no longer referenced by the manifest are removed.
+
+Usage examples (from the backend directory):
+
+    # Build public/practice into public/content
+    python content_build.py
+
+    # Only validate (e.g. in CI)
+    python content_build.py --check
+
+    # Bundles without answer keys, for server-side grading
+    python content_build.py --strip-answers
+
+The SPA uses the bundles when built with
+``VITE_PRACTICE_MANIFEST=/content/manifest.json``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from grading import strip_answers
+from payloads import EncodedPayload
+from practice_store import _CHAPTER_ID_RE, DEFAULT_PRACTICE_DIR
+
+DEFAULT_OUTPUT_DIR = DEFAULT_PRACTICE_DIR.parent / "content"
+MANIFEST_NAME = "manifest.json"
+CHAPTERS_SUBDIR = "chapters"
+MANIFEST_VERSION = 1
+# Bump when render_markdown's output changes so existing bundles are rebuilt
+RENDERER_VERSION = 2
+
+# Class names Practice.jsx gives the rendered passage elements
+PASSAGE_CLASSES: Dict[str, str] = {
+    "h1": "text-2xl font-bold my-3",
+    "h2": "text-xl font-bold my-2",
+    "h3": "text-lg font-bold my-2",
+    "p": "my-2",
+    "ul": "list-disc list-inside my-2",
+    "ol": "list-decimal list-inside my-2",
+    "li": "my-1",
+    "strong": "font-bold",
+    "em": "italic",
+}
+
+# Inline HTML allowed in passages. Attributes are dropped; any other tag is
+# escaped and shows up as text.
+ALLOWED_INLINE_TAGS = frozenset(("u", "b", "i", "em", "strong", "s", "sub", "sup", "mark", "small", "br"))
+SAFE_URL_SCHEMES = ("http:", "https:", "mailto:")
+
+
+# --- Schema ---
+
+def _is_text(value: Any) -> bool:
+    return isinstance(value, str) and value.strip() != ""
+
+
+def validate_chapter(data: Any, chapter_id: str) -> List[str]:
+    """Return every schema error of a chapter file (empty if it is valid).
+
+    Errors are prefixed with the JSON path they concern, e.g.
+    ``practices[0].questions[2].correctAnswerId: 'E' is not an option id``.
+    """
+
+    if not isinstance(data, dict):
+        return ["top-level JSON value must be an object"]
+    errors: List[str] = []
+    if str(data.get("chapterId", "")) != chapter_id:
+        errors.append(f"chapterId: expected {chapter_id!r} (the file name), got {data.get('chapterId')!r}")
+    practices = data.get("practices")
+    if not isinstance(practices, list) or not practices:
+        errors.append("practices: must be a non-empty list")
+        return errors
+
+    practice_ids = set()
+    for p, practice in enumerate(practices):
+        where = f"practices[{p}]"
+        if not isinstance(practice, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+        practice_id = practice.get("practiceId")
+        if not _is_text(practice_id):
+            errors.append(f"{where}.practiceId: must be a non-empty string")
+        elif practice_id in practice_ids:
+            errors.append(f"{where}.practiceId: duplicate {practice_id!r}")
+        else:
+            practice_ids.add(practice_id)
+        for name in ("title", "passage"):
+            if name in practice and not isinstance(practice[name], str):
+                errors.append(f"{where}.{name}: must be a string")
+        questions = practice.get("questions")
+        if not isinstance(questions, list) or not questions:
+            errors.append(f"{where}.questions: must be a non-empty list")
+            continue
+        question_ids = set()
+        for q, question in enumerate(questions):
+            errors.extend(_validate_question(question, f"{where}.questions[{q}]", question_ids))
+    return errors
+
+
+def _validate_question(question: Any, where: str, seen_ids: set) -> List[str]:
+    if not isinstance(question, dict):
+        return [f"{where}: must be an object"]
+    errors: List[str] = []
+    question_id = question.get("id")
+    if not _is_text(question_id):
+        errors.append(f"{where}.id: must be a non-empty string")
+    elif question_id in seen_ids:
+        # Question ids key answers within a practice (see grading.py)
+        errors.append(f"{where}.id: duplicate {question_id!r} in this practice")
+    else:
+        seen_ids.add(question_id)
+    if not _is_text(question.get("text")):
+        errors.append(f"{where}.text: must be a non-empty string")
+    if "explanation" in question and not isinstance(question["explanation"], str):
+        errors.append(f"{where}.explanation: must be a string")
+
+    options = question.get("options")
+    if not isinstance(options, list) or len(options) < 2:
+        errors.append(f"{where}.options: must be a list of at least 2 options")
+        return errors
+    option_ids: List[str] = []
+    for o, option in enumerate(options):
+        if not isinstance(option, dict):
+            errors.append(f"{where}.options[{o}]: must be an object")
+            continue
+        option_id = option.get("id")
+        if not _is_text(option_id):
+            errors.append(f"{where}.options[{o}].id: must be a non-empty string")
+        elif option_id in option_ids:
+            errors.append(f"{where}.options[{o}].id: duplicate {option_id!r}")
+        else:
+            option_ids.append(option_id)
+        if not _is_text(option.get("text")):
+            errors.append(f"{where}.options[{o}].text: must be a non-empty string")
+
+    correct = question.get("correctAnswerId")
+    if correct is None:
+        errors.append(f"{where}.correctAnswerId: missing")
+    elif correct not in option_ids:
+        errors.append(f"{where}.correctAnswerId: {correct!r} is not an option id ({', '.join(option_ids)})")
+    return errors
+
+
+# --- Markdown ---
+#
+# A small renderer for the markdown the passages use: ATX headings,
+# paragraphs, bullet and numbered lists, block quotes, thematic breaks, and
+# inline **strong**, *em*, `code`, [links](url), hard breaks and the tags in
+# ALLOWED_INLINE_TAGS. Everything else is escaped text, so the output is safe
+# to insert without a client-side sanitizer.
+
+_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))??(?:[ \t]+#+)?[ \t]*$")
+_BULLET_RE = re.compile(r"^ {0,3}[-*+][ \t]+(.*)$")
+_ORDERED_RE = re.compile(r"^ {0,3}(\d{1,9})[.)][ \t]+(.*)$")
+_QUOTE_RE = re.compile(r"^ {0,3}>[ ]?(.*)$")
+_SETEXT_RE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+_RULE_RE = re.compile(r"^ {0,3}(?:(?:\*[ \t]*){3,}|(?:-[ \t]*){3,}|(?:_[ \t]*){3,})$")
+
+_TAG_RE = re.compile(r"<(/?)([A-Za-z][A-Za-z0-9]*)(?:\s[^<>]*)?\s*/?>")
+_ESCAPE_RE = re.compile(r"\\([!-/:-@\[-`{-~])")
+_CODE_RE = re.compile(r"(`+)(.+?)\1", re.S)
+_LINK_RE = re.compile(r"\[([^\[\]]+)\]\(\s*([^\s()]+)\s*\)")
+_STRONG_RE = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*|(?<![\w_])__(?=\S)(.+?)(?<=\S)__(?![\w_])", re.S)
+_EM_RE = re.compile(r"\*(?=[^\s*])(.+?)(?<=[^\s*])\*|(?<![\w_])_(?=[^\s_])(.+?)(?<=[^\s_])_(?![\w_])", re.S)
+_PLACEHOLDER_RE = re.compile("\x00(\\d+)\x00")
+# Tags in rendered output; text there is escaped, so every "<" starts one
+_OUTPUT_TAG_RE = re.compile(r"<(/?)([a-z]+)[^>]*>")
+
+
+def _open_tag(tag: str, classes: Mapping[str, str]) -> str:
+    css = classes.get(tag)
+    return f'<{tag} class="{css}">' if css else f"<{tag}>"
+
+
+def render_inline(text: str, classes: Mapping[str, str] = PASSAGE_CLASSES) -> str:
+    """Render inline markdown of one block to sanitized HTML."""
+
+    # Code spans, escapes and allowed tags are swapped for placeholders so the
+    # emphasis patterns below neither see nor break them.
+    held: List[str] = []
+
+    def hold(fragment: str) -> str:
+        held.append(fragment)
+        return f"\x00{len(held) - 1}\x00"
+
+    text = text.replace("\x00", "")
+    text = _CODE_RE.sub(lambda m: hold(f"<code>{html.escape(m.group(2).strip(), quote=False)}</code>"), text)
+    text = _ESCAPE_RE.sub(lambda m: hold(html.escape(m.group(1), quote=False)), text)
+
+    def tag(m: "re.Match[str]") -> str:
+        name = m.group(2).lower()
+        if name not in ALLOWED_INLINE_TAGS:
+            return m.group(0)  # escaped below
+        if name == "br":
+            return hold("<br>")
+        return hold(f"</{name}>" if m.group(1) else _open_tag(name, classes))
+
+    text = html.escape(_TAG_RE.sub(tag, text), quote=False)
+
+    def link(m: "re.Match[str]") -> str:
+        href = html.unescape(m.group(2))
+        if ":" in href.split("/", 1)[0] and not href.lower().startswith(SAFE_URL_SCHEMES):
+            return m.group(1)
+        return f'<a href="{html.escape(href)}">{m.group(1)}</a>'
+
+    text = _LINK_RE.sub(link, text)
+    text = _STRONG_RE.sub(lambda m: f"{_open_tag('strong', classes)}{m.group(1) or m.group(2)}</strong>", text)
+    text = _EM_RE.sub(lambda m: f"{_open_tag('em', classes)}{m.group(1) or m.group(2)}</em>", text)
+    # Hard line breaks: two trailing spaces or a backslash before a newline
+    text = re.sub(r"(?: {2,}|\\)\n", "<br>\n", text)
+    return _balance_tags(_PLACEHOLDER_RE.sub(lambda m: held[int(m.group(1))], text))
+
+
+def _balance_tags(text: str) -> str:
+    """Make the tags of one rendered span nest properly.
+
+    Emphasis can pair up across an inline tag or link (``**<i>x**</i>``).
+    As browsers do, a closing tag first closes the elements opened inside
+    it; a closing tag with nothing open to close is dropped, and elements
+    still open at the end are closed there.
+    """
+
+    out: List[str] = []
+    open_tags: List[str] = []
+    pos = 0
+    for m in _OUTPUT_TAG_RE.finditer(text):
+        out.append(text[pos:m.start()])
+        pos = m.end()
+        name = m.group(2)
+        if name == "br":
+            out.append(m.group(0))
+        elif not m.group(1):
+            open_tags.append(name)
+            out.append(m.group(0))
+        elif name in open_tags:
+            while True:
+                inner = open_tags.pop()
+                out.append(f"</{inner}>")
+                if inner == name:
+                    break
+    out.append(text[pos:])
+    out.extend(f"</{name}>" for name in reversed(open_tags))
+    return "".join(out)
+
+
+def render_markdown(text: str, classes: Mapping[str, str] = PASSAGE_CLASSES) -> str:
+    """Render a passage to sanitized HTML (see the notes above)."""
+
+    return "\n".join(_render_blocks(text.replace("\r\n", "\n").replace("\t", "    ").split("\n"), classes))
+
+
+def _render_blocks(lines: List[str], classes: Mapping[str, str]) -> List[str]:
+    out: List[str] = []
+    paragraph: List[str] = []
+    # (tag, items, start number), each item a list of lines
+    list_block: Optional[Tuple[str, List[List[str]], int]] = None
+    quote: Optional[List[str]] = None
+
+    def flush() -> None:
+        nonlocal list_block, quote
+        if paragraph:
+            out.append(f"{_open_tag('p', classes)}{render_inline(chr(10).join(paragraph).strip(), classes)}</p>")
+            paragraph.clear()
+        if list_block is not None:
+            tag, items, start = list_block
+            rendered = "".join(
+                f"{_open_tag('li', classes)}{render_inline(chr(10).join(item).strip(), classes)}</li>" for item in items
+            )
+            opening = _open_tag(tag, classes)
+            if start != 1:
+                opening = f'{opening[:-1]} start="{start}">'
+            out.append(f"{opening}{rendered}</{tag}>")
+            list_block = None
+        if quote is not None:
+            out.append(f"<blockquote>{''.join(_render_blocks(quote, classes))}</blockquote>")
+            quote = None
+
+    for line in lines:
+        if not line.strip():
+            flush()
+            continue
+        quoted = _QUOTE_RE.match(line)
+        if quote is not None:
+            # Unquoted lines continue the quote until a blank line
+            quote.append(quoted.group(1) if quoted else line)
+            continue
+        if quoted:
+            flush()
+            quote = [quoted.group(1)]
+            continue
+        setext = _SETEXT_RE.match(line) if paragraph else None
+        if setext:
+            tag = "h1" if setext.group(1)[0] == "=" else "h2"
+            out.append(f"{_open_tag(tag, classes)}{render_inline(chr(10).join(paragraph).strip(), classes)}</{tag}>")
+            paragraph.clear()
+            continue
+        if _RULE_RE.match(line):
+            flush()
+            out.append("<hr>")
+            continue
+        heading = _HEADING_RE.match(line)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            tag = f"h{level}"
+            out.append(f"{_open_tag(tag, classes)}{render_inline((heading.group(2) or '').strip(), classes)}</{tag}>")
+            continue
+        bullet = _BULLET_RE.match(line)
+        ordered = None if bullet else _ORDERED_RE.match(line)
+        if ordered and paragraph and ordered.group(1) != "1":
+            ordered = None  # only "1." may interrupt a paragraph
+        if bullet or ordered:
+            tag = "ul" if bullet else "ol"
+            if list_block is None or list_block[0] != tag:
+                flush()
+                list_block = (tag, [], 1 if bullet else int(ordered.group(1)))
+            list_block[1].append([bullet.group(1) if bullet else ordered.group(2)])
+            continue
+        if list_block is not None:
+            list_block[1][-1].append(line)  # continuation of the last item
+        else:
+            paragraph.append(line)
+    flush()
+    return out
+
+
+# --- Build ---
+
+@dataclass
+class BuildReport:
+    chapters: int = 0
+    built: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    bytes_source: int = 0
+    bytes_bundle: int = 0
+    bytes_gzip: int = 0
+    bytes_br: int = 0
+    seconds: float = 0.0
+    # "<file>: <path>: <message>" lines; a build with errors writes nothing
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "chapters": self.chapters,
+            "built": self.built,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+            "bytes_source": self.bytes_source,
+            "bytes_bundle": self.bytes_bundle,
+            "bytes_gzip": self.bytes_gzip,
+            "bytes_br": self.bytes_br,
+            "seconds": round(self.seconds, 3),
+            "errors": len(self.errors),
+        }
+
+
+def build_chapter(data: Dict[str, Any], strip: bool = False, keep_markdown: bool = False) -> Dict[str, Any]:
+    """The bundled form of a valid chapter: passages pre-rendered, optionally without answers."""
+
+    practices = []
+    for practice in data["practices"]:
+        practice = dict(practice)
+        passage = practice.get("passage")
+        if passage:
+            practice["passageHtml"] = render_markdown(passage)
+        if not keep_markdown:
+            practice.pop("passage", None)
+        practices.append(practice)
+    chapter = {**data, "practices": practices}
+    return strip_answers(chapter) if strip else chapter
+
+
+def _write_atomic(path: Path, body: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+
+
+def _load_manifest(path: Path) -> Dict[str, Any]:
+    try:
+        manifest = json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def build(
+    source_dir: Union[str, Path] = DEFAULT_PRACTICE_DIR,
+    output_dir: Union[str, Path] = DEFAULT_OUTPUT_DIR,
+    strip: bool = False,
+    keep_markdown: bool = False,
+    force: bool = False,
+    check_only: bool = False,
+) -> BuildReport:
+    """Validate every chapter in *source_dir* and (re)build the changed ones.
+
+    All chapters are validated and rendered before anything is written, so a
+    failed build leaves the previous output untouched. With *check_only* the
+    chapters are only validated.
+    """
+
+    source_dir, output_dir = Path(source_dir), Path(output_dir)
+    report = BuildReport()
+    started = time.perf_counter()
+    options = {"strip_answers": strip, "keep_markdown": keep_markdown, "renderer": RENDERER_VERSION}
+
+    previous = _load_manifest(output_dir / MANIFEST_NAME)
+    reusable: Dict[str, Any] = {}
+    if not force and previous.get("version") == MANIFEST_VERSION and previous.get("options") == options:
+        reusable = previous.get("chapters") or {}
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    pending: List[Tuple[str, EncodedPayload]] = []
+    for path in sorted(source_dir.glob("*.json")):
+        chapter_id = path.stem
+        if not _CHAPTER_ID_RE.match(chapter_id):
+            continue
+        report.chapters += 1
+        source = path.read_bytes()
+        report.bytes_source += len(source)
+        source_hash = hashlib.blake2b(source, digest_size=16).hexdigest()
+
+        entry = reusable.get(chapter_id)
+        if (
+            not check_only
+            and isinstance(entry, dict)
+            and entry.get("source_hash") == source_hash
+            and all((output_dir / name).is_file() for name in _entry_files(entry))
+        ):
+            entries[chapter_id] = entry
+            report.unchanged += 1
+            continue
+
+        try:
+            data = json.loads(source)
+        except ValueError as exc:
+            report.errors.append(f"{path.name}: invalid JSON: {exc}")
+            continue
+        errors = validate_chapter(data, chapter_id)
+        if errors:
+            report.errors.extend(f"{path.name}: {error}" for error in errors)
+            continue
+        if check_only:
+            continue
+
+        payload = EncodedPayload.from_json(build_chapter(data, strip, keep_markdown))
+        digest = hashlib.blake2b(payload.identity, digest_size=8).hexdigest()
+        entries[chapter_id] = {
+            "file": f"{CHAPTERS_SUBDIR}/{chapter_id}.{digest}.json",
+            "hash": digest,
+            "source_hash": source_hash,
+            "practices": len(data["practices"]),
+            "questions": sum(len(p["questions"]) for p in data["practices"]),
+            **payload.sizes(),
+        }
+        pending.append((chapter_id, payload))
+
+    if report.errors or check_only:
+        report.seconds = time.perf_counter() - started
+        return report
+
+    chapters_dir = output_dir / CHAPTERS_SUBDIR
+    chapters_dir.mkdir(parents=True, exist_ok=True)
+    for chapter_id, payload in pending:
+        name = entries[chapter_id]["file"]
+        _write_atomic(output_dir / name, payload.identity)
+        if payload.gzip is not None:
+            _write_atomic(output_dir / f"{name}.gz", payload.gzip)
+        if payload.br is not None:
+            _write_atomic(output_dir / f"{name}.br", payload.br)
+    report.built = len(pending)
+
+    # The manifest goes last: it never points at a file that is not there yet
+    manifest = {"version": MANIFEST_VERSION, "options": options, "chapters": entries}
+    _write_atomic(output_dir / MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8") + b"\n")
+
+    referenced = {name for entry in entries.values() for name in _entry_files(entry)}
+    for path in chapters_dir.iterdir():
+        if path.is_file() and f"{CHAPTERS_SUBDIR}/{path.name}" not in referenced:
+            path.unlink()
+            report.removed += 1
+
+    for entry in entries.values():
+        report.bytes_bundle += entry.get("identity", 0)
+        report.bytes_gzip += entry.get("gzip", 0)
+        report.bytes_br += entry.get("br", 0)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _entry_files(entry: Mapping[str, Any]) -> List[str]:
+    name = entry["file"]
+    files = [name]
+    if entry.get("gzip"):
+        files.append(f"{name}.gz")
+    if entry.get("br"):
+        files.append(f"{name}.br")
+    return files
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate practice chapters and build hashed, precompressed bundles.")
+    parser.add_argument(
+        "--source", default=os.getenv("PRACTICE_DIR", str(DEFAULT_PRACTICE_DIR)),
+        help="Directory of <chapterId>.json files (default: PRACTICE_DIR or public/practice)",
+    )
+    parser.add_argument("--out", default=str(DEFAULT_OUTPUT_DIR), help="Output directory (default: public/content)")
+    parser.add_argument("--strip-answers", action="store_true", help="Leave out correctAnswerId and explanation")
+    parser.add_argument("--keep-markdown", action="store_true", help="Keep the markdown passage next to passageHtml")
+    parser.add_argument("--force", action="store_true", help="Rebuild every chapter, even if unchanged")
+    parser.add_argument("--check", action="store_true", help="Validate only; write nothing")
+    args = parser.parse_args(argv)
+
+    if not Path(args.source).is_dir():
+        parser.error(f"source directory {args.source} does not exist")
+
+    report = build(args.source, args.out, args.strip_answers, args.keep_markdown, args.force, args.check)
+    for error in report.errors:
+        print(f"error: {error}", file=sys.stderr)
+    print(json.dumps(report.to_dict()))
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+"""CORS policy shared by the Flask app and the native ASGI app.
+
+``CorsPolicy.from_env()`` parses the configuration once at startup into an
+exact-origin set and a tuple of ``*.domain`` suffixes, so checking an origin
+is a set lookup plus one ``str.endswith``. The response headers that do not
+depend on the origin are built once as well.
+
+``CorsPreflightMiddleware`` answers preflight requests (OPTIONS with an
+Access-Control-Request-Method header) before they reach Flask routing, and
+``Access-Control-Max-Age`` lets browsers reuse a preflight result instead of
+sending one before every POST.
+
+Configuration:
+- CORS_ALLOW_ORIGIN: comma-separated origins, ``*.example.com`` patterns for
+  any subdomain, or ``*`` for all origins (default; not recommended for
+  production)
+- CORS_MAX_AGE: seconds browsers may cache a preflight (default: 7200, the
+  most Chromium honours)
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+import metrics
+
+ALLOW_HEADERS = "Content-Type, Authorization"
+ALLOW_METHODS = "GET, POST, OPTIONS"
+
+
+def get_allowed_origins() -> list[str]:
+    """Parse allowed origins from CORS_ALLOW_ORIGIN env variable.
+
+    Format: comma-separated list of origins
+    Example: http://localhost:5174,https://example.com,https://app.example.com
+    Special value '*' allows all origins (not recommended for production)
+    """
+    cors_env = os.getenv("CORS_ALLOW_ORIGIN", "*")
+    if cors_env == "*":
+        return ["*"]
+    return [origin.strip() for origin in cors_env.split(",") if origin.strip()]
+
+
+class CorsPolicy:
+    """Allowed origins and CORS response headers, compiled once."""
+
+    def __init__(self, allowed_origins: Sequence[str], max_age: int = 7200) -> None:
+        self.allow_all = "*" in allowed_origins
+        self.exact = frozenset(o for o in allowed_origins if not o.startswith("*."))
+        # "*.example.com" -> ".example.com": matches subdomains only, so
+        # "https://evilexample.com" does not pass
+        self.suffixes: Tuple[str, ...] = tuple(o[1:] for o in allowed_origins if o.startswith("*."))
+        self.max_age = max_age
+
+        self._common: List[Tuple[str, str]] = [
+            ("Access-Control-Allow-Headers", ALLOW_HEADERS),
+            ("Access-Control-Allow-Methods", ALLOW_METHODS),
+            ("Access-Control-Allow-Credentials", "true"),
+        ]
+        self._all_origins = [("Access-Control-Allow-Origin", "*")] + self._common
+        self._max_age_header = ("Access-Control-Max-Age", str(max_age))
+
+    @classmethod
+    def from_env(cls) -> "CorsPolicy":
+        return cls(get_allowed_origins(), max_age=int(os.getenv("CORS_MAX_AGE", "7200")))
+
+    def allowed_origin(self, origin: Optional[str]) -> Optional[str]:
+        """Value for Access-Control-Allow-Origin, or None if *origin* is not allowed."""
+
+        if self.allow_all:
+            return "*"
+        if not origin:
+            return None
+        if origin in self.exact or (self.suffixes and origin.endswith(self.suffixes)):
+            return origin
+        return None
+
+    def headers(self, origin: Optional[str]) -> List[Tuple[str, str]]:
+        """Return the CORS response headers for a request from *origin*."""
+
+        if self.allow_all:
+            return self._all_origins
+        allowed = self.allowed_origin(origin)
+        if allowed is None:
+            return self._common
+        # The response depends on the Origin header; keep caches from mixing them up
+        return [("Access-Control-Allow-Origin", allowed), ("Vary", "Origin")] + self._common
+
+    def preflight_headers(self, origin: Optional[str]) -> List[Tuple[str, str]]:
+        """Headers for a preflight response: ``headers()`` plus Access-Control-Max-Age."""
+
+        return self.headers(origin) + [self._max_age_header]
+
+
+def is_preflight(method: str, request_method_header: Optional[str]) -> bool:
+    return method == "OPTIONS" and bool(request_method_header)
+
+
+class CorsPreflightMiddleware:
+    """WSGI middleware answering CORS preflights without entering the app."""
+
+    def __init__(self, app: Callable[..., Iterable[bytes]], policy: CorsPolicy) -> None:
+        self.app = app
+        self.policy = policy
+
+    def __call__(self, environ: dict, start_response: Callable[..., Any]) -> Iterable[bytes]:
+        if not is_preflight(environ.get("REQUEST_METHOD", ""), environ.get("HTTP_ACCESS_CONTROL_REQUEST_METHOD")):
+            return self.app(environ, start_response)
+
+        started = time.perf_counter()
+        headers = self.policy.preflight_headers(environ.get("HTTP_ORIGIN")) + [("Content-Length", "0")]
+        start_response("204 No Content", headers)
+        metrics.finish_request("preflight", "OPTIONS", 204, time.perf_counter() - started)
+        return [b""]
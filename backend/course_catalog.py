@@ -0,0 +1,269 @@
+"""Indexed, in-memory course catalog served by ``GET /api/courses``.
+
+``courses.json`` (``{"meta": {...}, "courses": [{id, name, duration, url,
+tags}, ...]}``) is loaded into an immutable ``CourseIndex``:
+
+- ``by_id``: course id -> position in file order
+- ``by_tag``: inverted index, tag -> sorted positions
+- ``by_duration``: (duration, position) pairs sorted by duration, so a
+  duration range is two bisects
+
+Queries combine the indexes (tags are ANDed), keep file order, and page with
+an opaque cursor naming the last course returned, so paging stays stable
+across reloads. Responses for the common queries (first page of everything
+and of each single tag) are encoded once when the index is built; other
+results are cached per index in a small LRU.
+
+``CourseCatalog`` re-checks the file at most every ``reload_interval``
+seconds and swaps in a freshly built index when it changed; requests
+already holding the old index finish against it. A file that fails to load
+keeps the previous index and is not read again until it changes.
+
+Configuration is taken from environment variables:
+- COURSES_FILE (default: public/courses.json in the repository)
+- COURSES_RELOAD_INTERVAL (default: 2 seconds)
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from payloads import EncodedPayload
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COURSES_FILE = Path(__file__).resolve().parent.parent / "public" / "courses.json"
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+_QUERY_CACHE_SIZE = 256
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor is malformed or names an unknown course."""
+
+
+def encode_cursor(course_id: str) -> str:
+    return base64.urlsafe_b64encode(course_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid 'cursor'")
+
+
+class CourseIndex:
+    """Immutable snapshot of the catalog with its lookup indexes."""
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        courses = data.get("courses")
+        if not isinstance(courses, list):
+            raise ValueError("'courses' must be a list")
+        self.meta: Optional[Dict[str, Any]] = data.get("meta")
+        self.courses: List[Dict[str, Any]] = courses
+
+        self.by_id: Dict[str, int] = {}
+        self.by_tag: Dict[str, List[int]] = {}
+        durations: List[Tuple[int, int]] = []
+        for pos, course in enumerate(courses):
+            if not isinstance(course, dict) or "id" not in course:
+                raise ValueError(f"course #{pos} has no 'id'")
+            course_id = str(course["id"])
+            if course_id in self.by_id:
+                raise ValueError(f"duplicate course id {course_id!r}")
+            self.by_id[course_id] = pos
+            for tag in course.get("tags") or ():
+                self.by_tag.setdefault(tag, []).append(pos)
+            durations.append((int(course.get("duration") or 0), pos))
+        durations.sort()
+        self.by_duration = durations
+        self._duration_keys = [d for d, _ in durations]
+
+        self._cache: "OrderedDict[Tuple[Any, ...], EncodedPayload]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Precomputed: first page of everything and of every single tag
+        self._precomputed: Dict[Tuple[Any, ...], EncodedPayload] = {}
+        for tags in [()] + [(tag,) for tag in sorted(self.by_tag)]:
+            key = (tags, None, None, None, DEFAULT_LIMIT)
+            self._precomputed[key] = self._encode(*key)
+
+    def get(self, course_id: str) -> Optional[Dict[str, Any]]:
+        pos = self.by_id.get(course_id)
+        return None if pos is None else self.courses[pos]
+
+    def tags(self) -> List[str]:
+        return sorted(self.by_tag)
+
+    def query(
+        self,
+        tags: Sequence[str] = (),
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """Return ``(courses, next_cursor, total_matches)``; positions stay in file order."""
+
+        candidates: Optional[List[int]] = None
+        for tag in sorted(set(tags), key=lambda t: len(self.by_tag.get(t, ()))):
+            positions = self.by_tag.get(tag)
+            if not positions:
+                return [], None, 0
+            if candidates is None:
+                candidates = positions
+            else:
+                keep = set(positions)
+                candidates = [pos for pos in candidates if pos in keep]
+
+        if min_duration is not None or max_duration is not None:
+            lo = 0 if min_duration is None else bisect_left(self._duration_keys, min_duration)
+            hi = len(self.by_duration) if max_duration is None else bisect_right(self._duration_keys, max_duration)
+            in_range = sorted(pos for _, pos in self.by_duration[lo:hi])
+            if candidates is None:
+                candidates = in_range
+            else:
+                keep = set(in_range)
+                candidates = [pos for pos in candidates if pos in keep]
+
+        if candidates is None:
+            candidates = range(len(self.courses))  # type: ignore[assignment]
+
+        start = 0
+        if cursor:
+            after = self.by_id.get(decode_cursor(cursor))
+            if after is None:
+                raise InvalidCursor("Invalid 'cursor'")
+            start = bisect_right(candidates, after)  # type: ignore[arg-type]
+
+        page_positions = candidates[start:start + limit]  # type: ignore[index]
+        page = [self.courses[pos] for pos in page_positions]
+        next_cursor = None
+        if start + limit < len(candidates) and page:  # type: ignore[arg-type]
+            next_cursor = encode_cursor(str(page[-1]["id"]))
+        return page, next_cursor, len(candidates)  # type: ignore[arg-type]
+
+    def _encode(
+        self,
+        tags: Tuple[str, ...],
+        min_duration: Optional[int],
+        max_duration: Optional[int],
+        cursor: Optional[str],
+        limit: int,
+    ) -> EncodedPayload:
+        page, next_cursor, total = self.query(tags, min_duration, max_duration, cursor, limit)
+        return EncodedPayload.from_json(
+            {"meta": self.meta, "courses": page, "next_cursor": next_cursor, "total": total}
+        )
+
+    def response_payload(
+        self,
+        tags: Sequence[str] = (),
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> EncodedPayload:
+        """Encoded ``/api/courses`` response body for a query (cached)."""
+
+        key = (tuple(sorted(set(tags))), min_duration, max_duration, cursor or None, limit)
+        payload = self._precomputed.get(key)
+        if payload is not None:
+            return payload
+        with self._cache_lock:
+            payload = self._cache.get(key)
+            if payload is not None:
+                self._cache.move_to_end(key)
+                return payload
+        payload = self._encode(*key)
+        with self._cache_lock:
+            self._cache[key] = payload
+            while len(self._cache) > _QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return payload
+
+
+class CourseCatalog:
+    """Holds the current ``CourseIndex`` and rebuilds it when the file changes."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_COURSES_FILE, reload_interval: float = 2.0) -> None:
+        self._path = Path(path)
+        self._reload_interval = reload_interval
+        self._index: Optional[CourseIndex] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        # (mtime_ns, size) of a file version that failed to load
+        self._failed_signature: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+        self.load_errors = 0
+
+    @classmethod
+    def from_env(cls) -> "CourseCatalog":
+        return cls(
+            path=os.getenv("COURSES_FILE", str(DEFAULT_COURSES_FILE)),
+            reload_interval=float(os.getenv("COURSES_RELOAD_INTERVAL", "2")),
+        )
+
+    def load(self) -> Optional[CourseIndex]:
+        """Build the index now (called at startup); return it."""
+
+        with self._reload_lock:
+            self._reload_if_changed()
+        return self._index
+
+    def index(self) -> Optional[CourseIndex]:
+        """Return the current index, reloading first if the file changed."""
+
+        if time.monotonic() - self._checked_at >= self._reload_interval:
+            # One thread re-checks; the others keep serving the current index
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self._reload_if_changed()
+                finally:
+                    self._reload_lock.release()
+        return self._index
+
+    def _reload_if_changed(self) -> None:
+        self._checked_at = time.monotonic()
+        try:
+            stat = self._path.stat()
+        except OSError:
+            if self._index is None:
+                logger.warning("Course catalog %s does not exist", self._path)
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature in (self._signature, self._failed_signature):
+            return
+        try:
+            index = CourseIndex(json.loads(self._path.read_bytes()))
+        except (OSError, ValueError, TypeError) as exc:
+            self.load_errors += 1
+            self._failed_signature = signature
+            logger.error("Failed to load course catalog %s: %s", self._path, exc)
+            return
+        if self._index is not None:
+            self.reloads += 1
+        self._index = index
+        self._signature = signature
+        self._failed_signature = None
+
+    def stats(self) -> Dict[str, int]:
+        index = self._index
+        return {
+            "courses": len(index.courses) if index is not None else 0,
+            "tags": len(index.by_tag) if index is not None else 0,
+            "reloads": self.reloads,
+            "load_errors": self.load_errors,
+        }
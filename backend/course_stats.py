@@ -0,0 +1,263 @@
+"""Per-course summary statistics served by ``GET /api/course-stats``.
+
+``course_stats`` (migrations/005_create_course_stats.sql) holds one row per
+course with running sums over ``user_course_progress``: learners, learners
+who completed the course, and the sums of ``progress_percent``,
+``total_answered`` and ``total_correct``. Database triggers apply the delta
+of every progress row change to its course's row, so reading a dashboard is
+O(courses) instead of a GROUP BY over every user's progress.
+
+``CourseStatsRepository.reconcile`` recomputes the table from
+``user_course_progress`` in one statement, repairing drift from manual edits
+or rows written before the triggers existed. It reads the whole progress
+table, so run it from cron on one host rather than in every API worker::
+
+    python backend/course_stats.py reconcile
+
+It writes absolute totals, so it must not miss a trigger delta committed
+while it runs: on MySQL it share-locks every progress row (and, at
+REPEATABLE READ, the gaps between them) before reading, so progress writes
+wait until it commits. Expect a pause in progress writes for as long as it
+runs; a write transaction touching several rows can also make it fail with a
+deadlock, in which case run it again. On SQLite it holds the write lock.
+
+The triggers themselves serialize writes per course: every progress write
+updates its course's ``course_stats`` row in the same transaction, so
+concurrent writes for one course wait on that row lock until the earlier
+transaction commits.
+
+``CourseStatsReconciler`` can instead run it periodically inside a process
+that is not serving requests, or in single-process deployments.
+
+Configuration:
+- COURSE_STATS_RECONCILE_INTERVAL (default: 0, in-process job disabled;
+  seconds between runs otherwise)
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlite_support import SQLITE_NOW
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CourseStats:
+    course_id: int
+    learners: int
+    completed_learners: int
+    progress_percent_sum: int
+    total_answered: int
+    total_correct: int
+    reconciled_at: Optional[datetime]
+
+    @property
+    def avg_progress_percent(self) -> float:
+        if self.learners <= 0:
+            return 0.0
+        return round(self.progress_percent_sum / self.learners, 2)
+
+    @property
+    def correct_rate(self) -> float:
+        if self.total_answered <= 0:
+            return 0.0
+        return round(self.total_correct * 100.0 / self.total_answered, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "course_id": self.course_id,
+            "learners": self.learners,
+            "completed_learners": self.completed_learners,
+            "avg_progress_percent": self.avg_progress_percent,
+            "total_answered": self.total_answered,
+            "total_correct": self.total_correct,
+            "correct_rate": self.correct_rate,
+            "reconciled_at": self.reconciled_at,
+        }
+
+
+class CourseStatsRepository:
+    """Reads and reconciles the ``course_stats`` summary table."""
+
+    _COLUMNS = (
+        "course_id, learners, completed_learners, progress_percent_sum, total_answered, total_correct"
+    )
+
+    # Full recompute from user_course_progress. SQLite needs the WHERE clause
+    # to parse an upsert whose source is a SELECT.
+    _RECONCILE_SQL = {
+        "mysql": (
+            f"INSERT INTO course_stats ({_COLUMNS}, reconciled_at) "
+            "SELECT course_id, COUNT(*), SUM(progress_percent >= 100), SUM(progress_percent), "
+            "SUM(total_answered), SUM(total_correct), NOW(3) "
+            "FROM user_course_progress GROUP BY course_id "
+            "ON DUPLICATE KEY UPDATE learners = VALUES(learners), "
+            "completed_learners = VALUES(completed_learners), "
+            "progress_percent_sum = VALUES(progress_percent_sum), "
+            "total_answered = VALUES(total_answered), total_correct = VALUES(total_correct), "
+            "reconciled_at = VALUES(reconciled_at)"
+        ),
+        "sqlite": (
+            f"INSERT INTO course_stats ({_COLUMNS}, reconciled_at) "
+            "SELECT course_id, COUNT(*), SUM(progress_percent >= 100), SUM(progress_percent), "
+            f"SUM(total_answered), SUM(total_correct), {SQLITE_NOW} "
+            "FROM user_course_progress WHERE true GROUP BY course_id "
+            "ON CONFLICT (course_id) DO UPDATE SET learners = excluded.learners, "
+            "completed_learners = excluded.completed_learners, "
+            "progress_percent_sum = excluded.progress_percent_sum, "
+            "total_answered = excluded.total_answered, total_correct = excluded.total_correct, "
+            "reconciled_at = excluded.reconciled_at"
+        ),
+    }
+
+    # A locking scan of the clustered index: progress writes (and the deltas
+    # their triggers apply) wait for the reconcile instead of landing after
+    # the snapshot it computes totals from
+    _LOCK_PROGRESS_SQL = "SELECT COUNT(*) FROM user_course_progress FORCE INDEX (PRIMARY) LOCK IN SHARE MODE"
+
+    _DELETE_EMPTY_SQL = (
+        "DELETE FROM course_stats WHERE course_id NOT IN (SELECT DISTINCT course_id FROM user_course_progress)"
+    )
+
+    def __init__(self, db: Any) -> None:
+        self._db = db
+
+    @staticmethod
+    def _row_to_model(row: Dict[str, Any]) -> CourseStats:
+        return CourseStats(
+            course_id=row["course_id"],
+            learners=int(row["learners"]),
+            completed_learners=int(row["completed_learners"]),
+            progress_percent_sum=int(row["progress_percent_sum"]),
+            total_answered=int(row["total_answered"]),
+            total_correct=int(row["total_correct"]),
+            reconciled_at=row.get("reconciled_at"),
+        )
+
+    def get_many(self, course_ids: Optional[Sequence[int]] = None) -> List[CourseStats]:
+        """Return stats for the given courses (all courses if None), by course_id."""
+
+        query = f"SELECT {self._COLUMNS}, reconciled_at FROM course_stats"
+        params: List[Any] = []
+        if course_ids is not None:
+            if not course_ids:
+                return []
+            query += " WHERE course_id IN (" + ", ".join(["%s"] * len(course_ids)) + ")"
+            params.extend(course_ids)
+        query += " ORDER BY course_id"
+
+        with self._db.get_read_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall() or []
+        return [self._row_to_model(row) for row in rows]
+
+    def reconcile(self) -> None:
+        """Recompute every course's row from ``user_course_progress``.
+
+        Progress writes are blocked until this commits (see the module
+        docstring), so no trigger delta is overwritten by an older total.
+        """
+
+        mysql = self._db.dialect == "mysql"
+        with self._db.get_connection() as conn:
+            if mysql:
+                # Applies to the next transaction only; gap locks keep new
+                # progress rows out until the recompute commits
+                with conn.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            conn.begin()
+            try:
+                with conn.cursor() as cursor:
+                    if mysql:
+                        cursor.execute(self._LOCK_PROGRESS_SQL)
+                    cursor.execute(self._RECONCILE_SQL[self._db.dialect])
+                    cursor.execute(self._DELETE_EMPTY_SQL)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+
+class CourseStatsReconciler:
+    """Background thread running ``CourseStatsRepository.reconcile`` periodically."""
+
+    def __init__(self, repo: CourseStatsRepository, interval: float = 3600.0) -> None:
+        self._repo = repo
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.errors = 0
+        self.seconds_last = 0.0
+
+    @classmethod
+    def from_env(cls, repo: CourseStatsRepository) -> Optional["CourseStatsReconciler"]:
+        interval = float(os.getenv("COURSE_STATS_RECONCILE_INTERVAL", "0"))
+        if interval <= 0:
+            return None
+        return cls(repo, interval=interval)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="course-stats-reconcile", daemon=True)
+            self._thread.start()
+
+    def run_once(self) -> None:
+        started = time.perf_counter()
+        try:
+            self._repo.reconcile()
+        except Exception:
+            self.errors += 1
+            logger.exception("Failed to reconcile course_stats")
+            return
+        self.runs += 1
+        self.seconds_last = time.perf_counter() - started
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def stats(self) -> Dict[str, float]:
+        return {"runs": self.runs, "errors": self.errors, "seconds_last": self.seconds_last}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.run_once()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import config  # noqa: F401  (loads backend/.env)
+    from db import database_from_env
+
+    parser = argparse.ArgumentParser(description="Maintain the course_stats summary table.")
+    parser.add_argument("command", choices=["reconcile", "show"])
+    args = parser.parse_args(argv)
+
+    db = database_from_env()
+    try:
+        repo = CourseStatsRepository(db)
+        if args.command == "reconcile":
+            started = time.perf_counter()
+            repo.reconcile()
+            print(f"course_stats reconciled in {time.perf_counter() - started:.3f}s")
+        for stats in repo.get_many():
+            print(stats.to_dict())
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
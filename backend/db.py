@@ -1,12 +1,216 @@
 from __future__ import annotations
 
+import itertools
+import logging
 import os
-from dataclasses import dataclass, asdict
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, List
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, List, Sequence, Tuple
 
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.cursors import Cursor, DictCursor, SSCursor
+
+import metrics
+from progress_buffer import ProgressUpdate, ProgressWriteBuffer
+from sqlite_support import SQLITE_NOW
+from token_cache import MISSING, TokenCache
+
+logger = logging.getLogger(__name__)
+
+# Lifetime of authentication tokens issued at login
+TOKEN_LIFETIME = timedelta(days=2)
+
+
+class _TimedCursorMixin:
+    """Reports each statement to metrics.
+
+    ``executemany`` goes through ``execute`` as well, once per batch.
+    """
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)  # type: ignore[misc]
+        finally:
+            metrics.record_db_statement(time.perf_counter() - started)
+
+
+class _TimedDictCursor(_TimedCursorMixin, DictCursor):
+    """Default cursor: rows as dicts keyed by column name."""
+
+
+class _TimedCursor(_TimedCursorMixin, Cursor):
+    """Rows as plain tuples; used where models are built straight from rows.
+
+    ``SQLiteConnection.cursor`` accepts it too and switches to tuple rows.
+    """
+
+
+class _TimedSSCursor(_TimedCursorMixin, SSCursor):
+    """Unbuffered tuple cursor: rows are read off the socket as they are fetched."""
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of PyMySQL connections.
+
+    - At most ``size`` connections are open at any time (idle + checked out).
+    - Idle connections are reused LIFO so hot connections stay warm.
+    - Connections older than ``recycle`` seconds are closed and replaced.
+    - Connections idle for longer than ``ping_interval`` seconds are pinged
+      before being handed out; dead ones are transparently replaced.
+    - ``acquire`` waits at most ``timeout`` seconds, then raises PoolTimeout.
+
+    Connections are opened lazily, so creating a pool never touches MySQL.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        size: int = 10,
+        timeout: float = 5.0,
+        recycle: float = 3600.0,
+        ping_interval: float = 30.0,
+    ) -> None:
+        if size < 1:
+            raise ValueError("pool size must be >= 1")
+        self._connect = connect
+        self._size = size
+        self._timeout = timeout
+        self._recycle = recycle
+        self._ping_interval = ping_interval
+        self._cond = threading.Condition()
+        # Idle entries are [conn, created_at, last_used_at] (monotonic seconds)
+        self._idle: Deque[List[Any]] = deque()
+        # created_at of checked-out connections, keyed by id(conn)
+        self._checked_out: Dict[int, float] = {}
+        self._open = 0
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "size": self._size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": len(self._checked_out),
+            }
+
+    def acquire(self):
+        deadline = time.monotonic() + self._timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                    break
+                if self._open < self._size:
+                    # Reserve a slot, then connect outside the lock
+                    self._open += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"timed out after {self._timeout}s waiting for a database connection"
+                    )
+                self._cond.wait(remaining)
+
+        try:
+            if conn is not None:
+                conn, created_at = self._check_health(conn, created_at, last_used)
+            if conn is None:
+                conn = self._connect()
+                created_at = time.monotonic()
+        except BaseException:
+            self._release_slot()
+            raise
+
+        with self._cond:
+            self._checked_out[id(conn)] = created_at
+        return conn
+
+    def _check_health(self, conn, created_at: float, last_used: float):
+        """Return a usable (conn, created_at), or (None, 0.0) if it must be replaced."""
+
+        now = time.monotonic()
+        if now - created_at >= self._recycle:
+            self._close_quietly(conn)
+            return None, 0.0
+        if now - last_used >= self._ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(conn)
+                return None, 0.0
+        return conn, created_at
+
+    def release(self, conn, discard: bool = False) -> None:
+        with self._cond:
+            created_at = self._checked_out.pop(id(conn), None)
+        if created_at is None:
+            # Not ours (or already released); just make sure it is closed.
+            self._close_quietly(conn)
+            return
+
+        if discard or self._closed or not getattr(conn, "open", True):
+            self._close_quietly(conn)
+            self._release_slot()
+            return
+
+        with self._cond:
+            self._idle.append([conn, created_at, time.monotonic()])
+            self._cond.notify()
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            # The connection may be broken; do not hand it out again.
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts."""
+
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
 
 
 class Database:
@@ -18,14 +222,44 @@ class Database:
     - DB_USER (default: root)
     - DB_PASSWORD (default: empty)
     - DB_NAME (default: exammaster)
+    - DB_POOL_SIZE (default: 10; 0 disables pooling)
+    - DB_POOL_TIMEOUT (default: 5 seconds to wait for a free connection)
+    - DB_POOL_RECYCLE (default: 3600 seconds max connection lifetime)
+    - DB_POOL_PING_INTERVAL (default: 30 seconds idle before a health ping)
+
+    ``dialect`` tells the repositories which SQL to use; see sqlite_db.py for
+    the embedded SQLite alternative and ``database_from_env`` for selecting
+    one at startup.
     """
 
-    def __init__(self, host: str, port: int, user: str, password: str, name: str) -> None:
+    dialect = "mysql"
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        name: str,
+        pool_size: int = 10,
+        pool_timeout: float = 5.0,
+        pool_recycle: float = 3600.0,
+        pool_ping_interval: float = 30.0,
+    ) -> None:
         self._host = host
         self._port = port
         self._user = user
         self._password = password
         self._name = name
+        self._pool: Optional[ConnectionPool] = None
+        if pool_size > 0:
+            self._pool = ConnectionPool(
+                self._connect,
+                size=pool_size,
+                timeout=pool_timeout,
+                recycle=pool_recycle,
+                ping_interval=pool_ping_interval,
+            )
 
     @classmethod
     def from_env(cls) -> "Database":
@@ -35,13 +269,35 @@ class Database:
             user=os.getenv("DB_USER", "root"),
             password=os.getenv("DB_PASSWORD", "123456"),
             name=os.getenv("DB_NAME", "exammaster"),
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+            pool_recycle=float(os.getenv("DB_POOL_RECYCLE", "3600")),
+            pool_ping_interval=float(os.getenv("DB_POOL_PING_INTERVAL", "30")),
         )
 
-    def get_connection(self):
-        """Create a new PyMySQL connection.
+    @classmethod
+    def replica_from_env(cls, host: str) -> "Database":
+        """A replica at ``host[:port]`` with the primary's credentials and pool settings."""
 
-        Caller is responsible for closing the connection, e.g. via context manager.
-        """
+        name, _, port = host.partition(":")
+        return cls(
+            host=name,
+            port=int(port or os.getenv("DB_PORT", "3306")),
+            user=os.getenv("DB_USER", "root"),
+            password=os.getenv("DB_PASSWORD", "123456"),
+            name=os.getenv("DB_NAME", "exammaster"),
+            pool_size=int(os.getenv("DB_REPLICA_POOL_SIZE", os.getenv("DB_POOL_SIZE", "10"))),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+            pool_recycle=float(os.getenv("DB_POOL_RECYCLE", "3600")),
+            pool_ping_interval=float(os.getenv("DB_POOL_PING_INTERVAL", "30")),
+        )
+
+    @property
+    def pool(self) -> Optional[ConnectionPool]:
+        return self._pool
+
+    def _connect(self, cursorclass: type = _TimedDictCursor):
+        """Open a new PyMySQL connection."""
 
         return pymysql.connect(
             host=self._host,
@@ -49,82 +305,511 @@ class Database:
             user=self._user,
             password=self._password,
             database=self._name,
-            cursorclass=DictCursor,
+            cursorclass=cursorclass,
             autocommit=True,
         )
 
+    @contextmanager
+    def get_connection(self) -> Iterator[Any]:
+        """Borrow a connection for the duration of a ``with`` block.
 
-@dataclass
-class User:
-    id: int
-    code: str
-    name: Optional[str] = None
-    email: Optional[str] = None
-    grade: Optional[str] = None
-    token: Optional[str] = None
-    token_expires_at: Optional[datetime] = None
+        With pooling enabled the connection is returned to the pool on exit;
+        otherwise a fresh connection is opened and closed.
+        """
 
-    def to_dict(self) -> Dict[str, Any]:
-        data = asdict(self)
-        if self.token_expires_at is not None:
-            data["token_expires_at"] = self.token_expires_at.isoformat()
-        return data
-
-
-@dataclass
-class UserCourseProgress:
-    id: int
-    user_id: int
-    course_id: int
-    progress_percent: int
-    total_answered: int
-    total_correct: int
-    correct_rate: float
-    submit_at: Optional["datetime"]
+        metrics.record_db_connection()
+        if self._pool is None:
+            with self._connect() as conn:
+                yield conn
+            return
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Serialize progress to a JSON-friendly dict.
+        with self._pool.connection() as conn:
+            yield conn
+
+    # A streamed export is written to the client as it is read, so the server
+    # may have to wait on a slow download before it can send more rows
+    STREAM_NET_WRITE_TIMEOUT = 3600
 
-        Note: ``submit_at`` is ISO-formatted if present.
+    @contextmanager
+    def streaming_cursor(self) -> Iterator[Any]:
+        """Yield an unbuffered (``SSCursor``) tuple cursor for large result sets.
+
+        Rows are fetched from the server as they are consumed, so memory stays
+        flat however many rows a query returns. The cursor runs on a dedicated
+        connection, not a pooled one: the connection is unusable until the
+        result is read to the end, and closing it is the only cheap way to
+        abandon a half-read result.
         """
 
-        data = asdict(self)
-        # Ensure correct_rate is a plain float
-        data["correct_rate"] = float(self.correct_rate)
-        if self.submit_at is not None:
-            data["submit_at"] = self.submit_at.isoformat()
-        return data
+        metrics.record_db_connection()
+        conn = self._connect(cursorclass=_TimedSSCursor)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SET SESSION net_write_timeout = %s", (self.STREAM_NET_WRITE_TIMEOUT,))
+            yield cursor
+        finally:
+            # Not cursor.close(): SSCursor would first read any remaining rows
+            conn.close()
+
+    # Without replicas, reads share the connections used for writes
+    replicated = False
+
+    def get_read_connection(self):
+        return self.get_connection()
+
+    def warm_up(self, connections: int = 1) -> int:
+        """Open and check up to *connections* pooled connections; return how many.
+
+        They are held at the same time, so the pool really opens that many
+        instead of reusing one; afterwards they stay idle in the pool.
+        """
+
+        if self._pool is None:
+            with self.get_connection() as conn:
+                conn.ping(reconnect=False)
+            return 1
+
+        held: List[Any] = []
+        try:
+            for _ in range(max(1, min(connections, self._pool.size))):
+                held.append(self._pool.acquire())
+            for conn in held:
+                conn.ping(reconnect=False)
+        finally:
+            for conn in held:
+                self._pool.release(conn)
+        return len(held)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+
+
+# Set once the current request has used the primary; later reads in the same
+# request then stay on the primary and see its writes (see ReplicatedDatabase)
+_primary_pinned: ContextVar[bool] = ContextVar("db_primary_pinned", default=False)
+
+
+def start_request_routing() -> None:
+    """Forget primary pinning from an earlier request handled in this context."""
+
+    _primary_pinned.set(False)
+
+
+# Errors inside a replica read that point at the replica rather than the query
+_REPLICA_ERRORS: Tuple[type, ...] = (
+    pymysql.err.OperationalError,
+    pymysql.err.InterfaceError,
+    PoolTimeout,
+    sqlite3.OperationalError,
+)
+
+
+class _Replica:
+    __slots__ = ("db", "name", "down_until", "reads", "failures", "lag")
+
+    def __init__(self, db: Any, name: str) -> None:
+        self.db = db
+        self.name = name
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
+        self.lag: Optional[float] = None
+
+
+class ReplicatedDatabase:
+    """A primary database plus read replicas, used like a single ``Database``.
+
+    - ``get_connection()`` (and so every write) uses the primary.
+    - ``get_read_connection()`` and ``streaming_cursor()`` go to the replicas
+      in round-robin order. A replica that fails to hand out a connection is
+      skipped for ``retry_interval`` seconds and the next one is tried; with
+      none available, reads fall back to the primary.
+    - Read-your-writes: once a request has used the primary, its later reads
+      do too. Call ``start_request_routing()`` at the start of each request.
+    - ``start_health_checks()`` probes every replica each ``health_interval``
+      seconds and takes it out of rotation while it is unreachable or its
+      replication lag exceeds ``max_lag`` seconds.
+
+    The primary and replicas are ``Database`` or ``SQLiteDatabase`` instances
+    (SQLite files stand in for replicas in local testing, without actually
+    replicating). Replicas only serve what they have already replayed, so
+    another request may briefly read older data than the primary holds.
+    """
+
+    replicated = True
+
+    def __init__(
+        self,
+        primary: Any,
+        replicas: Sequence[Any],
+        retry_interval: float = 30.0,
+        max_lag: float = 10.0,
+        health_interval: float = 5.0,
+    ) -> None:
+        self._primary = primary
+        self._replicas = [_Replica(db, f"replica{i}") for i, db in enumerate(replicas)]
+        self._retry_interval = retry_interval
+        self._max_lag = max_lag
+        self._health_interval = health_interval
+        self._next = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.primary_reads = 0
+        self.failovers = 0
+
+    @property
+    def dialect(self) -> str:
+        return self._primary.dialect
+
+    @property
+    def pool(self) -> Any:
+        return self._primary.pool
+
+    @property
+    def primary(self) -> Any:
+        return self._primary
+
+    def get_connection(self):
+        """A primary connection; pins the current request to the primary."""
+
+        _primary_pinned.set(True)
+        return self._primary.get_connection()
+
+    @contextmanager
+    def get_read_connection(self) -> Iterator[Any]:
+        with self._read_route(lambda db: db.get_connection()) as conn:
+            yield conn
+
+    @contextmanager
+    def streaming_cursor(self) -> Iterator[Any]:
+        with self._read_route(lambda db: db.streaming_cursor()) as cursor:
+            yield cursor
+
+    @contextmanager
+    def _read_route(self, open_on: Callable[[Any], Any]) -> Iterator[Any]:
+        with ExitStack() as stack:
+            replica = None
+            resource = None
+            if not _primary_pinned.get():
+                for candidate in self._rotation():
+                    try:
+                        resource = stack.enter_context(open_on(candidate.db))
+                    except Exception:
+                        self._mark_down(candidate)
+                        self.failovers += 1
+                        continue
+                    replica = candidate
+                    break
+            if replica is None:
+                self.primary_reads += 1
+                resource = stack.enter_context(open_on(self._primary))
+            else:
+                replica.reads += 1
+
+            try:
+                yield resource
+            except _REPLICA_ERRORS:
+                if replica is not None:
+                    self._mark_down(replica)
+                raise
+
+    def _rotation(self) -> List[_Replica]:
+        """Replicas in service, starting with the next one in round-robin order."""
+
+        count = len(self._replicas)
+        if not count:
+            return []
+        start = next(self._next) % count
+        now = time.monotonic()
+        ordered = self._replicas[start:] + self._replicas[:start]
+        return [r for r in ordered if r.down_until <= now]
+
+    def _mark_down(self, replica: _Replica) -> None:
+        replica.failures += 1
+        replica.down_until = time.monotonic() + self._retry_interval
+        logger.warning("Read replica %s taken out of rotation for %ss", replica.name, self._retry_interval)
+
+    _LAG_QUERIES = ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS")
+
+    def _probe(self, replica: _Replica) -> Optional[float]:
+        """Replication lag of *replica* in seconds (0.0 when it does not report any)."""
+
+        with replica.db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                if replica.db.dialect != "mysql":
+                    cursor.execute("SELECT 1")
+                    return 0.0
+                for query in self._LAG_QUERIES:
+                    try:
+                        cursor.execute(query)
+                    except pymysql.err.ProgrammingError:
+                        continue  # server predates the REPLICA spelling
+                    row = cursor.fetchone()
+                    if not row:
+                        return 0.0
+                    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+                    # NULL while replication is stopped
+                    return None if lag is None else float(lag)
+        return 0.0
+
+    def check_health(self) -> None:
+        """Probe every replica once and update which are in rotation."""
+
+        for replica in self._replicas:
+            try:
+                replica.lag = self._probe(replica)
+            except Exception:
+                replica.lag = None
+                self._mark_down(replica)
+                continue
+            if replica.lag is None or replica.lag > self._max_lag:
+                self._mark_down(replica)
+            else:
+                replica.down_until = 0.0
+
+    def warm_up(self, connections: int = 1) -> int:
+        """Warm the primary and every replica; return the connections opened."""
+
+        return self._primary.warm_up(connections) + sum(r.db.warm_up(connections) for r in self._replicas)
+
+    def start_health_checks(self) -> None:
+        if self._thread is None and self._replicas and self._health_interval > 0:
+            self._thread = threading.Thread(target=self._run_health_checks, name="db-replica-health", daemon=True)
+            self._thread.start()
+
+    def _run_health_checks(self) -> None:
+        while not self._stop.wait(self._health_interval):
+            self.check_health()
+
+    def stats(self) -> Dict[str, float]:
+        now = time.monotonic()
+        stats: Dict[str, float] = {"primary_reads": self.primary_reads, "failovers": self.failovers}
+        for r in self._replicas:
+            stats[f"{r.name}_up"] = int(r.down_until <= now)
+            stats[f"{r.name}_reads"] = r.reads
+            stats[f"{r.name}_failures"] = r.failures
+            stats[f"{r.name}_lag_seconds"] = -1 if r.lag is None else r.lag
+        return stats
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        for replica in self._replicas:
+            replica.db.close()
+        self._primary.close()
+
+
+def _replica_settings() -> Dict[str, float]:
+    return {
+        "retry_interval": float(os.getenv("DB_REPLICA_RETRY_INTERVAL", "30")),
+        "max_lag": float(os.getenv("DB_REPLICA_MAX_LAG", "10")),
+        "health_interval": float(os.getenv("DB_REPLICA_HEALTH_INTERVAL", "5")),
+    }
+
+
+def database_from_env():
+    """Return the storage backend selected by DB_BACKEND.
+
+    - ``mysql`` (default): ``Database.from_env()``
+    - ``sqlite``: ``sqlite_db.SQLiteDatabase.from_env()`` (embedded, WAL mode)
+
+    Listing read replicas returns a ``ReplicatedDatabase`` around the primary:
+    - DB_REPLICA_HOSTS: ``host[:port]`` list, comma separated; replicas use
+      the primary's DB_USER / DB_PASSWORD / DB_NAME and pool settings
+      (DB_REPLICA_POOL_SIZE overrides the pool size)
+    - SQLITE_REPLICA_PATHS: database files standing in for replicas
+    - DB_REPLICA_RETRY_INTERVAL (default: 30 seconds out of rotation after a
+      failure), DB_REPLICA_MAX_LAG (default: 10 seconds),
+      DB_REPLICA_HEALTH_INTERVAL (default: 5 seconds; 0 disables probing)
+    """
+
+    backend = os.getenv("DB_BACKEND", "mysql").lower()
+    if backend == "sqlite":
+        from sqlite_db import SQLiteDatabase
+
+        primary = SQLiteDatabase.from_env()
+        paths = [p.strip() for p in os.getenv("SQLITE_REPLICA_PATHS", "").split(",") if p.strip()]
+        if not paths:
+            return primary
+        replicas = [SQLiteDatabase.from_env(path) for path in paths]
+    elif backend == "mysql":
+        primary = Database.from_env()
+        hosts = [h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",") if h.strip()]
+        if not hosts:
+            return primary
+        replicas = [Database.replica_from_env(host) for host in hosts]
+    else:
+        raise ValueError(f"Unsupported DB_BACKEND {backend!r} (expected 'mysql' or 'sqlite')")
+
+    db = ReplicatedDatabase(primary, replicas, **_replica_settings())
+    db.start_health_checks()
+    return db
+
+
+class _Record:
+    """Base for the compact row models below.
+
+    Subclasses list their fields in ``__slots__`` in the order of their
+    ``*_COLUMNS`` SELECT list, so a tuple row builds a model with
+    ``Model(*row)`` and a dict row with ``Model(**row)``.
+    """
+
+    __slots__ = ()
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def copy(self):
+        return type(self)(*self._values())
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()  # type: ignore[attr-defined]
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+USER_COLUMNS = "id, code, name, email, grade, token, token_expires_at"
+
+
+class User(_Record):
+    __slots__ = ("id", "code", "name", "email", "grade", "token", "token_expires_at")
+
+    def __init__(
+        self,
+        id: int,
+        code: str,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        grade: Optional[str] = None,
+        token: Optional[str] = None,
+        token_expires_at: Optional[datetime] = None,
+    ) -> None:
+        self.id = id
+        self.code = code
+        self.name = name
+        self.email = email
+        self.grade = grade
+        self.token = token
+        self.token_expires_at = token_expires_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready dict; datetimes are left to the encoder (see jsonutil.py)."""
+
+        return {
+            "id": self.id,
+            "code": self.code,
+            "name": self.name,
+            "email": self.email,
+            "grade": self.grade,
+            "token": self.token,
+            "token_expires_at": self.token_expires_at,
+        }
+
+
+PROGRESS_COLUMNS = (
+    "id, user_id, course_id, progress_percent, total_answered, total_correct, correct_rate, submit_at"
+)
+
+
+class UserCourseProgress(_Record):
+    """A row of ``user_course_progress``.
+
+    ``correct_rate`` is kept as read (``Decimal`` from MySQL); the JSON
+    encoder writes it as a number.
+    """
+
+    __slots__ = (
+        "id", "user_id", "course_id", "progress_percent", "total_answered", "total_correct",
+        "correct_rate", "submit_at",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        user_id: int,
+        course_id: int,
+        progress_percent: int,
+        total_answered: int,
+        total_correct: int,
+        correct_rate: Any,
+        submit_at: Optional[datetime],
+    ) -> None:
+        self.id = id
+        self.user_id = user_id
+        self.course_id = course_id
+        self.progress_percent = progress_percent
+        self.total_answered = total_answered
+        self.total_correct = total_correct
+        self.correct_rate = correct_rate
+        self.submit_at = submit_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready dict; datetimes and Decimals are left to the encoder."""
+
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "course_id": self.course_id,
+            "progress_percent": self.progress_percent,
+            "total_answered": self.total_answered,
+            "total_correct": self.total_correct,
+            "correct_rate": self.correct_rate,
+            "submit_at": self.submit_at,
+        }
 
 
 class UserRepository:
     """Repository for reading/writing users.
 
     Backed by the `users` table created in migrations/001_create_users.sql.
+
+    If a ``token_cache`` is given, ``get_by_token`` is served from it,
+    ``update_token`` invalidates the user's previous entry and
+    ``login_with_code`` replaces it with the new token.
     """
 
-    def __init__(self, db: Database) -> None:
+    def __init__(self, db: Any, token_cache: Optional[TokenCache] = None) -> None:
         self._db = db
+        self._token_cache = token_cache
 
-    def get_by_code(self, code: str) -> Optional[User]:
-        with self._db.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT id, code, name, email, grade, token, token_expires_at FROM users WHERE code = %s",
-                    (code,),
-                )
+    @property
+    def token_cache(self) -> Optional[TokenCache]:
+        return self._token_cache
+
+    _USER_BY = "SELECT " + USER_COLUMNS + " FROM users WHERE {} = %s"
+
+    def _read_user(self, column: str, value: str, miss_on_primary: bool = False) -> Optional[Tuple[Any, ...]]:
+        """Read one user row, from a replica when there are any.
+
+        Within a read-your-writes window (the request has already used the
+        primary, see ``ReplicatedDatabase``) this reads from the primary. A
+        replica miss is retried on the primary only with *miss_on_primary*
+        (a lagging replica may not have a just-issued token yet), without
+        pinning the request; guessed codes stay on the replicas.
+        """
+
+        query = self._USER_BY.format(column)
+        with self._db.get_read_connection() as conn:
+            with conn.cursor(_TimedCursor) as cursor:
+                cursor.execute(query, (value,))
                 row = cursor.fetchone()
-                if not row:
-                    return None
+        if row or not (miss_on_primary and self._db.replicated):
+            return row
+        with self._db.primary.get_connection() as conn:
+            with conn.cursor(_TimedCursor) as cursor:
+                cursor.execute(query, (value,))
+                return cursor.fetchone()
 
-                return User(
-                    id=row["id"],
-                    code=row["code"],
-                    name=row.get("name"),
-                    email=row.get("email"),
-                    grade=row.get("grade"),
-                    token=row.get("token"),
-                    token_expires_at=row.get("token_expires_at"),
-                )
+    def get_by_code(self, code: str) -> Optional[User]:
+        row = self._read_user("code", code)
+        return User(*row) if row else None
 
     def create(self, code: str, name: Optional[str] = None, token: Optional[str] = None) -> User:
         with self._db.get_connection() as conn:
@@ -146,35 +831,66 @@ class UserRepository:
 
     def get_by_token(self, token: str) -> Optional[User]:
         """Retrieve user by authentication token if it hasn't expired."""
-        with self._db.get_connection() as conn:
-            with conn.cursor() as cursor:
+        cache = self._token_cache
+        if cache is None:
+            return self._load_by_token(token)
+
+        cached = cache.get(token)
+        if cached is not MISSING:
+            if cached is None:
+                return None
+            # Hand out a copy so callers cannot mutate the cached entry
+            return cached.copy()
+
+        user = self._load_by_token(token)
+        if user is None:
+            cache.put_missing(token)
+        else:
+            cache.put(token, user.copy())
+        return user
+
+    def warm_token_cache(self, limit: int = 1000) -> int:
+        """Preload the token cache with the *limit* most recently issued live tokens.
+
+        Returns how many were cached (0 without a token cache). Uses
+        ``idx_token_expires_at``; tokens all live for TOKEN_LIFETIME, so the
+        latest expiry is the latest login.
+        """
+
+        cache = self._token_cache
+        if cache is None or limit <= 0:
+            return 0
+        with self._db.get_read_connection() as conn:
+            with conn.cursor(_TimedCursor) as cursor:
                 cursor.execute(
-                    "SELECT id, code, name, email, grade, token, token_expires_at FROM users WHERE token = %s",
-                    (token,),
+                    f"SELECT {USER_COLUMNS} FROM users WHERE token_expires_at > %s "
+                    "ORDER BY token_expires_at DESC LIMIT %s",
+                    (datetime.now(), limit),
                 )
-                row = cursor.fetchone()
-                if not row:
-                    return None
+                rows = cursor.fetchall() or ()
+        for row in reversed(rows):  # most recent last, so it ends up least likely evicted
+            user = User(*row)
+            if user.token:
+                cache.put(user.token, user)
+        return len(rows)
 
-                # Check if token has expired
-                expires_at = row.get("token_expires_at")
-                if expires_at and expires_at < datetime.now():
-                    return None  # Token expired
+    def _load_by_token(self, token: str) -> Optional[User]:
+        # Misses go on to the primary; the negative cache entry then keeps
+        # repeated unknown tokens off it
+        row = self._read_user("token", token, miss_on_primary=True)
+        if not row:
+            return None
 
-                return User(
-                    id=row["id"],
-                    code=row["code"],
-                    name=row.get("name"),
-                    email=row.get("email"),
-                    grade=row.get("grade"),
-                    token=row.get("token"),
-                    token_expires_at=expires_at,
-                )
+        user = User(*row)
+        # Check if token has expired
+        if user.token_expires_at and user.token_expires_at < datetime.now():
+            return None  # Token expired
+        return user
 
     def update_token(self, user_id: int, token: str) -> None:
         """Update the token for a user with 2-day expiration."""
         # Set token to expire in 2 days
-        expires_at = datetime.now() + timedelta(days=2)
+        expires_at = datetime.now() + TOKEN_LIFETIME
         with self._db.get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
@@ -182,58 +898,213 @@ class UserRepository:
                     (token, expires_at, user_id),
                 )
 
+        if self._token_cache is not None:
+            self._token_cache.invalidate_user(user_id)
+            self._token_cache.invalidate(token)
+
+    _LOGIN_UPSERT_SQL = {
+        "mysql": (
+            "INSERT INTO users (code, name, token, token_expires_at) "
+            "VALUES (%(code)s, %(name)s, %(token)s, %(expires_at)s) "
+            "ON DUPLICATE KEY UPDATE token = %(token)s, token_expires_at = %(expires_at)s"
+        ),
+        "sqlite": (
+            "INSERT INTO users (code, name, token, token_expires_at) "
+            "VALUES (%(code)s, %(name)s, %(token)s, %(expires_at)s) "
+            "ON CONFLICT (code) DO UPDATE SET token = excluded.token, token_expires_at = excluded.token_expires_at"
+        ),
+    }
+
+    def login_with_code(self, code: str, token: str, default_name: str = "Exam User") -> User:
+        """Get-or-create the user for *code* and rotate its token in one go.
+
+        Uses one pooled connection and one transaction: an upsert on
+        ``uk_users_code`` followed by a read of the stored row. Replaces the
+        ``get_or_create_by_code`` + ``update_token`` sequence at login.
+
+        Note: InnoDB consumes an AUTO_INCREMENT value even when the upsert
+        takes the UPDATE branch, so user ids are not gap-free.
+        """
+
+        expires_at = datetime.now() + TOKEN_LIFETIME
+        with self._db.get_connection() as conn:
+            conn.begin()
+            try:
+                with conn.cursor(_TimedCursor) as cursor:
+                    cursor.execute(
+                        self._LOGIN_UPSERT_SQL[self._db.dialect],
+                        {"code": code, "name": default_name, "token": token, "expires_at": expires_at},
+                    )
+                    cursor.execute(f"SELECT {USER_COLUMNS} FROM users WHERE code = %s", (code,))
+                    row = cursor.fetchone()
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+        user = User(*row)
+        if self._token_cache is not None:
+            # Cached right away: a replica may not have the new token yet
+            self._token_cache.invalidate_user(user.id)
+            self._token_cache.put(token, user.copy())
+        return user
+
     def get_or_create_by_code(self, code: str, default_name: str = "Exam User") -> User:
         user = self.get_by_code(code)
         if user is not None:
             return user
         return self.create(code=code, name=default_name)
 
+    _BULK_INSERT_SQL = {
+        "mysql": "INSERT IGNORE INTO users (code, name) VALUES ",
+        "sqlite": "INSERT OR IGNORE INTO users (code, name) VALUES ",
+    }
+
+    def bulk_create(self, codes: Sequence[str], name: str = "Exam User") -> int:
+        """Create users for *codes* with one multi-row INSERT; return how many were new.
+
+        Codes that already have a user are skipped via ``uk_users_code``.
+        Callers chunk large lists (see provisioning.py).
+        """
+
+        if not codes:
+            return 0
+        params: List[Any] = []
+        for code in codes:
+            params.extend((code, name))
+        query = self._BULK_INSERT_SQL[self._db.dialect] + ", ".join(["(%s, %s)"] * len(codes))
+        with self._db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                return cursor.execute(query, params)
+
 
 class UserCourseProgressRepository:
     """Repository for per-user per-course progress.
 
     Backed by the `user_course_progress` table created in
     migrations/002_create_user_course_progress.sql.
+
+    If a ``write_buffer`` is given, ``upsert_progress`` coalesces writes in it
+    (see progress_buffer.py) and ``get_for_user`` overlays unflushed values.
     """
 
-    def __init__(self, db: Database) -> None:
+    def __init__(self, db: Any, write_buffer: Optional[ProgressWriteBuffer] = None) -> None:
         self._db = db
+        self._write_buffer = write_buffer
+        if write_buffer is not None:
+            write_buffer.start(self._write_many)
 
-    @staticmethod
-    def _row_to_model(row: Dict[str, Any]) -> UserCourseProgress:
-        from datetime import datetime  # local import to avoid global dependency when unused
-
-        return UserCourseProgress(
-            id=row["id"],
-            user_id=row["user_id"],
-            course_id=row["course_id"],
-            progress_percent=row["progress_percent"],
-            total_answered=row["total_answered"],
-            total_correct=row["total_correct"],
-            # PyMySQL returns DECIMAL as Decimal; cast to float for our dataclass
-            correct_rate=float(row["correct_rate"]),
-            submit_at=row.get("submit_at"),
-        )
+    @property
+    def write_buffer(self) -> Optional[ProgressWriteBuffer]:
+        return self._write_buffer
+
+    def close(self) -> None:
+        """Flush any buffered writes."""
+
+        if self._write_buffer is not None:
+            self._write_buffer.close()
 
     def get_for_user(self, user_id: int, course_id: Optional[int] = None) -> List[UserCourseProgress]:
         """Return all progress rows for a user, optionally filtered by course_id."""
 
-        query = (
-            "SELECT id, user_id, course_id, progress_percent, total_answered, total_correct, "
-            "correct_rate, submit_at FROM user_course_progress WHERE user_id = %s"
-        )
+        query = f"SELECT {PROGRESS_COLUMNS} FROM user_course_progress WHERE user_id = %s"
         params: List[Any] = [user_id]
 
         if course_id is not None:
             query += " AND course_id = %s"
             params.append(course_id)
 
-        with self._db.get_connection() as conn:
-            with conn.cursor() as cursor:
+        with self._db.get_read_connection() as conn:
+            with conn.cursor(_TimedCursor) as cursor:
                 cursor.execute(query, params)
-                rows = cursor.fetchall() or []
+                rows = cursor.fetchall() or ()
+
+        items = [UserCourseProgress(*row) for row in rows]
+        if self._write_buffer is not None:
+            items = self._overlay_pending(items, self._write_buffer.pending_for(user_id, course_id))
+        return items
+
+    @staticmethod
+    def _overlay_pending(
+        items: List[UserCourseProgress], pending: List[ProgressUpdate]
+    ) -> List[UserCourseProgress]:
+        """Apply unflushed updates on top of stored rows.
+
+        Rows that exist only in the buffer get ``id=0`` until they are flushed.
+        """
+
+        if not pending:
+            return items
+        by_course = {item.course_id: item for item in items}
+        for update in pending:
+            item = by_course.get(update.course_id)
+            if item is None:
+                item = UserCourseProgress(
+                    id=0,
+                    user_id=update.user_id,
+                    course_id=update.course_id,
+                    progress_percent=0,
+                    total_answered=0,
+                    total_correct=0,
+                    correct_rate=0.0,
+                    submit_at=None,
+                )
+                items.append(item)
+                by_course[item.course_id] = item
+            if update.progress_percent is not None:
+                item.progress_percent = update.progress_percent
+            if update.total_answered is not None:
+                item.total_answered = update.total_answered
+            if update.total_correct is not None:
+                item.total_correct = update.total_correct
+            if item.total_answered > 0:
+                item.correct_rate = round(item.total_correct * 100.0 / item.total_answered, 2)
+            else:
+                item.correct_rate = 0.0
+            item.submit_at = update.submit_at
+        return items
 
-        return [self._row_to_model(row) for row in rows]
+    # One atomic statement against uk_user_course. NULL parameters mean
+    # "keep the stored value" on update and "0" on insert; a NULL submit_at
+    # means "now". correct_rate is spelled out from the COALESCEd inputs so the
+    # statement is correct both with MySQL's left-to-right assignment and
+    # SQLite's old-value semantics.
+    _UPSERT_SQL = {
+        "mysql": (
+            "INSERT INTO user_course_progress "
+            "(user_id, course_id, progress_percent, total_answered, total_correct, correct_rate, submit_at) "
+            "VALUES (%(user_id)s, %(course_id)s, "
+            "COALESCE(%(progress_percent)s, 0), COALESCE(%(total_answered)s, 0), COALESCE(%(total_correct)s, 0), "
+            "CASE WHEN COALESCE(%(total_answered)s, 0) > 0 "
+            "THEN ROUND(COALESCE(%(total_correct)s, 0) * 100.0 / %(total_answered)s, 2) ELSE 0 END, "
+            "COALESCE(%(submit_at)s, NOW(3))) "
+            "ON DUPLICATE KEY UPDATE "
+            "progress_percent = COALESCE(%(progress_percent)s, progress_percent), "
+            "total_answered = COALESCE(%(total_answered)s, total_answered), "
+            "total_correct = COALESCE(%(total_correct)s, total_correct), "
+            "correct_rate = CASE WHEN COALESCE(%(total_answered)s, total_answered) > 0 "
+            "THEN ROUND(COALESCE(%(total_correct)s, total_correct) * 100.0 "
+            "/ COALESCE(%(total_answered)s, total_answered), 2) ELSE 0 END, "
+            "submit_at = COALESCE(%(submit_at)s, NOW(3))"
+        ),
+        "sqlite": (
+            "INSERT INTO user_course_progress "
+            "(user_id, course_id, progress_percent, total_answered, total_correct, correct_rate, submit_at) "
+            "VALUES (%(user_id)s, %(course_id)s, "
+            "COALESCE(%(progress_percent)s, 0), COALESCE(%(total_answered)s, 0), COALESCE(%(total_correct)s, 0), "
+            "CASE WHEN COALESCE(%(total_answered)s, 0) > 0 "
+            "THEN ROUND(COALESCE(%(total_correct)s, 0) * 100.0 / %(total_answered)s, 2) ELSE 0 END, "
+            f"COALESCE(%(submit_at)s, {SQLITE_NOW})) "
+            "ON CONFLICT (user_id, course_id) DO UPDATE SET "
+            "progress_percent = COALESCE(%(progress_percent)s, progress_percent), "
+            "total_answered = COALESCE(%(total_answered)s, total_answered), "
+            "total_correct = COALESCE(%(total_correct)s, total_correct), "
+            "correct_rate = CASE WHEN COALESCE(%(total_answered)s, total_answered) > 0 "
+            "THEN ROUND(COALESCE(%(total_correct)s, total_correct) * 100.0 "
+            "/ COALESCE(%(total_answered)s, total_answered), 2) ELSE 0 END, "
+            f"submit_at = COALESCE(%(submit_at)s, {SQLITE_NOW})"
+        ),
+    }
 
     def upsert_progress(
         self,
@@ -242,87 +1113,180 @@ class UserCourseProgressRepository:
         progress_percent: Optional[int] = None,
         total_answered: Optional[int] = None,
         total_correct: Optional[int] = None,
-    ) -> UserCourseProgress:
-        """Create or update a user/course progress row.
+        fetch: bool = True,
+    ) -> Optional[UserCourseProgress]:
+        """Create or update a user/course progress row in a single statement.
 
         - If a row exists, only non-None fields are updated (others are preserved).
-        - correct_rate is recalculated from total_correct / total_answered.
+        - correct_rate is recalculated in SQL from total_correct / total_answered.
+        - With ``fetch=False`` the stored row is not read back and None is returned.
+        - In write-behind mode the update is only buffered; with ``fetch=True``
+          the returned row reflects it through the read overlay.
         """
 
+        if self._write_buffer is not None:
+            self._write_buffer.add(
+                user_id=user_id,
+                course_id=course_id,
+                progress_percent=progress_percent,
+                total_answered=total_answered,
+                total_correct=total_correct,
+            )
+            if not fetch:
+                return None
+            items = self.get_for_user(user_id=user_id, course_id=course_id)
+            return items[0] if items else None
+
+        params = {
+            "user_id": user_id,
+            "course_id": course_id,
+            "progress_percent": progress_percent,
+            "total_answered": total_answered,
+            "total_correct": total_correct,
+            "submit_at": None,
+        }
+
         with self._db.get_connection() as conn:
-            with conn.cursor() as cursor:
-                # Fetch existing row if present
+            with conn.cursor(_TimedCursor) as cursor:
+                cursor.execute(self._UPSERT_SQL[self._db.dialect], params)
+                if not fetch:
+                    return None
+
+                # Look up by the unique key: lastrowid is not reliable for updates
                 cursor.execute(
-                    "SELECT id, user_id, course_id, progress_percent, total_answered, total_correct, "
-                    "correct_rate, submit_at FROM user_course_progress WHERE user_id = %s AND course_id = %s",
+                    f"SELECT {PROGRESS_COLUMNS} FROM user_course_progress WHERE user_id = %s AND course_id = %s",
                     (user_id, course_id),
                 )
-                row = cursor.fetchone()
+                stored_row = cursor.fetchone()
 
-                if row:
-                    new_progress_percent = (
-                        progress_percent
-                        if progress_percent is not None
-                        else row["progress_percent"]
-                    )
-                    new_total_answered = (
-                        total_answered
-                        if total_answered is not None
-                        else row["total_answered"]
-                    )
-                    new_total_correct = (
-                        total_correct
-                        if total_correct is not None
-                        else row["total_correct"]
-                    )
-                else:
-                    new_progress_percent = progress_percent or 0
-                    new_total_answered = total_answered or 0
-                    new_total_correct = total_correct or 0
-
-                # Compute correct_rate
-                if new_total_answered > 0:
-                    correct_rate = round(new_total_correct * 100.0 / new_total_answered, 2)
-                else:
-                    correct_rate = 0.0
-
-                if row:
-                    cursor.execute(
-                        "UPDATE user_course_progress "
-                        "SET progress_percent = %s, total_answered = %s, total_correct = %s, "
-                        "correct_rate = %s, submit_at = NOW(3) "
-                        "WHERE id = %s",
-                        (
-                            new_progress_percent,
-                            new_total_answered,
-                            new_total_correct,
-                            correct_rate,
-                            row["id"],
-                        ),
-                    )
-                    progress_id = row["id"]
-                else:
-                    cursor.execute(
-                        "INSERT INTO user_course_progress "
-                        "(user_id, course_id, progress_percent, total_answered, total_correct, correct_rate, submit_at) "
-                        "VALUES (%s, %s, %s, %s, %s, %s, NOW(3))",
-                        (
-                            user_id,
-                            course_id,
-                            new_progress_percent,
-                            new_total_answered,
-                            new_total_correct,
-                            correct_rate,
-                        ),
-                    )
-                    progress_id = cursor.lastrowid
+        return UserCourseProgress(*stored_row)
 
-                # Re-fetch the stored row to return a consistent model
-                cursor.execute(
-                    "SELECT id, user_id, course_id, progress_percent, total_answered, total_correct, "
-                    "correct_rate, submit_at FROM user_course_progress WHERE id = %s",
-                    (progress_id,),
+    def iter_export(
+        self,
+        course_id: Optional[int] = None,
+        submitted_from: Optional[datetime] = None,
+        submitted_to: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[List[Tuple[Any, ...]]]:
+        """Yield matching rows in batches of tuples, in ``PROGRESS_COLUMNS`` order, by id.
+
+        Reads through ``streaming_cursor``, so at most ``batch_size`` rows are
+        held in memory. ``submitted_from`` is inclusive, ``submitted_to``
+        exclusive. Updates still waiting in the write-behind buffer are not
+        included.
+        """
+
+        query = f"SELECT {PROGRESS_COLUMNS} FROM user_course_progress"
+        conditions: List[str] = []
+        params: List[Any] = []
+        if course_id is not None:
+            conditions.append("course_id = %s")
+            params.append(course_id)
+        if submitted_from is not None:
+            conditions.append("submit_at >= %s")
+            params.append(submitted_from)
+        if submitted_to is not None:
+            conditions.append("submit_at < %s")
+            params.append(submitted_to)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+
+        with self._db.streaming_cursor() as cursor:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+
+    def upsert_many(self, updates: Sequence[ProgressUpdate]) -> None:
+        """Apply many partial progress updates at once.
+
+        Same per-row semantics as ``upsert_progress``. Without write-behind the
+        updates are written with a single multi-row statement; with it they
+        are handed to the buffer.
+        """
+
+        if self._write_buffer is not None:
+            for u in updates:
+                self._write_buffer.add(
+                    user_id=u.user_id,
+                    course_id=u.course_id,
+                    progress_percent=u.progress_percent,
+                    total_answered=u.total_answered,
+                    total_correct=u.total_correct,
                 )
-                stored_row = cursor.fetchone()
+            return
+        self._write_many(updates)
 
-        return self._row_to_model(stored_row)
+    def _write_many(self, updates: Sequence[ProgressUpdate]) -> None:
+        """Write updates with one multi-row INSERT ... ON DUPLICATE KEY UPDATE.
+
+        The rows are wrapped in a derived table because MySQL does not allow
+        ON DUPLICATE KEY UPDATE to reference columns of a bare UNION.
+        ``submit_at`` defaults to NOW(3) when an update carries no timestamp.
+        """
+
+        if not updates:
+            return
+        if self._db.dialect == "sqlite":
+            self._write_many_sqlite(updates)
+            return
+
+        row_sql = "SELECT %s AS uid, %s AS cid, %s AS pp, %s AS ta, %s AS tc, %s AS ts"
+        rows_sql = " UNION ALL ".join([row_sql] * len(updates))
+        params: List[Any] = []
+        for u in updates:
+            params.extend(
+                (u.user_id, u.course_id, u.progress_percent, u.total_answered, u.total_correct, u.submit_at)
+            )
+
+        query = (
+            "INSERT INTO user_course_progress "
+            "(user_id, course_id, progress_percent, total_answered, total_correct, correct_rate, submit_at) "
+            "SELECT n.uid, n.cid, COALESCE(n.pp, 0), COALESCE(n.ta, 0), COALESCE(n.tc, 0), "
+            "CASE WHEN COALESCE(n.ta, 0) > 0 THEN ROUND(COALESCE(n.tc, 0) * 100.0 / n.ta, 2) ELSE 0 END, "
+            "COALESCE(n.ts, NOW(3)) "
+            f"FROM ({rows_sql}) AS n "
+            "ON DUPLICATE KEY UPDATE "
+            "progress_percent = COALESCE(n.pp, progress_percent), "
+            "total_answered = COALESCE(n.ta, total_answered), "
+            "total_correct = COALESCE(n.tc, total_correct), "
+            "correct_rate = CASE WHEN total_answered > 0 "
+            "THEN ROUND(total_correct * 100.0 / total_answered, 2) ELSE 0 END, "
+            "submit_at = COALESCE(n.ts, NOW(3))"
+        )
+
+        with self._db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+
+    def _write_many_sqlite(self, updates: Sequence[ProgressUpdate]) -> None:
+        """SQLite variant of ``_write_many``: one transaction of single-row upserts.
+
+        SQLite's upsert cannot tell a NULL input apart from the inserted
+        default, so the multi-row form does not translate; without a network
+        round trip per statement the loop costs about the same.
+        """
+
+        params = [
+            {
+                "user_id": u.user_id,
+                "course_id": u.course_id,
+                "progress_percent": u.progress_percent,
+                "total_answered": u.total_answered,
+                "total_correct": u.total_correct,
+                "submit_at": u.submit_at,
+            }
+            for u in updates
+        ]
+        with self._db.get_connection() as conn:
+            conn.begin()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.executemany(self._UPSERT_SQL["sqlite"], params)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
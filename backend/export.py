@@ -0,0 +1,65 @@
+"""Streaming CSV / NDJSON encoding for bulk exports.
+
+``encode`` turns an iterator of row batches (tuples in ``columns`` order, as
+produced by ``UserCourseProgressRepository.iter_export``) into an iterator
+of byte chunks, one per batch, suitable for a streamed (chunked) response.
+Nothing but the current batch is held in memory.
+
+- ``csv``: header line, then one line per row; datetimes as ISO 8601
+- ``ndjson``: one JSON object per line, encoded by jsonutil.py
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+
+from jsonutil import dumps
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+Batch = Sequence[Tuple[Any, ...]]
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(columns: Sequence[str], batches: Iterable[Batch]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(v) for v in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(columns: Sequence[str], batches: Iterable[Batch]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(dumps(dict(zip(columns, row))) for row in batch)
+
+
+def encode(fmt: str, columns: Sequence[str], batches: Iterable[Batch]) -> Iterator[bytes]:
+    """Encode row batches as *fmt* (``csv`` or ``ndjson``); raises ValueError otherwise."""
+
+    if fmt == "csv":
+        return encode_csv(columns, batches)
+    if fmt == "ndjson":
+        return encode_ndjson(columns, batches)
+    raise ValueError(f"'format' must be one of: {', '.join(CONTENT_TYPES)}")
+
+
+def column_names(select_list: str) -> List[str]:
+    """``"id, user_id, ..."`` -> ``["id", "user_id", ...]``."""
+
+    return [name.strip() for name in select_list.split(",")]
@@ -9,13 +9,37 @@ Usage examples:
     # Generate 5 codes starting from index 100 with prefix 'A'
     python generate_codes.py 5 --start 100 --prefix A
 
-Output format (tab-separated):
+    # Every code for every prefix, as NDJSON, using all CPU cores
+    python generate_codes.py 100000 --prefix A-Z --format ndjson -o codes.ndjson
+
+    # A sorted, memory-mappable lookup file for prefixes A, B and X-Z
+    python generate_codes.py 100000 --prefix A,B,X-Z --lookup codes.bin
+
+Output format (tab-separated, the default):
 
     index<TAB>code
     0	T00000-6B9
     1	T00001-C3A
     ...
 
+Other formats (``--format``):
+
+- ``csv``: header ``index,code``, then one row per code
+- ``ndjson``: ``{"prefix": "T", "index": 0, "code": "T00000-6B9"}`` per line
+- ``bin``: the fixed-width binary layout described below (requires ``-o``)
+
+Binary layout (``--format bin`` and ``--lookup``): the 8-byte magic
+``EMCODE1\\n`` followed by one 10-byte ASCII record per code, with no
+separators. The rare code whose hash has fewer than 3 hex digits (the JS
+algorithm does not zero-pad it) is NUL-padded to 10 bytes on the right.
+Records are fixed width and the hash is a function of the index,
+so ordering by code equals ordering by (prefix, index); ``--lookup`` sorts
+the prefixes, which makes the file binary-searchable (see ``CodeLookup``).
+
+Generation is split into chunks of ``--chunk-size`` indexes that are rendered
+by a process pool (``--workers``) and written strictly in input order, so the
+output is deterministic and streamed without holding it all in memory.
+
 The hash/salt algorithm is shared with the API (see code_verifier.py).
 The salt is controlled via the CODE_SALT environment variable and defaults
 to "default-salt-key", so it stays compatible with your existing test codes.
@@ -24,8 +48,157 @@ to "default-salt-key", so it stays compatible with your existing test codes.
 from __future__ import annotations
 
 import argparse
+import json
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Tuple
+
+from code_verifier import _generate_hash, generate_codes_bulk, np
+
+FORMATS = ("tsv", "csv", "ndjson", "bin")
+
+LOOKUP_MAGIC = b"EMCODE1\n"
+RECORD_SIZE = 10  # len("X00010-8AB")
+
+_Chunk = Tuple[str, int, int, str]
+
+
+def parse_prefixes(spec: str) -> List[str]:
+    """Parse a prefix spec such as ``T``, ``A-Z`` or ``A,C,X-Z``.
+
+    Returns the prefixes uppercased, de-duplicated, in the order given.
+    """
+
+    prefixes: List[str] = []
+    for part in spec.split(","):
+        part = part.strip().upper()
+        if len(part) == 3 and part[1] == "-":
+            first, last = part[0], part[2]
+            if not (first.isalpha() and last.isalpha() and first.isascii() and last.isascii()) or first > last:
+                raise ValueError(f"invalid prefix range {part!r}")
+            letters = [chr(c) for c in range(ord(first), ord(last) + 1)]
+        elif len(part) == 1 and part.isalpha() and part.isascii():
+            letters = [part]
+        else:
+            raise ValueError(f"invalid prefix {part!r}; use a letter A–Z or a range like A-Z")
+        for letter in letters:
+            if letter not in prefixes:
+                prefixes.append(letter)
+    return prefixes
+
+
+def _chunk_codes(prefix: str, start: int, stop: int) -> List[str]:
+    if np is not None:
+        return [c.decode("ascii") for c in generate_codes_bulk(prefix, start, stop)[0]]
+    return [f"{prefix}{i:05d}-{_generate_hash(f'{prefix}{i:05d}')}" for i in range(start, stop)]
+
+
+def render_chunk(chunk: _Chunk) -> bytes:
+    """Render codes ``range(start, stop)`` for one prefix in the given format."""
+
+    prefix, start, stop, fmt = chunk
+    if fmt == "bin" and np is not None:
+        return generate_codes_bulk(prefix, start, stop).tobytes()
+
+    codes = _chunk_codes(prefix, start, stop)
+    if fmt == "bin":
+        # NUL-padded like the S10 records above
+        return b"".join(code.encode("ascii").ljust(RECORD_SIZE, b"\0") for code in codes)
+    if fmt == "tsv":
+        lines = [f"{i}\t{code}" for i, code in enumerate(codes, start)]
+    elif fmt == "csv":
+        lines = [f"{i},{code}" for i, code in enumerate(codes, start)]
+    elif fmt == "ndjson":
+        lines = [
+            json.dumps({"prefix": prefix, "index": i, "code": code}, separators=(",", ":"))
+            for i, code in enumerate(codes, start)
+        ]
+    else:
+        raise ValueError(f"unknown format {fmt!r}")
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+
+def iter_chunks(prefixes: List[str], start: int, count: int, chunk_size: int, fmt: str) -> Iterator[_Chunk]:
+    stop = start + count
+    for prefix in prefixes:
+        for lo in range(start, stop, chunk_size):
+            yield (prefix, lo, min(lo + chunk_size, stop), fmt)
+
+
+def write_codes(
+    out: BinaryIO,
+    prefixes: List[str],
+    start: int,
+    count: int,
+    fmt: str = "tsv",
+    workers: int = 1,
+    chunk_size: int = 10000,
+) -> None:
+    """Stream rendered codes to *out*, in prefix then index order."""
+
+    if fmt == "csv":
+        out.write(b"index,code\n")
+    elif fmt == "bin":
+        out.write(LOOKUP_MAGIC)
+
+    chunks = iter_chunks(prefixes, start, count, chunk_size, fmt)
+    if workers <= 1:
+        for chunk in chunks:
+            out.write(render_chunk(chunk))
+        return
 
-from code_verifier import generate_code
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields results in submission order, keeping output deterministic
+        for data in pool.map(render_chunk, chunks):
+            out.write(data)
+
+
+class CodeLookup:
+    """Memory-mapped, binary-searchable view of a sorted ``--lookup`` file."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(LOOKUP_MAGIC):
+            self._file.close()
+            raise ValueError(f"{path} is not a code lookup file")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(LOOKUP_MAGIC)] != LOOKUP_MAGIC or (size - len(LOOKUP_MAGIC)) % RECORD_SIZE:
+            self.close()
+            raise ValueError(f"{path} is not a code lookup file")
+        self._count = (size - len(LOOKUP_MAGIC)) // RECORD_SIZE
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, i: int) -> bytes:
+        offset = len(LOOKUP_MAGIC) + i * RECORD_SIZE
+        return self._mm[offset : offset + RECORD_SIZE]
+
+    def __contains__(self, code: object) -> bool:
+        if not isinstance(code, str):
+            return False
+        key = code.strip().upper().encode("ascii", "replace").ljust(RECORD_SIZE, b"\0")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self._count and self._record(lo) == key
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "CodeLookup":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
 
 def main() -> None:
@@ -33,7 +206,7 @@ def main() -> None:
     parser.add_argument(
         "count",
         type=int,
-        help="Number of codes to generate",
+        help="Number of codes to generate per prefix",
     )
     parser.add_argument(
         "--start",
@@ -45,7 +218,38 @@ def main() -> None:
         "--prefix",
         type=str,
         default="T",
-        help="Prefix letter (default: T)",
+        help="Prefix letter, list or range, e.g. T, A,B or A-Z (default: T)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="tsv",
+        help="Output format (default: tsv)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Output file (default: stdout; required for --format bin)",
+    )
+    parser.add_argument(
+        "--lookup",
+        type=str,
+        default=None,
+        help="Also write a sorted binary lookup file to this path",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes (default: 1; 0 uses all CPUs)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10000,
+        help="Indexes per work unit (default: 10000)",
     )
 
     args = parser.parse_args()
@@ -56,14 +260,29 @@ def main() -> None:
         raise SystemExit("start must be between 0 and 99999 inclusive")
     if args.start + args.count - 1 > 99999:
         raise SystemExit("start + count - 1 must not exceed 99999")
+    if args.chunk_size <= 0:
+        raise SystemExit("--chunk-size must be a positive integer")
+
+    try:
+        prefixes = parse_prefixes(args.prefix)
+    except ValueError as exc:
+        raise SystemExit(f"--prefix: {exc}")
+
+    if args.format == "bin" and args.output is None:
+        raise SystemExit("--format bin requires --output")
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
 
-    prefix = args.prefix
-    if not isinstance(prefix, str) or len(prefix) != 1 or not prefix.isalpha():
-        raise SystemExit("--prefix must be a single alphabetic character (A–Z)")
+    if args.output is None:
+        write_codes(sys.stdout.buffer, prefixes, args.start, args.count, args.format, workers, args.chunk_size)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.output, "wb") as out:
+            write_codes(out, prefixes, args.start, args.count, args.format, workers, args.chunk_size)
 
-    for i in range(args.start, args.start + args.count):
-        code = generate_code(i, prefix=prefix)
-        print(f"{i}\t{code}")
+    if args.lookup is not None:
+        with open(args.lookup, "wb") as out:
+            write_codes(out, sorted(prefixes), args.start, args.count, "bin", workers, args.chunk_size)
 
 
 if __name__ == "__main__":
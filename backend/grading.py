@@ -0,0 +1,119 @@
+"""Server-side grading of practice submissions.
+
+A practice chapter file looks like::
+
+    {"chapterId": "1", "practices": [
+        {"practiceId": "practice-001", "title": ..., "passage": ...,
+         "questions": [{"id": "q-001", "text": ..., "options": [{"id": "A", ...}],
+                        "correctAnswerId": "B"}]}]}
+
+``build_answer_key`` compiles such a chapter once (on load, see
+practice_store.py) into ``{practiceId: PracticeKey}``; grading a submission
+is then one dict lookup per question. ``strip_answers`` produces the copy of
+the chapter that can be sent to clients when grading happens on the server.
+
+Question ids are only unique within a practice (passage), so submissions
+name the practice they answer.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Fields that reveal answers; removed from the client copy of a chapter
+ANSWER_FIELDS = ("correctAnswerId", "explanation")
+
+
+class PracticeKey:
+    """Answer key of one practice: question ids in order and their correct options."""
+
+    __slots__ = ("practice_id", "question_ids", "correct")
+
+    def __init__(self, practice_id: str, questions: List[Tuple[str, Optional[str]]]) -> None:
+        self.practice_id = practice_id
+        self.question_ids: Tuple[str, ...] = tuple(qid for qid, _ in questions)
+        self.correct: Dict[str, Optional[str]] = dict(questions)
+
+
+class GradeResult:
+    __slots__ = ("practice_id", "results", "total_answered", "total_correct")
+
+    def __init__(self, practice_id: str, results: List[Dict[str, Any]], total_answered: int, total_correct: int) -> None:
+        self.practice_id = practice_id
+        self.results = results
+        self.total_answered = total_answered
+        self.total_correct = total_correct
+
+    @property
+    def correct_rate(self) -> float:
+        if self.total_answered <= 0:
+            return 0.0
+        return round(self.total_correct * 100.0 / self.total_answered, 2)
+
+
+def build_answer_key(data: Mapping[str, Any]) -> Dict[str, PracticeKey]:
+    """Compile a chapter's practices into ``{practiceId: PracticeKey}``."""
+
+    key: Dict[str, PracticeKey] = {}
+    for practice in data.get("practices") or ():
+        practice_id = str(practice.get("practiceId", ""))
+        questions = []
+        for question in practice.get("questions") or ():
+            correct = question.get("correctAnswerId")
+            questions.append((str(question.get("id")), None if correct is None else str(correct)))
+        key[practice_id] = PracticeKey(practice_id, questions)
+    return key
+
+
+def strip_answers(data: Mapping[str, Any]) -> Dict[str, Any]:
+    """Return a copy of a chapter without answer keys and explanations."""
+
+    practices = []
+    for practice in data.get("practices") or ():
+        questions = [
+            {k: v for k, v in question.items() if k not in ANSWER_FIELDS}
+            for question in practice.get("questions") or ()
+        ]
+        practices.append({**practice, "questions": questions})
+    return {**data, "practices": practices}
+
+
+def grade(
+    answer_key: Mapping[str, PracticeKey], practice_id: Optional[str], answers: Mapping[str, Any]
+) -> GradeResult:
+    """Grade ``answers`` (question id -> chosen option id) for one practice.
+
+    Every question of the practice counts as answered, as in the SPA: a
+    missing or unknown option is simply wrong. ``practice_id`` may be omitted
+    when the chapter has a single practice. Raises ValueError (with an API
+    message) for an unknown practice or question id.
+    """
+
+    if practice_id is None:
+        if len(answer_key) != 1:
+            raise ValueError("'practice_id' is required for chapters with several practices")
+        key = next(iter(answer_key.values()))
+    else:
+        key = answer_key.get(practice_id)  # type: ignore[assignment]
+        if key is None:
+            raise ValueError(f"Unknown practice '{practice_id}'")
+
+    unknown = [qid for qid in answers if qid not in key.correct]
+    if unknown:
+        raise ValueError(f"Unknown question id(s): {', '.join(sorted(map(str, unknown)))}")
+
+    results = []
+    total_correct = 0
+    for qid in key.question_ids:
+        selected = answers.get(qid)
+        selected = None if selected is None else str(selected)
+        correct_option = key.correct[qid]
+        is_correct = selected is not None and selected == correct_option
+        total_correct += is_correct
+        results.append({
+            "question_id": qid,
+            "selected_option_id": selected,
+            "correct_option_id": correct_option,
+            "correct": is_correct,
+        })
+    return GradeResult(key.practice_id, results, len(key.question_ids), total_correct)
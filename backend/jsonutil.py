@@ -0,0 +1,51 @@
+"""JSON encoding for API responses.
+
+``dumps`` writes a response body in one pass: compact, sorted keys and a
+trailing newline (the layout Flask's ``jsonify`` produces), with ``datetime``
+/ ``date`` as ISO 8601 strings and ``Decimal`` as a number, so models can
+hand over the values they read from the database without converting them
+first. Non-ASCII text is written as UTF-8.
+
+orjson is used when it is installed (see requirements-optional.txt);
+otherwise the standard library encoder with a ``default`` hook produces the
+same output.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+try:  # optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None  # type: ignore[assignment]
+
+CONTENT_TYPE = "application/json"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+    def dumps(payload: Any) -> bytes:
+        """Encode *payload* as a response body."""
+        return orjson.dumps(payload, default=_default, option=_ORJSON_OPTIONS)
+
+else:
+    _encoder = json.JSONEncoder(
+        default=_default, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+
+    def dumps(payload: Any) -> bytes:
+        """Encode *payload* as a response body."""
+        return (_encoder.encode(payload) + "\n").encode("utf-8")
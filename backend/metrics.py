@@ -0,0 +1,248 @@
+"""In-process request and database metrics, rendered in Prometheus text format.
+
+What is recorded:
+- per route: request count by status, latency histogram, and the database
+  connections, statements and time spent in the database by those requests
+- every database statement: a latency histogram
+- gauges from registered collectors (token cache, write-behind buffer,
+  connection pool), see ``register_collector``
+
+Hot-path cost is kept low: statements run during a request are only counted
+on a per-request object (no lock), and everything is folded into the shared
+registry with one lock acquisition when the request ends.
+
+Usage::
+
+    metrics.start_request()
+    ...                                  # db.py / sqlite_db.py call
+    ...                                  # record_db_connection/statement
+    metrics.finish_request("/api/course-progress", "GET", 200, elapsed)
+
+    text = metrics.render()              # served at GET /metrics
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; tuned for an API whose requests take between 0.1 ms and a few seconds
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; not thread-safe on its own (the registry locks)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        # One extra slot for observations above the last bound (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _RequestStats:
+    __slots__ = ("connections", "statements", "db_seconds", "durations")
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.durations: List[float] = []
+
+
+class _RouteStats:
+    __slots__ = ("statuses", "latency", "connections", "statements", "db_seconds")
+
+    def __init__(self) -> None:
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(REQUEST_BUCKETS)
+        self.connections = 0
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[Optional[_RequestStats]] = ContextVar("metrics_request", default=None)
+
+_lock = threading.Lock()
+_routes: Dict[Tuple[str, str], _RouteStats] = {}
+_statement_latency = Histogram(STATEMENT_BUCKETS)
+_db_connections = 0
+_collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+
+def start_request() -> None:
+    """Begin collecting database activity for the current request."""
+
+    _current.set(_RequestStats())
+
+
+def discard_request() -> None:
+    """End the current request without recording it (e.g. warm-up requests)."""
+
+    _current.set(None)
+
+
+def finish_request(route: str, method: str, status: int, seconds: float) -> None:
+    """Record a finished request and the database activity it caused."""
+
+    stats = _current.get()
+    _current.set(None)
+    global _db_connections
+    with _lock:
+        route_stats = _routes.get((route, method))
+        if route_stats is None:
+            route_stats = _routes[(route, method)] = _RouteStats()
+        route_stats.statuses[status] = route_stats.statuses.get(status, 0) + 1
+        route_stats.latency.observe(seconds)
+        if stats is not None:
+            route_stats.connections += stats.connections
+            route_stats.statements += stats.statements
+            route_stats.db_seconds += stats.db_seconds
+            _db_connections += stats.connections
+            for duration in stats.durations:
+                _statement_latency.observe(duration)
+
+
+def record_db_connection() -> None:
+    """Count a database connection checkout."""
+
+    stats = _current.get()
+    if stats is not None:
+        stats.connections += 1
+        return
+    global _db_connections
+    with _lock:
+        _db_connections += 1
+
+
+def record_db_statement(seconds: float) -> None:
+    """Count one executed statement and the time it took."""
+
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += seconds
+        stats.durations.append(seconds)
+        return
+    # Outside a request (e.g. the write-behind flusher thread)
+    with _lock:
+        _statement_latency.observe(seconds)
+
+
+def register_collector(name: str, collect: Callable[[], Dict[str, Any]]) -> None:
+    """Expose the numeric values of ``collect()`` as gauges named ``exammaster_<name>_<key>``.
+
+    ``collect`` is called on every scrape, e.g. ``TokenCache.stats``. A
+    collector registered again under the same name replaces the earlier one.
+    """
+
+    _collectors[:] = [entry for entry in _collectors if entry[0] != name]
+    _collectors.append((name, collect))
+
+
+def unregister_collector(name: str, collect: Optional[Callable[[], Dict[str, Any]]] = None) -> None:
+    """Remove the collector registered under *name* (only if it is *collect*, when given)."""
+
+    _collectors[:] = [
+        entry for entry in _collectors if entry[0] != name or (collect is not None and entry[1] != collect)
+    ]
+
+
+def reset() -> None:
+    """Forget all recorded values and collectors (for benchmarks and tests)."""
+
+    global _statement_latency, _db_connections
+    with _lock:
+        _routes.clear()
+        _statement_latency = Histogram(STATEMENT_BUCKETS)
+        _db_connections = 0
+    _collectors.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def _render_histogram(lines: List[str], name: str, labels: str, histogram: Histogram) -> None:
+    sep = "," if labels else ""
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {_format_float(histogram.sum)}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+def render() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+
+    lines: List[str] = []
+    with _lock:
+        routes = sorted(_routes.items())
+
+        lines.append("# HELP exammaster_http_requests_total HTTP requests by route, method and status.")
+        lines.append("# TYPE exammaster_http_requests_total counter")
+        for (route, method), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(
+                    f'exammaster_http_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}'
+                )
+
+        lines.append("# HELP exammaster_http_request_duration_seconds HTTP request latency by route.")
+        lines.append("# TYPE exammaster_http_request_duration_seconds histogram")
+        for (route, method), stats in routes:
+            labels = f'route="{_escape(route)}",method="{method}"'
+            _render_histogram(lines, "exammaster_http_request_duration_seconds", labels, stats.latency)
+
+        for metric, attr, help_text in (
+            ("exammaster_http_db_connections_total", "connections", "Database connection checkouts by route."),
+            ("exammaster_http_db_statements_total", "statements", "Database statements executed by route."),
+            ("exammaster_http_db_seconds_total", "db_seconds", "Time spent executing database statements by route."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (route, method), stats in routes:
+                value = getattr(stats, attr)
+                rendered = _format_float(value) if isinstance(value, float) else str(value)
+                lines.append(f'{metric}{{route="{_escape(route)}",method="{method}"}} {rendered}')
+
+        lines.append("# HELP exammaster_db_connections_total Database connection checkouts.")
+        lines.append("# TYPE exammaster_db_connections_total counter")
+        lines.append(f"exammaster_db_connections_total {_db_connections}")
+
+        lines.append("# HELP exammaster_db_statement_duration_seconds Database statement latency.")
+        lines.append("# TYPE exammaster_db_statement_duration_seconds histogram")
+        _render_histogram(lines, "exammaster_db_statement_duration_seconds", "", _statement_latency)
+
+    for name, collect in list(_collectors):
+        try:
+            values = collect()
+        except Exception:
+            continue
+        for key, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            metric = f"exammaster_{name}_{key}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {_format_float(value) if isinstance(value, float) else value}")
+
+    return "\n".join(lines) + "\n"
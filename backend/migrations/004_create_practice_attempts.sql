@@ -0,0 +1,54 @@
+-- Migration: create practice_attempts table (append-only per-question attempt log)
+--
+-- Written in batches by backend/attempt_log.py. Ids are stored compactly:
+-- practice_no / question_no are the numeric suffixes of "practice-003" / "q-012",
+-- option_no is A=1, B=2, ... (0 = unanswered).
+--
+-- Range-partitioned by month so old months can be dropped (ALTER TABLE ...
+-- DROP PARTITION) and date-bounded queries only touch the months involved.
+-- Partitioned tables cannot have foreign keys, and the partitioning column has
+-- to be part of every unique key, hence PRIMARY KEY (id, attempted_at).
+-- New months are split off p_future by AttemptRepository.add_month_partitions();
+-- run `python backend/attempt_log.py add-partitions` monthly from cron.
+
+CREATE TABLE IF NOT EXISTS practice_attempts (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  user_id BIGINT UNSIGNED NOT NULL,
+  -- chapter id of the practice file, same as user_course_progress.course_id
+  chapter_id INT UNSIGNED NOT NULL,
+
+  practice_no SMALLINT UNSIGNED NOT NULL,
+  question_no SMALLINT UNSIGNED NOT NULL,
+  option_no TINYINT UNSIGNED NOT NULL DEFAULT 0,
+  is_correct TINYINT(1) NOT NULL,
+
+  attempted_at DATETIME(3) NOT NULL,
+
+  PRIMARY KEY (id, attempted_at),
+  INDEX idx_pa_question (chapter_id, practice_no, question_no, attempted_at),
+  INDEX idx_pa_user (user_id, attempted_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (TO_DAYS(attempted_at)) (
+  PARTITION p202511 VALUES LESS THAN (TO_DAYS('2025-12-01')),
+  PARTITION p202512 VALUES LESS THAN (TO_DAYS('2026-01-01')),
+  PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')),
+  PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01')),
+  PARTITION p202603 VALUES LESS THAN (TO_DAYS('2026-04-01')),
+  PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')),
+  PARTITION p202605 VALUES LESS THAN (TO_DAYS('2026-06-01')),
+  PARTITION p202606 VALUES LESS THAN (TO_DAYS('2026-07-01')),
+  PARTITION p202607 VALUES LESS THAN (TO_DAYS('2026-08-01')),
+  PARTITION p202608 VALUES LESS THAN (TO_DAYS('2026-09-01')),
+  PARTITION p202609 VALUES LESS THAN (TO_DAYS('2026-10-01')),
+  PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+  PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')),
+  PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+  PARTITION p202701 VALUES LESS THAN (TO_DAYS('2027-02-01')),
+  PARTITION p202702 VALUES LESS THAN (TO_DAYS('2027-03-01')),
+  PARTITION p202703 VALUES LESS THAN (TO_DAYS('2027-04-01')),
+  PARTITION p202704 VALUES LESS THAN (TO_DAYS('2027-05-01')),
+  PARTITION p202705 VALUES LESS THAN (TO_DAYS('2027-06-01')),
+  PARTITION p202706 VALUES LESS THAN (TO_DAYS('2027-07-01')),
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
@@ -0,0 +1,82 @@
+-- Migration: create course_stats summary table
+--
+-- One row per course with running sums over user_course_progress, kept up to
+-- date by the triggers below: every insert, update or delete of a progress
+-- row applies its delta (NEW - OLD) to the course's summary row, in the same
+-- transaction as the change. Averages and rates are derived on read (see
+-- backend/course_stats.py). CourseStatsRepository.reconcile() recomputes the
+-- table from scratch to repair any drift.
+--
+-- Each course's row is updated by every progress write for that course, so
+-- concurrent writes for one course queue on its row lock until the earlier
+-- transaction commits.
+
+CREATE TABLE IF NOT EXISTS course_stats (
+  course_id BIGINT UNSIGNED NOT NULL,
+
+  -- number of progress rows (learners who started the course)
+  learners INT NOT NULL DEFAULT 0,
+  -- learners with progress_percent = 100
+  completed_learners INT NOT NULL DEFAULT 0,
+
+  progress_percent_sum BIGINT NOT NULL DEFAULT 0,
+  total_answered BIGINT NOT NULL DEFAULT 0,
+  total_correct BIGINT NOT NULL DEFAULT 0,
+
+  -- last full recompute by the reconcile job
+  reconciled_at DATETIME(3) NULL,
+
+  updated_at DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3)
+    ON UPDATE CURRENT_TIMESTAMP(3),
+
+  PRIMARY KEY (course_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Seed from the existing progress rows
+INSERT INTO course_stats
+  (course_id, learners, completed_learners, progress_percent_sum, total_answered, total_correct, reconciled_at)
+SELECT course_id, COUNT(*), SUM(progress_percent >= 100), SUM(progress_percent),
+       SUM(total_answered), SUM(total_correct), NOW(3)
+FROM user_course_progress
+GROUP BY course_id
+ON DUPLICATE KEY UPDATE
+  learners = VALUES(learners),
+  completed_learners = VALUES(completed_learners),
+  progress_percent_sum = VALUES(progress_percent_sum),
+  total_answered = VALUES(total_answered),
+  total_correct = VALUES(total_correct),
+  reconciled_at = VALUES(reconciled_at);
+
+-- user_course_progress columns are UNSIGNED: cast before subtracting
+CREATE TRIGGER trg_ucp_stats_insert AFTER INSERT ON user_course_progress
+FOR EACH ROW
+  INSERT INTO course_stats
+    (course_id, learners, completed_learners, progress_percent_sum, total_answered, total_correct)
+  VALUES
+    (NEW.course_id, 1, NEW.progress_percent >= 100, NEW.progress_percent, NEW.total_answered, NEW.total_correct)
+  ON DUPLICATE KEY UPDATE
+    learners = learners + 1,
+    completed_learners = completed_learners + (NEW.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum + NEW.progress_percent,
+    total_answered = total_answered + NEW.total_answered,
+    total_correct = total_correct + NEW.total_correct;
+
+CREATE TRIGGER trg_ucp_stats_update AFTER UPDATE ON user_course_progress
+FOR EACH ROW
+  UPDATE course_stats SET
+    completed_learners = completed_learners + (NEW.progress_percent >= 100) - (OLD.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum
+      + CAST(NEW.progress_percent AS SIGNED) - CAST(OLD.progress_percent AS SIGNED),
+    total_answered = total_answered + CAST(NEW.total_answered AS SIGNED) - CAST(OLD.total_answered AS SIGNED),
+    total_correct = total_correct + CAST(NEW.total_correct AS SIGNED) - CAST(OLD.total_correct AS SIGNED)
+  WHERE course_id = NEW.course_id;
+
+CREATE TRIGGER trg_ucp_stats_delete AFTER DELETE ON user_course_progress
+FOR EACH ROW
+  UPDATE course_stats SET
+    learners = learners - 1,
+    completed_learners = completed_learners - (OLD.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum - CAST(OLD.progress_percent AS SIGNED),
+    total_answered = total_answered - CAST(OLD.total_answered AS SIGNED),
+    total_correct = total_correct - CAST(OLD.total_correct AS SIGNED)
+  WHERE course_id = OLD.course_id;
@@ -0,0 +1,41 @@
+-- Migration: keep course_stats right when a progress row changes course
+--
+-- trg_ucp_stats_update (005) applied every update's delta to NEW.course_id
+-- only, so a row moved to another course left its old course counting it.
+-- Updates within a course keep the single-statement trigger; a course change
+-- moves the row out of the old course's sums and into the new course's.
+
+DROP TRIGGER IF EXISTS trg_ucp_stats_update;
+
+CREATE TRIGGER trg_ucp_stats_update AFTER UPDATE ON user_course_progress
+FOR EACH ROW
+  UPDATE course_stats SET
+    completed_learners = completed_learners + (NEW.progress_percent >= 100) - (OLD.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum
+      + CAST(NEW.progress_percent AS SIGNED) - CAST(OLD.progress_percent AS SIGNED),
+    total_answered = total_answered + CAST(NEW.total_answered AS SIGNED) - CAST(OLD.total_answered AS SIGNED),
+    total_correct = total_correct + CAST(NEW.total_correct AS SIGNED) - CAST(OLD.total_correct AS SIGNED)
+  WHERE course_id = NEW.course_id AND OLD.course_id = NEW.course_id;
+
+CREATE TRIGGER trg_ucp_stats_move_out AFTER UPDATE ON user_course_progress
+FOR EACH ROW
+  UPDATE course_stats SET
+    learners = learners - 1,
+    completed_learners = completed_learners - (OLD.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum - CAST(OLD.progress_percent AS SIGNED),
+    total_answered = total_answered - CAST(OLD.total_answered AS SIGNED),
+    total_correct = total_correct - CAST(OLD.total_correct AS SIGNED)
+  WHERE course_id = OLD.course_id AND OLD.course_id <> NEW.course_id;
+
+CREATE TRIGGER trg_ucp_stats_move_in AFTER UPDATE ON user_course_progress
+FOR EACH ROW
+  INSERT INTO course_stats
+    (course_id, learners, completed_learners, progress_percent_sum, total_answered, total_correct)
+  SELECT NEW.course_id, 1, NEW.progress_percent >= 100, NEW.progress_percent, NEW.total_answered, NEW.total_correct
+  FROM DUAL WHERE OLD.course_id <> NEW.course_id
+  ON DUPLICATE KEY UPDATE
+    learners = learners + 1,
+    completed_learners = completed_learners + (NEW.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum + NEW.progress_percent,
+    total_answered = total_answered + NEW.total_answered,
+    total_correct = total_correct + NEW.total_correct;
@@ -0,0 +1,25 @@
+-- Migration (SQLite): create users table
+-- Mirrors ../001_create_users.sql for the embedded/test backend.
+
+CREATE TABLE IF NOT EXISTS users (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+  -- identity
+  code VARCHAR(64) NOT NULL,
+  name VARCHAR(100) NULL,
+  email VARCHAR(255) NULL,
+  grade VARCHAR(20) NULL,
+
+  created_at DATETIME(3) NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+  updated_at DATETIME(3) NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+
+  CONSTRAINT uk_users_code UNIQUE (code),
+  CONSTRAINT uk_users_email UNIQUE (email)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_users_updated_at
+AFTER UPDATE ON users
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+  UPDATE users SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') WHERE id = NEW.id;
+END;
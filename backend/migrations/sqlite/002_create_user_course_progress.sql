@@ -0,0 +1,37 @@
+-- Migration (SQLite): create user_course_progress table
+-- Mirrors ../002_create_user_course_progress.sql for the embedded/test backend.
+
+CREATE TABLE IF NOT EXISTS user_course_progress (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+  user_id INTEGER NOT NULL REFERENCES users(id),
+  course_id INTEGER NOT NULL,
+
+  -- played seconds / duration of current course/video, from 0-100
+  progress_percent INTEGER NOT NULL DEFAULT 0,
+
+  -- aggregated practice stats for this course
+  total_answered INTEGER NOT NULL DEFAULT 0,
+  total_correct INTEGER NOT NULL DEFAULT 0,
+
+  -- percentage of correct answers, 0.00–100.00
+  correct_rate REAL NOT NULL DEFAULT 0.00,
+
+  -- last submit time for this course
+  submit_at DATETIME(3) NULL,
+
+  created_at DATETIME(3) NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+  updated_at DATETIME(3) NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+
+  CONSTRAINT uk_user_course UNIQUE (user_id, course_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ucp_course ON user_course_progress (course_id);
+CREATE INDEX IF NOT EXISTS idx_ucp_user ON user_course_progress (user_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_ucp_updated_at
+AFTER UPDATE ON user_course_progress
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+  UPDATE user_course_progress SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') WHERE id = NEW.id;
+END;
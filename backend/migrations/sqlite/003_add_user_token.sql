@@ -0,0 +1,8 @@
+-- Migration (SQLite): add token and token expiration to users table
+-- Mirrors ../003_add_user_token.sql and ../003_add_token_expiration.sql.
+
+ALTER TABLE users ADD COLUMN token VARCHAR(128) NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS uk_users_token ON users (token);
+
+ALTER TABLE users ADD COLUMN token_expires_at DATETIME NULL DEFAULT NULL;
+CREATE INDEX IF NOT EXISTS idx_token_expires_at ON users (token_expires_at);
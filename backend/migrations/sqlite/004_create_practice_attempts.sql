@@ -0,0 +1,19 @@
+-- Migration (SQLite): create practice_attempts table
+-- Mirrors ../004_create_practice_attempts.sql without partitioning.
+
+CREATE TABLE IF NOT EXISTS practice_attempts (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+  user_id INTEGER NOT NULL,
+  chapter_id INTEGER NOT NULL,
+
+  practice_no INTEGER NOT NULL,
+  question_no INTEGER NOT NULL,
+  option_no INTEGER NOT NULL DEFAULT 0,
+  is_correct INTEGER NOT NULL,
+
+  attempted_at DATETIME(3) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_pa_question ON practice_attempts (chapter_id, practice_no, question_no, attempted_at);
+CREATE INDEX IF NOT EXISTS idx_pa_user ON practice_attempts (user_id, attempted_at);
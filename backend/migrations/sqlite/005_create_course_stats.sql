@@ -0,0 +1,67 @@
+-- Migration (SQLite): create course_stats summary table
+-- Mirrors ../005_create_course_stats.sql: triggers apply each progress row's
+-- delta to its course's summary row.
+
+CREATE TABLE IF NOT EXISTS course_stats (
+  course_id INTEGER PRIMARY KEY,
+
+  learners INTEGER NOT NULL DEFAULT 0,
+  completed_learners INTEGER NOT NULL DEFAULT 0,
+
+  progress_percent_sum INTEGER NOT NULL DEFAULT 0,
+  total_answered INTEGER NOT NULL DEFAULT 0,
+  total_correct INTEGER NOT NULL DEFAULT 0,
+
+  reconciled_at DATETIME(3) NULL,
+
+  updated_at DATETIME(3) NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+INSERT OR REPLACE INTO course_stats
+  (course_id, learners, completed_learners, progress_percent_sum, total_answered, total_correct, reconciled_at)
+SELECT course_id, COUNT(*), SUM(progress_percent >= 100), SUM(progress_percent),
+       SUM(total_answered), SUM(total_correct), strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+FROM user_course_progress
+GROUP BY course_id;
+
+CREATE TRIGGER IF NOT EXISTS trg_ucp_stats_insert
+AFTER INSERT ON user_course_progress
+FOR EACH ROW
+BEGIN
+  INSERT OR IGNORE INTO course_stats (course_id) VALUES (NEW.course_id);
+  UPDATE course_stats SET
+    learners = learners + 1,
+    completed_learners = completed_learners + (NEW.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum + NEW.progress_percent,
+    total_answered = total_answered + NEW.total_answered,
+    total_correct = total_correct + NEW.total_correct,
+    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+  WHERE course_id = NEW.course_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ucp_stats_update
+AFTER UPDATE OF progress_percent, total_answered, total_correct ON user_course_progress
+FOR EACH ROW
+BEGIN
+  UPDATE course_stats SET
+    completed_learners = completed_learners + (NEW.progress_percent >= 100) - (OLD.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum + NEW.progress_percent - OLD.progress_percent,
+    total_answered = total_answered + NEW.total_answered - OLD.total_answered,
+    total_correct = total_correct + NEW.total_correct - OLD.total_correct,
+    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+  WHERE course_id = NEW.course_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ucp_stats_delete
+AFTER DELETE ON user_course_progress
+FOR EACH ROW
+BEGIN
+  UPDATE course_stats SET
+    learners = learners - 1,
+    completed_learners = completed_learners - (OLD.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum - OLD.progress_percent,
+    total_answered = total_answered - OLD.total_answered,
+    total_correct = total_correct - OLD.total_correct,
+    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+  WHERE course_id = OLD.course_id;
+END;
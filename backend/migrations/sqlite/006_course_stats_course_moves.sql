@@ -0,0 +1,40 @@
+-- Migration (SQLite): keep course_stats right when a progress row changes course
+-- Mirrors ../006_course_stats_course_moves.sql.
+
+DROP TRIGGER IF EXISTS trg_ucp_stats_update;
+
+CREATE TRIGGER IF NOT EXISTS trg_ucp_stats_update
+AFTER UPDATE OF progress_percent, total_answered, total_correct ON user_course_progress
+FOR EACH ROW WHEN OLD.course_id = NEW.course_id
+BEGIN
+  UPDATE course_stats SET
+    completed_learners = completed_learners + (NEW.progress_percent >= 100) - (OLD.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum + NEW.progress_percent - OLD.progress_percent,
+    total_answered = total_answered + NEW.total_answered - OLD.total_answered,
+    total_correct = total_correct + NEW.total_correct - OLD.total_correct,
+    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+  WHERE course_id = NEW.course_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ucp_stats_move
+AFTER UPDATE OF course_id ON user_course_progress
+FOR EACH ROW WHEN OLD.course_id <> NEW.course_id
+BEGIN
+  UPDATE course_stats SET
+    learners = learners - 1,
+    completed_learners = completed_learners - (OLD.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum - OLD.progress_percent,
+    total_answered = total_answered - OLD.total_answered,
+    total_correct = total_correct - OLD.total_correct,
+    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+  WHERE course_id = OLD.course_id;
+  INSERT OR IGNORE INTO course_stats (course_id) VALUES (NEW.course_id);
+  UPDATE course_stats SET
+    learners = learners + 1,
+    completed_learners = completed_learners + (NEW.progress_percent >= 100),
+    progress_percent_sum = progress_percent_sum + NEW.progress_percent,
+    total_answered = total_answered + NEW.total_answered,
+    total_correct = total_correct + NEW.total_correct,
+    updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+  WHERE course_id = NEW.course_id;
+END;
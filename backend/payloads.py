@@ -0,0 +1,150 @@
+"""Pre-encoded HTTP payloads for content that changes rarely.
+
+``EncodedPayload`` holds a response body serialized once, in identity, gzip
+and (if the optional ``brotli`` package from requirements-optional.txt is
+installed) brotli encodings, with a strong ETag per encoding.
+``select_variant`` answers a request from it: content negotiation on
+Accept-Encoding and 304 on a matching If-None-Match, without touching the
+body bytes.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:  # brotli is optional; without it only gzip and identity are offered
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None  # type: ignore[assignment]
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+JSON_CONTENT_TYPE = "application/json"
+
+
+class EncodedPayload:
+    """One response body in every supported content-encoding."""
+
+    __slots__ = ("content_type", "identity", "gzip", "br", "etag")
+
+    def __init__(self, body: bytes, content_type: str = JSON_CONTENT_TYPE) -> None:
+        self.content_type = content_type
+        self.identity = body
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        # Different bytes need different strong validators, so each encoding
+        # gets its own suffix on the shared content hash.
+        self.etag = f'"{digest}"'
+        self.gzip: Optional[bytes] = None
+        self.br: Optional[bytes] = None
+        if len(body) >= MIN_COMPRESS_SIZE:
+            # mtime=0 keeps the gzip bytes (and so the ETag) deterministic
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.gzip = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.br = compressed
+
+    @classmethod
+    def from_json(cls, data: Any) -> "EncodedPayload":
+        """Serialize *data* compactly (UTF-8, no ASCII escaping) and encode it."""
+
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return cls(body)
+
+    def etag_for(self, encoding: str) -> str:
+        if encoding == "identity":
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def sizes(self) -> Dict[str, int]:
+        return {
+            "identity": len(self.identity),
+            "gzip": len(self.gzip) if self.gzip is not None else 0,
+            "br": len(self.br) if self.br is not None else 0,
+        }
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_encoding(payload: EncodedPayload, accept_encoding: Optional[str]) -> str:
+    """Pick ``br``, ``gzip`` or ``identity`` for the request's Accept-Encoding."""
+
+    if not accept_encoding:
+        return "identity"
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for encoding in ("br", "gzip"):
+        if getattr(payload, encoding) is None:
+            continue
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etags: List[str]) -> bool:
+    """Weak comparison of an If-None-Match header against our ETags (RFC 9110)."""
+
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+def select_variant(
+    payload: EncodedPayload,
+    accept_encoding: Optional[str],
+    if_none_match: Optional[str],
+    cache_control: str,
+) -> Tuple[int, bytes, List[Tuple[str, str]]]:
+    """Return ``(status, body, headers)`` for serving *payload*.
+
+    Any of the payload's ETags in If-None-Match yields a bodiless 304, so a
+    client that switches encodings still revalidates cheaply.
+    """
+
+    encoding = choose_encoding(payload, accept_encoding)
+    headers = [
+        ("ETag", payload.etag_for(encoding)),
+        ("Cache-Control", cache_control),
+        ("Vary", "Accept-Encoding"),
+    ]
+    all_etags = [payload.etag_for(e) for e in ("identity", "gzip", "br") if e == "identity" or getattr(payload, e)]
+    if etag_matches(if_none_match, all_etags):
+        return 304, b"", headers
+
+    body = payload.identity if encoding == "identity" else getattr(payload, encoding)
+    headers.append(("Content-Type", payload.content_type))
+    if encoding != "identity":
+        headers.append(("Content-Encoding", encoding))
+    return 200, body, headers
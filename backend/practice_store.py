@@ -0,0 +1,158 @@
+"""In-memory store of practice chapters served by ``GET /api/practice/<chapter_id>``.
+
+Every ``<chapter_id>.json`` in the practice directory (the same files the SPA
+loads from /practice/) is parsed at startup and kept as ``EncodedPayload``s
+(pre-serialized, pre-compressed bytes plus ETags): the full chapter and a
+public copy without answer keys. Its compiled answer key (see grading.py)
+is kept alongside, so serving or grading a chapter is a dict lookup.
+
+Files are re-checked at most every ``reload_interval`` seconds per chapter:
+a changed mtime or size reloads the chapter, a deleted file drops it, and a
+new file is picked up the first time it is requested. A file that fails to
+parse keeps the last good version and is not parsed again until it changes.
+
+Configuration is taken from environment variables:
+- PRACTICE_DIR (default: public/practice in the repository)
+- PRACTICE_RELOAD_INTERVAL (default: 2 seconds; 0 checks on every request)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from grading import PracticeKey, build_answer_key, strip_answers
+from payloads import EncodedPayload
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRACTICE_DIR = Path(__file__).resolve().parent.parent / "public" / "practice"
+
+# Chapter ids map to file names, so only allow a safe subset
+_CHAPTER_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class PracticeChapter:
+    """A loaded chapter: parsed data, encoded payloads, answer key and file signature."""
+
+    __slots__ = ("chapter_id", "data", "payload", "public_payload", "answer_key", "mtime_ns", "size", "checked_at")
+
+    def __init__(self, chapter_id: str, data: Dict[str, Any], mtime_ns: int, size: int) -> None:
+        self.chapter_id = chapter_id
+        self.data = data
+        self.payload = EncodedPayload.from_json(data)
+        self.public_payload = EncodedPayload.from_json(strip_answers(data))
+        self.answer_key: Dict[str, PracticeKey] = build_answer_key(data)
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checked_at = time.monotonic()
+
+
+class PracticeStore:
+    """Chapter id -> ``PracticeChapter``, loaded from a directory of JSON files."""
+
+    def __init__(self, directory: Union[str, Path] = DEFAULT_PRACTICE_DIR, reload_interval: float = 2.0) -> None:
+        self._directory = Path(directory)
+        self._reload_interval = reload_interval
+        self._chapters: Dict[str, PracticeChapter] = {}
+        # chapter id -> (mtime_ns, size) of a file version that failed to load
+        self._failed: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.load_errors = 0
+
+    @classmethod
+    def from_env(cls) -> "PracticeStore":
+        return cls(
+            directory=os.getenv("PRACTICE_DIR", str(DEFAULT_PRACTICE_DIR)),
+            reload_interval=float(os.getenv("PRACTICE_RELOAD_INTERVAL", "2")),
+        )
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def load_all(self) -> List[str]:
+        """(Re)load every chapter file in the directory; return the chapter ids."""
+
+        if not self._directory.is_dir():
+            logger.warning("Practice directory %s does not exist", self._directory)
+            return []
+        for path in sorted(self._directory.glob("*.json")):
+            if _CHAPTER_ID_RE.match(path.stem):
+                self._load(path.stem, path)
+        return self.chapter_ids()
+
+    def chapter_ids(self) -> List[str]:
+        return sorted(self._chapters)
+
+    def get(self, chapter_id: str) -> Optional[PracticeChapter]:
+        """Return the chapter, reloading it first if its file changed."""
+
+        if not _CHAPTER_ID_RE.match(chapter_id):
+            return None
+        chapter = self._chapters.get(chapter_id)
+        if chapter is not None and time.monotonic() - chapter.checked_at < self._reload_interval:
+            return chapter
+        return self._refresh(chapter_id, chapter)
+
+    def _refresh(self, chapter_id: str, chapter: Optional[PracticeChapter]) -> Optional[PracticeChapter]:
+        path = self._directory / f"{chapter_id}.json"
+        try:
+            stat = path.stat()
+        except OSError:
+            if chapter is not None:
+                with self._lock:
+                    self._chapters.pop(chapter_id, None)
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if chapter is not None and (chapter.mtime_ns, chapter.size) == signature:
+            chapter.checked_at = time.monotonic()
+            return chapter
+        loaded = None if self._failed.get(chapter_id) == signature else self._load(chapter_id, path)
+        if loaded is None and chapter is not None:
+            # Keep serving the last good version; look again after the interval
+            chapter.checked_at = time.monotonic()
+        return loaded or chapter
+
+    def _load(self, chapter_id: str, path: Path) -> Optional[PracticeChapter]:
+        stat = None
+        try:
+            stat = path.stat()
+            data = json.loads(path.read_bytes())
+            if not isinstance(data, dict):
+                raise ValueError("top-level JSON value must be an object")
+            chapter = PracticeChapter(chapter_id, data, stat.st_mtime_ns, stat.st_size)
+        except (OSError, ValueError, TypeError, AttributeError) as exc:
+            self.load_errors += 1
+            logger.error("Failed to load practice file %s: %s", path, exc)
+            if stat is not None:
+                self._failed[chapter_id] = (stat.st_mtime_ns, stat.st_size)
+            return None
+
+        with self._lock:
+            self._failed.pop(chapter_id, None)
+            replaced = chapter_id in self._chapters
+            self._chapters[chapter_id] = chapter
+            if replaced:
+                self.reloads += 1
+        return chapter
+
+    def stats(self) -> Dict[str, int]:
+        chapters = list(self._chapters.values())
+        sizes = [c.payload.sizes() for c in chapters]
+        return {
+            "chapters": len(chapters),
+            "reloads": self.reloads,
+            "load_errors": self.load_errors,
+            "bytes_identity": sum(s["identity"] for s in sizes),
+            "bytes_gzip": sum(s["gzip"] for s in sizes),
+            "bytes_br": sum(s["br"] for s in sizes),
+        }
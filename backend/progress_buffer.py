@@ -0,0 +1,302 @@
+"""Write-behind buffer for course progress updates.
+
+The video player reports ``progress_percent`` every 5% of playback, but only
+the latest value per (user_id, course_id) matters. When write-behind is
+enabled, ``UserCourseProgressRepository.upsert_progress`` hands updates to a
+``ProgressWriteBuffer`` instead of writing them immediately:
+
+- Updates are coalesced in memory per (user_id, course_id); non-None fields
+  of a newer update overwrite older ones.
+- A background thread flushes the buffer as multi-row upserts every
+  ``flush_interval`` seconds, or sooner once ``max_pending`` keys are waiting.
+- ``close()`` stops the thread and flushes whatever is still pending.
+- A failed flush puts its updates back. While the database is down the
+  buffer is bounded: at most ``max_keys`` (user, course) pairs are held (an
+  update for a new pair is dropped once it is full) and an update is dropped
+  after failing ``max_retries`` flushes with no newer update for its pair.
+  Drops are logged and counted in ``stats()``.
+- ``pending_for`` exposes unflushed (and in-flight) values so reads can
+  overlay them on the stored rows.
+
+Configuration (see ``ProgressWriteBuffer.from_env``):
+- PROGRESS_WRITE_BEHIND (default: 0; set to 1 to enable)
+- PROGRESS_FLUSH_INTERVAL (default: 1.0 seconds)
+- PROGRESS_FLUSH_MAX_PENDING (default: 500 keys)
+- PROGRESS_BUFFER_MAX_KEYS (default: 100000 keys)
+- PROGRESS_FLUSH_MAX_RETRIES (default: 10 failed flushes per update)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_Key = Tuple[int, int]
+
+
+@dataclass
+class ProgressUpdate:
+    user_id: int
+    course_id: int
+    progress_percent: Optional[int] = None
+    total_answered: Optional[int] = None
+    total_correct: Optional[int] = None
+    submit_at: Optional[datetime] = None
+    # Failed flushes this update went through
+    attempts: int = 0
+
+    def merge_older(self, older: "ProgressUpdate") -> None:
+        """Fill fields this update left unset from an older update."""
+
+        if self.progress_percent is None:
+            self.progress_percent = older.progress_percent
+        if self.total_answered is None:
+            self.total_answered = older.total_answered
+        if self.total_correct is None:
+            self.total_correct = older.total_correct
+        if self.submit_at is None:
+            self.submit_at = older.submit_at
+
+
+class ProgressWriteBuffer:
+    """Coalescing, periodically flushed buffer of progress updates."""
+
+    def __init__(
+        self,
+        max_pending: int = 500,
+        flush_interval: float = 1.0,
+        max_keys: int = 100000,
+        max_retries: int = 10,
+    ) -> None:
+        if max_pending < 1:
+            raise ValueError("max_pending must be >= 1")
+        if max_keys < max_pending:
+            raise ValueError("max_keys must be >= max_pending")
+        if max_retries < 1:
+            raise ValueError("max_retries must be >= 1")
+        self._max_pending = max_pending
+        self._flush_interval = flush_interval
+        self._max_keys = max_keys
+        self._max_retries = max_retries
+        self._flush_fn: Optional[Callable[[List[ProgressUpdate]], None]] = None
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        # user_id -> course_id -> update; indexed by user so reads stay cheap
+        self._pending: Dict[int, Dict[int, ProgressUpdate]] = {}
+        self._pending_count = 0
+        # Entries taken by a flush that has not finished yet
+        self._inflight: Dict[_Key, ProgressUpdate] = {}
+
+        self.updates_received = 0
+        self.rows_flushed = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        # Updates discarded because the buffer was full / retries ran out
+        self.dropped_full = 0
+        self.dropped_retries = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.flush_seconds_last = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["ProgressWriteBuffer"]:
+        """Build a buffer from PROGRESS_* variables, or None if write-behind is off."""
+
+        if os.getenv("PROGRESS_WRITE_BEHIND", "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_pending=int(os.getenv("PROGRESS_FLUSH_MAX_PENDING", "500")),
+            flush_interval=float(os.getenv("PROGRESS_FLUSH_INTERVAL", "1.0")),
+            max_keys=int(os.getenv("PROGRESS_BUFFER_MAX_KEYS", "100000")),
+            max_retries=int(os.getenv("PROGRESS_FLUSH_MAX_RETRIES", "10")),
+        )
+
+    def start(self, flush_fn: Callable[[List[ProgressUpdate]], None]) -> None:
+        """Attach the batch writer and start the background flusher."""
+
+        self._flush_fn = flush_fn
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="progress-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def add(
+        self,
+        user_id: int,
+        course_id: int,
+        progress_percent: Optional[int] = None,
+        total_answered: Optional[int] = None,
+        total_correct: Optional[int] = None,
+    ) -> None:
+        update = ProgressUpdate(
+            user_id=user_id,
+            course_id=course_id,
+            progress_percent=progress_percent,
+            total_answered=total_answered,
+            total_correct=total_correct,
+            submit_at=datetime.now(),
+        )
+        with self._lock:
+            self.updates_received += 1
+            accepted = self._merge_locked(update)
+            full = self._pending_count >= self._max_pending
+        if not accepted:
+            logger.warning(
+                "Progress buffer full (%d keys); dropped update for user %d course %d",
+                self._max_keys, user_id, course_id,
+            )
+        if full:
+            self._wakeup.set()
+
+    def pending_for(self, user_id: int, course_id: Optional[int] = None) -> List[ProgressUpdate]:
+        """Return unflushed updates for a user, including ones being flushed."""
+
+        with self._lock:
+            merged: Dict[int, ProgressUpdate] = {}
+            for (uid, cid), entry in self._inflight.items():
+                if uid == user_id and (course_id is None or cid == course_id):
+                    merged[cid] = replace(entry)
+            for cid, entry in self._pending.get(user_id, {}).items():
+                if course_id is not None and cid != course_id:
+                    continue
+                newer = replace(entry)
+                if cid in merged:
+                    newer.merge_older(merged[cid])
+                merged[cid] = newer
+        return list(merged.values())
+
+    def flush(self) -> int:
+        """Write all pending updates now. Returns the number of rows written."""
+
+        with self._flush_lock:
+            with self._lock:
+                batch = [e for by_course in self._pending.values() for e in by_course.values()]
+                self._pending = {}
+                self._pending_count = 0
+                self._inflight = {(e.user_id, e.course_id): e for e in batch}
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                written = 0
+                for i in range(0, len(batch), self._max_pending):
+                    chunk = batch[i : i + self._max_pending]
+                    self._flush_fn(chunk)  # type: ignore[misc]
+                    written += len(chunk)
+            except Exception:
+                logger.exception("Failed to flush %d buffered progress updates", len(batch))
+                with self._lock:
+                    self.flush_errors += 1
+                    # Requeue what may be retried; rows already written are idempotent.
+                    dropped = 0
+                    for entry in batch:
+                        if not self._requeue_locked(entry):
+                            dropped += 1
+                    self._inflight = {}
+                if dropped:
+                    logger.error(
+                        "Dropped %d progress updates after %d failed flushes or with the buffer full",
+                        dropped, self._max_retries,
+                    )
+                return 0
+
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._inflight = {}
+                self.flushes += 1
+                self.rows_flushed += written
+                self.flush_seconds_last = elapsed
+                self.flush_seconds_total += elapsed
+                self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+            return written
+
+    def close(self) -> None:
+        """Stop the background flusher and flush everything still pending."""
+
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self._flush_interval * 2, 5.0))
+            self._thread = None
+        if self._flush_fn is not None:
+            self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "pending": self._pending_count,
+                "updates_received": self.updates_received,
+                "rows_flushed": self.rows_flushed,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+                "dropped_full": self.dropped_full,
+                "dropped_retries": self.dropped_retries,
+                "flush_seconds_last": self.flush_seconds_last,
+                "flush_seconds_max": self.flush_seconds_max,
+                "flush_seconds_avg": self.flush_seconds_total / self.flushes if self.flushes else 0.0,
+                # How many incoming updates each written row absorbed
+                "coalescing_ratio": self.updates_received / self.rows_flushed if self.rows_flushed else 0.0,
+            }
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - flush already logs
+                logger.exception("Progress write-behind flusher failed")
+
+    # Callers must hold self._lock for the helpers below.
+
+    def _merge_locked(self, update: ProgressUpdate) -> bool:
+        """Add *update*; False (and counted) if it needs a new key and the buffer is full."""
+
+        by_course = self._pending.get(update.user_id)
+        existing = None if by_course is None else by_course.get(update.course_id)
+        if existing is None:
+            if self._pending_count + len(self._inflight) >= self._max_keys:
+                self.dropped_full += 1
+                return False
+            self._pending_count += 1
+            if by_course is None:
+                by_course = self._pending[update.user_id] = {}
+        else:
+            update.merge_older(existing)
+        by_course[update.course_id] = update
+        return True
+
+    def _requeue_locked(self, failed: ProgressUpdate) -> bool:
+        """Put back an update whose flush failed; False (and counted) if it is dropped."""
+
+        failed.attempts += 1
+        if failed.attempts >= self._max_retries:
+            self.dropped_retries += 1
+            return False
+        by_course = self._pending.get(failed.user_id)
+        newer = None if by_course is None else by_course.get(failed.course_id)
+        if newer is None:
+            if self._pending_count >= self._max_keys:
+                self.dropped_full += 1
+                return False
+            self._pending.setdefault(failed.user_id, {})[failed.course_id] = failed
+            self._pending_count += 1
+        else:
+            newer.merge_older(failed)
+        return True
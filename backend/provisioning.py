@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Create users in bulk ahead of an exam.
+
+Users are otherwise created one at a time on first login, which turns the
+start of an exam into a burst of inserts. This pre-seeds them instead, from a
+code list or a generated index range, with chunked multi-row
+``INSERT IGNORE`` statements (``UserRepository.bulk_create``): codes that
+already have a user are skipped, so a run can be repeated or resumed.
+
+Usage examples (from the backend directory):
+
+    # Every code in a list such as T20.txt (index<TAB>code per line)
+    python provisioning.py --file T20.txt
+
+    # Indexes 0..49999 for prefixes A, B and C, generated on the fly
+    python provisioning.py --prefix A-C --start 0 --count 50000
+
+    # Only validate a list and report what would be inserted
+    python provisioning.py --file codes.tsv --dry-run
+
+Code lists may use any output format of generate_codes.py except ``bin``
+(``index<TAB>code``, ``index,code`` with its header, NDJSON) or hold one bare
+code per line. Codes are normalized (trimmed, uppercased) and checked with
+``is_code_valid``; invalid lines are counted and reported, not inserted.
+
+The same work is exposed as ``POST /api/admin/users/provision`` (see app.py).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from code_verifier import is_code_valid
+from generate_codes import _chunk_codes, parse_prefixes
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_INVALID_SAMPLES = 20
+
+
+@dataclass
+class ProvisionReport:
+    total: int = 0
+    invalid: int = 0
+    inserted: int = 0
+    existing: int = 0
+    seconds: float = 0.0
+    invalid_samples: List[str] = field(default_factory=list)
+
+    @property
+    def valid(self) -> int:
+        return self.total - self.invalid
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "inserted": self.inserted,
+            "existing": self.existing,
+            "seconds": round(self.seconds, 3),
+            "invalid_samples": list(self.invalid_samples),
+        }
+
+
+def parse_code_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the code field of every non-empty line of a code list."""
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                yield str(json.loads(line).get("code", ""))
+            except (ValueError, AttributeError):
+                yield line
+            continue
+        for sep in ("\t", ","):
+            if sep in line:
+                line = line.rsplit(sep, 1)[1].strip()
+                break
+        if line.lower() == "code":  # csv header
+            continue
+        yield line
+
+
+def generate_range(prefixes: Sequence[str], start: int, count: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield the codes for ``range(start, start + count)`` of each prefix."""
+
+    stop = start + count
+    if not 0 <= start <= stop <= 100000:
+        raise ValueError("require 0 <= start, 0 <= count and start + count <= 100000")
+    return (
+        code
+        for prefix in prefixes
+        for lo in range(start, stop, chunk_size)
+        for code in _chunk_codes(prefix, lo, min(lo + chunk_size, stop))
+    )
+
+
+def provision(
+    user_repo: Any,
+    codes: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    name: str = "Exam User",
+    validate: bool = True,
+    dry_run: bool = False,
+    progress: Optional[Callable[[ProvisionReport], None]] = None,
+) -> ProvisionReport:
+    """Validate *codes* and create their users, *chunk_size* rows per INSERT.
+
+    *progress* is called with the running report after every chunk. Pass
+    ``validate=False`` for codes that are valid by construction (generated).
+    With *dry_run* nothing is written and every valid code counts as inserted.
+    """
+
+    report = ProvisionReport()
+    started = time.perf_counter()
+    chunk: List[str] = []
+
+    def flush() -> None:
+        inserted = len(chunk) if dry_run else user_repo.bulk_create(chunk, name=name)
+        report.inserted += inserted
+        report.existing += len(chunk) - inserted
+        chunk.clear()
+        report.seconds = time.perf_counter() - started
+        if progress is not None:
+            progress(report)
+
+    for raw in codes:
+        report.total += 1
+        code = raw.strip().upper()
+        if validate and not is_code_valid(code):
+            report.invalid += 1
+            if len(report.invalid_samples) < MAX_INVALID_SAMPLES:
+                report.invalid_samples.append(raw)
+            continue
+        chunk.append(code)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk or progress is not None:
+        flush()
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _print_progress(report: ProvisionReport) -> None:
+    rate = report.valid / report.seconds if report.seconds else 0.0
+    print(
+        f"{report.total} codes read: {report.inserted} inserted, {report.existing} existing, "
+        f"{report.invalid} invalid ({rate:.0f} codes/s)",
+        file=sys.stderr,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Create users in bulk from a code list or an index range.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="Code list to load ('-' for stdin)")
+    source.add_argument("--prefix", help="Generate codes for a prefix spec such as T, A-Z or A,C,X-Z")
+    parser.add_argument("--start", type=int, default=0, help="First index for --prefix (default: 0)")
+    parser.add_argument("--count", type=int, default=100000, help="Indexes per prefix for --prefix (default: 100000)")
+    parser.add_argument("--name", default="Exam User", help="Name given to new users (default: Exam User)")
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows per INSERT statement (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Validate only; do not write to the database")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+
+    import config  # noqa: F401  (loads backend/.env)
+    from db import UserRepository, database_from_env
+
+    db = None if args.dry_run else database_from_env()
+    try:
+        repo = None if db is None else UserRepository(db)
+        if args.file:
+            stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+            with stream:
+                report = provision(
+                    repo, parse_code_lines(stream), args.chunk_size, args.name,
+                    dry_run=args.dry_run, progress=_print_progress,
+                )
+        else:
+            try:
+                codes = generate_range(parse_prefixes(args.prefix), args.start, args.count, args.chunk_size)
+            except ValueError as exc:
+                parser.error(str(exc))
+            report = provision(
+                repo, codes, args.chunk_size, args.name, validate=False,
+                dry_run=args.dry_run, progress=_print_progress,
+            )
+    finally:
+        if db is not None:
+            db.close()
+
+    for sample in report.invalid_samples:
+        print(f"invalid: {sample}", file=sys.stderr)
+    print(json.dumps(report.to_dict()))
+    return 1 if report.invalid else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
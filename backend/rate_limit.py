@@ -0,0 +1,258 @@
+"""Brute-force protection and load shedding for ``POST /api/verify-code``.
+
+A code's hash part is only three hex characters, so each index has 4096
+candidate codes and guessing is cheap. ``LoginGuard`` puts three checks in
+front of the login path, all in process memory:
+
+- per client IP: a token bucket charged for every verify-code request
+  (``RATE_LIMIT_IP_RATE`` requests/s, bursts of ``RATE_LIMIT_IP_BURST``)
+- per client IP and code index (``T00010`` of ``T00010-5E7``): a token
+  bucket charged for every *wrong* hash of a well-formed code, checked before
+  the hash is. After ``RATE_LIMIT_CODE_FAILURES`` misses from one IP, that IP
+  gets one more guess at the index every ``RATE_LIMIT_CODE_REFILL`` seconds.
+  Keying on the IP too means nobody can lock a student out of their own
+  code by sending bogus guesses for it from elsewhere
+- a concurrency ceiling on the database-backed part of the endpoint: once
+  ``VERIFY_CODE_MAX_CONCURRENCY`` requests are waiting on the database, more
+  are shed with 503 instead of queueing for pool connections
+
+Rejected requests get 429 (503 when shed) with ``Retry-After``.
+
+Each bucket is two floats, kept in an LRU bounded by ``RATE_LIMIT_MAX_KEYS``
+per limiter; evicting a key only forgets its history. Limits are per process,
+so with several workers the effective limits are multiplied accordingly.
+Many students behind one school NAT share an IP: size the IP limit for that.
+
+Behind a reverse proxy set ``RATE_LIMIT_TRUSTED_PROXIES`` to the number of
+proxies that append to X-Forwarded-For, otherwise every request appears to
+come from the proxy.
+
+Configuration (see ``LoginGuard.from_env``):
+- RATE_LIMIT_ENABLED (default: 1)
+- RATE_LIMIT_IP_RATE (default: 20 per second; 0 disables the IP limit)
+- RATE_LIMIT_IP_BURST (default: 100)
+- RATE_LIMIT_CODE_FAILURES (default: 10; 0 disables the per-index limit)
+- RATE_LIMIT_CODE_REFILL (default: 60 seconds)
+- RATE_LIMIT_MAX_KEYS (default: 100000 per limiter)
+- RATE_LIMIT_TRUSTED_PROXIES (default: 0)
+- VERIFY_CODE_MAX_CONCURRENCY (default: 16; 0 disables shedding)
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by string, in a bounded thread-safe LRU.
+
+    A bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per
+    second. Methods return 0.0 when allowed, otherwise the seconds until a
+    token is available.
+    """
+
+    def __init__(self, rate: float, burst: float, maxsize: int = 100000) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst >= 1")
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self._rate = rate
+        self._burst = float(burst)
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        # key -> [tokens, monotonic time of the last update]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """Take *cost* tokens from *key*'s bucket if it has them."""
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self._burst, now]
+                self._buckets[key] = bucket
+                while len(self._buckets) > self._maxsize:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._buckets.move_to_end(key)
+                self._refill(bucket, now)
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                self.allowed += 1
+                return 0.0
+            self.limited += 1
+            return (cost - bucket[0]) / self._rate
+
+    def peek(self, key: str) -> float:
+        """Like ``acquire`` for one token, without taking it or adding the key."""
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return 0.0
+            self._refill(bucket, now)
+            if bucket[0] >= 1.0:
+                return 0.0
+            self.limited += 1
+            return (1.0 - bucket[0]) / self._rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "size": len(self._buckets),
+                "maxsize": self._maxsize,
+                "allowed": self.allowed,
+                "limited": self.limited,
+                "evictions": self.evictions,
+            }
+
+    # Callers must hold self._lock.
+    def _refill(self, bucket: List[float], now: float) -> None:
+        bucket[0] = min(self._burst, bucket[0] + (now - bucket[1]) * self._rate)
+        bucket[1] = now
+
+
+class ConcurrencyLimiter:
+    """Non-blocking counting semaphore: excess callers are refused, not queued."""
+
+    def __init__(self, limit: int) -> None:
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        self._limit = limit
+        self._lock = threading.Lock()
+        self.active = 0
+        self.shed = 0
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.active >= self._limit:
+                self.shed += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"limit": self._limit, "active": self.active, "shed": self.shed}
+
+
+def client_ip(remote_addr: Optional[str], forwarded_for: Optional[str], trusted_proxies: int = 0) -> str:
+    """Client address, taking the X-Forwarded-For hop added by the outermost trusted proxy."""
+
+    if trusted_proxies > 0 and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(trusted_proxies, len(hops))]
+    return remote_addr or "unknown"
+
+
+def code_index_key(code: str, client: str = "") -> str:
+    """Per-index bucket key: ``"T00010-5E7"`` from *client* -> ``"<client>|T00010"``."""
+
+    return f"{client}|{code.split('-', 1)[0]}"
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class LoginGuard:
+    """The verify-code checks described in the module docstring.
+
+    Any of the three parts may be None (disabled).
+    """
+
+    def __init__(
+        self,
+        ip_limiter: Optional[TokenBucketLimiter] = None,
+        code_limiter: Optional[TokenBucketLimiter] = None,
+        concurrency: Optional[ConcurrencyLimiter] = None,
+        trusted_proxies: int = 0,
+    ) -> None:
+        self.ip_limiter = ip_limiter
+        self.code_limiter = code_limiter
+        self.concurrency = concurrency
+        self.trusted_proxies = trusted_proxies
+
+    @classmethod
+    def from_env(cls) -> Optional["LoginGuard"]:
+        """Build the guard from RATE_LIMIT_* variables, or None if disabled."""
+
+        if os.getenv("RATE_LIMIT_ENABLED", "1").lower() not in ("1", "true", "yes"):
+            return None
+        maxsize = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+        ip_rate = float(os.getenv("RATE_LIMIT_IP_RATE", "20"))
+        code_failures = int(os.getenv("RATE_LIMIT_CODE_FAILURES", "10"))
+        max_concurrency = int(os.getenv("VERIFY_CODE_MAX_CONCURRENCY", "16"))
+        return cls(
+            ip_limiter=(
+                TokenBucketLimiter(ip_rate, float(os.getenv("RATE_LIMIT_IP_BURST", "100")), maxsize)
+                if ip_rate > 0 else None
+            ),
+            code_limiter=(
+                TokenBucketLimiter(1.0 / float(os.getenv("RATE_LIMIT_CODE_REFILL", "60")), code_failures, maxsize)
+                if code_failures > 0 else None
+            ),
+            concurrency=ConcurrencyLimiter(max_concurrency) if max_concurrency > 0 else None,
+            trusted_proxies=int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0")),
+        )
+
+    def client(self, remote_addr: Optional[str], forwarded_for: Optional[str]) -> str:
+        """The client IP the limits are keyed on."""
+
+        return client_ip(remote_addr, forwarded_for, self.trusted_proxies)
+
+    def check_client(self, client: str) -> float:
+        """Charge one request to *client*; seconds to wait if over the limit."""
+
+        if self.ip_limiter is None:
+            return 0.0
+        return self.ip_limiter.acquire(client)
+
+    def check_code(self, code: str, client: str) -> float:
+        """Seconds before *client* may guess *code*'s index again (0.0: go ahead)."""
+
+        if self.code_limiter is None:
+            return 0.0
+        return self.code_limiter.peek(code_index_key(code, client))
+
+    def record_failure(self, code: str, client: str) -> None:
+        """Charge a wrong hash from *client* to *code*'s index."""
+
+        if self.code_limiter is not None:
+            self.code_limiter.acquire(code_index_key(code, client))
+
+    def try_enter(self) -> bool:
+        """Reserve a database slot; False means shed the request. Pair with ``leave``."""
+
+        return self.concurrency is None or self.concurrency.try_acquire()
+
+    def leave(self) -> None:
+        if self.concurrency is not None:
+            self.concurrency.release()
+
+    def stats(self) -> Dict[str, float]:
+        stats: Dict[str, float] = {}
+        for name, part in (("ip", self.ip_limiter), ("code", self.code_limiter), ("concurrency", self.concurrency)):
+            if part is not None:
+                stats.update({f"{name}_{key}": value for key, value in part.stats().items()})
+        return stats
@@ -0,0 +1,261 @@
+"""Embedded SQLite storage backend.
+
+``SQLiteDatabase`` is a drop-in replacement for ``db.Database`` for
+single-node deployments, benchmarks and tests: it needs no server, and the
+repositories in db.py pick their SQLite statements through its ``dialect``.
+
+- The schema is created from migrations/sqlite on startup.
+- File databases run in WAL mode with tuned pragmas (see
+  ``sqlite_support.configure_wal``).
+- Each thread keeps its own connection, opened on first use and reused for
+  every later ``get_connection()``; there is no pool to wait on. A thread's
+  connection is closed when the thread exits.
+
+Connections handed out by ``get_connection()`` mimic the small part of the
+PyMySQL API the repositories use (``cursor()`` as a context manager, with
+dict rows or, given a cursor class, tuple rows,
+``begin``/``commit``/``rollback``, ``lastrowid``) and accept ``%s`` /
+``%(name)s`` parameters.
+
+Configuration is taken from environment variables:
+- SQLITE_PATH (default: exammaster.sqlite3 next to this file; ``:memory:``
+  gives a private in-memory database, served by one connection that threads
+  take turns on)
+- SQLITE_BUSY_TIMEOUT (default: 5000 milliseconds)
+- SQLITE_CACHE_SIZE (default: 16384 KiB page cache per connection)
+- SQLITE_MMAP_SIZE (default: 67108864 bytes)
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import metrics
+from sqlite_support import apply_migrations, configure_wal, connect, translate_params
+
+DEFAULT_PATH = Path(__file__).parent / "exammaster.sqlite3"
+
+
+class SQLiteCursor:
+    """PyMySQL-style cursor over a ``sqlite3.Cursor``."""
+
+    __slots__ = ("_cursor",)
+
+    def __init__(self, cursor: sqlite3.Cursor) -> None:
+        self._cursor = cursor
+
+    def __enter__(self) -> "SQLiteCursor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._cursor.close()
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def execute(self, sql: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> int:
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(translate_params(sql), params)
+        finally:
+            metrics.record_db_statement(time.perf_counter() - started)
+        return self._cursor.rowcount
+
+    def executemany(self, sql: str, seq_of_params: Sequence[Any]) -> int:
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(translate_params(sql), seq_of_params)
+        finally:
+            metrics.record_db_statement(time.perf_counter() - started)
+        return self._cursor.rowcount
+
+    def fetchone(self) -> Optional[Any]:
+        return self._cursor.fetchone()
+
+    def fetchall(self) -> List[Any]:
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: int) -> List[Any]:
+        return self._cursor.fetchmany(size)
+
+
+class SQLiteConnection:
+    """PyMySQL-style wrapper around one autocommit ``sqlite3.Connection``."""
+
+    __slots__ = ("_conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def cursor(self, cursor_class: Optional[type] = None) -> SQLiteCursor:
+        """Rows are dicts; passing a cursor class (as with PyMySQL's tuple
+        ``Cursor``) returns plain tuples instead."""
+        cursor = self._conn.cursor()
+        if cursor_class is not None:
+            cursor.row_factory = None
+        return SQLiteCursor(cursor)
+
+    def begin(self) -> None:
+        # IMMEDIATE takes the write lock up front, so a read-then-write
+        # transaction cannot fail halfway with SQLITE_BUSY.
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class SQLiteDatabase:
+    """SQLite counterpart of ``db.Database`` with a per-thread connection cache."""
+
+    dialect = "sqlite"
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_PATH,
+        busy_timeout_ms: int = 5000,
+        cache_size_kib: int = 16384,
+        mmap_size: int = 64 * 1024 * 1024,
+    ) -> None:
+        self._busy_timeout_ms = busy_timeout_ms
+        self._cache_size_kib = cache_size_kib
+        self._mmap_size = mmap_size
+        self._path = str(path)
+        self._memory = self._path == ":memory:"
+        # An in-memory database lives in a single connection, so all threads
+        # share it and take turns through this lock.
+        self._memory_lock = threading.RLock()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Weak, so a thread's connection is closed when the thread goes away
+        self._connections: "weakref.WeakSet[SQLiteConnection]" = weakref.WeakSet()
+        self._closed = False
+
+        # Opened eagerly to apply the schema; for :memory: it is the database.
+        self._anchor = self._open()
+        apply_migrations(self._anchor._conn)
+
+    @classmethod
+    def from_env(cls, path: Optional[str] = None) -> "SQLiteDatabase":
+        """Settings from SQLITE_* variables; *path* overrides SQLITE_PATH (used for replicas)."""
+
+        return cls(
+            path=path or os.getenv("SQLITE_PATH", str(DEFAULT_PATH)),
+            busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+            cache_size_kib=int(os.getenv("SQLITE_CACHE_SIZE", "16384")),
+            mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024))),
+        )
+
+    @property
+    def pool(self) -> None:
+        """SQLite connections are cached per thread, not pooled."""
+
+        return None
+
+    def _open(self) -> SQLiteConnection:
+        # check_same_thread=False only so close() can close every thread's
+        # connection; each connection is otherwise used by its own thread.
+        raw = connect(self._path, check_same_thread=False)
+        if not self._memory:
+            configure_wal(raw, self._busy_timeout_ms, self._cache_size_kib, self._mmap_size)
+        conn = SQLiteConnection(raw)
+        with self._lock:
+            if self._closed:
+                raw.close()
+                raise RuntimeError("database is closed")
+            self._connections.add(conn)
+        return conn
+
+    @contextmanager
+    def get_connection(self) -> Iterator[SQLiteConnection]:
+        """Yield this thread's connection (opened on first use)."""
+
+        metrics.record_db_connection()
+        if self._memory:
+            with self._memory_lock:
+                yield from self._use(self._anchor)
+            return
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        yield from self._use(conn)
+
+    @contextmanager
+    def streaming_cursor(self) -> Iterator[SQLiteCursor]:
+        """Yield a tuple-row cursor for large result sets (see ``db.Database``).
+
+        SQLite produces rows lazily as they are fetched. File databases use a
+        dedicated connection, closed afterwards, so a long export does not
+        hold this thread's cached one; ``:memory:`` uses the shared connection
+        and keeps other threads waiting until the cursor is closed.
+        """
+
+        metrics.record_db_connection()
+        if self._memory:
+            with self._memory_lock:
+                with self._anchor.cursor(tuple) as cursor:
+                    yield cursor
+            return
+
+        conn = SQLiteConnection(connect(self._path))
+        configure_wal(conn._conn, self._busy_timeout_ms, self._cache_size_kib, self._mmap_size)
+        try:
+            with conn.cursor(tuple) as cursor:
+                yield cursor
+        finally:
+            conn.close()
+
+    # Without replicas, reads share the connections used for writes
+    replicated = False
+
+    def get_read_connection(self):
+        return self.get_connection()
+
+    def warm_up(self, connections: int = 1) -> int:
+        """Open and check this thread's connection; other threads open theirs on first use."""
+
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        return 1
+
+    @staticmethod
+    def _use(conn: SQLiteConnection) -> Iterator[SQLiteConnection]:
+        try:
+            yield conn
+        except BaseException:
+            # Never leave a half-finished transaction on a cached connection
+            conn.rollback()
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -0,0 +1,135 @@
+"""Helpers for running the repositories' SQL on SQLite.
+
+The repositories are written for PyMySQL (``%s`` / ``%(name)s`` parameters,
+``DATETIME`` columns returned as ``datetime``). This module bridges SQLite:
+
+- ``translate_params`` rewrites pyformat placeholders to SQLite's ``?`` /
+  ``:name`` style (results are memoized per statement).
+- ``connect`` opens a connection that converts ``DATETIME`` columns to
+  ``datetime`` and stores ``datetime`` parameters as ISO text.
+- ``apply_migrations`` applies ``migrations/sqlite/*.sql`` in order, once,
+  tracking applied files in ``schema_migrations``.
+- ``configure_wal`` switches a file database to WAL mode with pragmas tuned
+  for a small web server (many readers, short write transactions).
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Union
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations" / "sqlite"
+
+# SQL fragment equivalent to MySQL's NOW(3) (local time, millisecond precision).
+# Its strftime codes contain no "%s", so it survives translate_params.
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+
+_PYFORMAT_RE = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+def _adapt_datetime(value: datetime) -> str:
+    return value.isoformat(sep=" ")
+
+
+def _convert_datetime(value: bytes) -> Optional[datetime]:
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+# Column declared as DATETIME / DATETIME(3); SQLite matches on the first word
+sqlite3.register_converter("DATETIME", _convert_datetime)
+
+
+@lru_cache(maxsize=256)
+def translate_params(sql: str) -> str:
+    """Rewrite ``%s`` to ``?`` and ``%(name)s`` to ``:name``."""
+
+    def _sub(match: "re.Match[str]") -> str:
+        if match.group(0) == "%%":
+            return "%"
+        name = match.group(1)
+        return f":{name}" if name else "?"
+
+    return _PYFORMAT_RE.sub(_sub, sql)
+
+
+def connect(path: Union[str, Path], check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a SQLite connection configured for the repositories.
+
+    Rows are returned as dicts (like PyMySQL's DictCursor) and the connection
+    is in autocommit mode.
+    """
+
+    conn = sqlite3.connect(
+        str(path),
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=check_same_thread,
+        isolation_level=None,
+    )
+    conn.row_factory = _dict_factory
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _dict_factory(cursor: sqlite3.Cursor, row: tuple) -> dict:
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+def configure_wal(
+    conn: sqlite3.Connection,
+    busy_timeout_ms: int = 5000,
+    cache_size_kib: int = 16384,
+    mmap_size: int = 64 * 1024 * 1024,
+) -> None:
+    """Apply WAL mode and per-connection tuning pragmas.
+
+    - ``journal_mode=WAL``: readers never block the writer and vice versa.
+    - ``synchronous=NORMAL``: fsync at checkpoints only; safe in WAL mode
+      (a power loss can drop the last commits but never corrupts the file).
+    - ``busy_timeout``: wait for the write lock instead of failing at once.
+    - ``cache_size`` / ``mmap_size``: keep the hot pages in memory.
+    """
+
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute(f"PRAGMA cache_size = -{int(cache_size_kib)}")
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+
+def apply_migrations(conn: sqlite3.Connection, directory: Path = MIGRATIONS_DIR) -> List[str]:
+    """Apply pending ``*.sql`` files from *directory*; return the names applied."""
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name TEXT PRIMARY KEY, "
+        f"applied_at DATETIME(3) NOT NULL DEFAULT ({SQLITE_NOW}))"
+    )
+    applied = {row["name"] for row in conn.execute("SELECT name FROM schema_migrations")}
+    newly_applied: List[str] = []
+    for path in sorted(directory.glob("*.sql")):
+        if path.name in applied:
+            continue
+        script = path.read_text(encoding="utf-8")
+        try:
+            conn.executescript(
+                "BEGIN;\n"
+                f"{script}\n"
+                f"INSERT INTO schema_migrations (name) VALUES ('{path.name}');\n"
+                "COMMIT;"
+            )
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        newly_applied.append(path.name)
+    return newly_applied
@@ -0,0 +1,34 @@
+"""Shared fixtures. Tests run against the SQLite backend, no MySQL needed:
+
+    cd backend && python -m pytest tests
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db import UserCourseProgressRepository, UserRepository  # noqa: E402
+from sqlite_db import SQLiteDatabase  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    database = SQLiteDatabase(":memory:")
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def users(db):
+    return UserRepository(db)
+
+
+@pytest.fixture
+def progress(db):
+    return UserCourseProgressRepository(db)
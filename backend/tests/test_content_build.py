@@ -0,0 +1,26 @@
+import pytest
+
+from content_build import render_inline, render_markdown
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("**<i>x**</i>", "<strong><i>x</i></strong>"),
+        ("**<i>x**</i> y", "<strong><i>x</i></strong> y"),
+        ("**[a**](https://example.com) b", '<strong><a href="https://example.com">a</a></strong> b'),
+        ("<i>a<b>b</i>c</b>", "<i>a<b>b</b></i>c"),
+        ("a </b> b <u>c", "a  b <u>c</u>"),
+        ("<b>x</b> **y**<br>`<i>`", "<b>x</b> <strong>y</strong><br><code>&lt;i&gt;</code>"),
+    ],
+)
+def test_inline_tags_are_balanced(text, expected):
+    assert render_inline(text, {}) == expected
+
+
+def test_unsafe_markup_stays_escaped():
+    rendered = render_markdown('<img src=x onerror="alert(1)"> [x](javascript:alert(1)) <b onclick="y">z</b>')
+
+    assert "<img" not in rendered and "&lt;img" in rendered
+    assert "href" not in rendered
+    assert "onclick" not in rendered and "<b>z</b>" in rendered
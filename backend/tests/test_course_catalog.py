@@ -0,0 +1,18 @@
+import json
+
+from course_catalog import CourseCatalog
+
+
+def test_broken_file_is_not_reparsed_until_it_changes(tmp_path):
+    path = tmp_path / "courses.json"
+    path.write_text('{"courses": [')
+    catalog = CourseCatalog(path, reload_interval=0)
+
+    for _ in range(3):
+        assert catalog.index() is None
+    assert catalog.load_errors == 1
+
+    path.write_text(json.dumps({"courses": [{"id": "c1", "tags": ["go"], "duration": 60}]}))
+    index = catalog.index()
+    assert index is not None and index.get("c1") is not None
+    assert catalog.load_errors == 1
@@ -0,0 +1,182 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from course_stats import CourseStatsRepository
+from db import UserCourseProgressRepository
+from sqlite_db import SQLiteDatabase
+
+
+def _snapshot(repo):
+    # Triggers leave zeroed rows behind that reconcile() prunes
+    return [
+        {k: v for k, v in stats.to_dict().items() if k != "reconciled_at"}
+        for stats in repo.get_many()
+        if stats.learners
+    ]
+
+
+def _execute(db, sql, params=()):
+    with db.get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+@pytest.fixture
+def stats_repo(db):
+    _execute(db, "INSERT INTO users (code, name) VALUES ('T1', 'a'), ('T2', 'b')")
+    return CourseStatsRepository(db)
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    # A file, so every thread gets a connection of its own
+    database = SQLiteDatabase(str(tmp_path / "stats.db"))
+    _execute(database, "INSERT INTO users (code, name) VALUES ('T1', 'a'), ('T2', 'b')")
+    yield database
+    database.close()
+
+
+class _PausedReconcile:
+    """Wraps a database so ``reconcile`` stops after its recompute, before committing."""
+
+    def __init__(self, db):
+        self._db = db
+        self.dialect = db.dialect
+        self.paused = threading.Event()
+        self.resume = threading.Event()
+
+    @contextmanager
+    def get_connection(self):
+        with self._db.get_connection() as conn:
+            yield _PausingConnection(conn, self)
+
+
+class _PausingConnection:
+    def __init__(self, conn, owner):
+        self._conn = conn
+        self._owner = owner
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @contextmanager
+    def cursor(self, *args):
+        with self._conn.cursor(*args) as cursor:
+            yield _PausingCursor(cursor, self._owner)
+
+
+class _PausingCursor:
+    def __init__(self, cursor, owner):
+        self._cursor = cursor
+        self._owner = owner
+
+    def execute(self, sql, params=()):
+        result = self._cursor.execute(sql, params)
+        if sql.startswith("INSERT INTO course_stats"):
+            self._owner.paused.set()
+            self._owner.resume.wait(5)
+        return result
+
+
+def _insert(db, user_id, course_id, percent, answered=10, correct=5):
+    _execute(
+        db,
+        "INSERT INTO user_course_progress "
+        "(user_id, course_id, progress_percent, total_answered, total_correct) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (user_id, course_id, percent, answered, correct),
+    )
+
+
+def test_triggers_track_inserts_updates_and_deletes(db, stats_repo):
+    _insert(db, 1, 1, 100)
+    _insert(db, 2, 1, 50)
+    _insert(db, 1, 2, 30)
+    _execute(db, "UPDATE user_course_progress SET progress_percent = 60 WHERE user_id = 2 AND course_id = 1")
+    _execute(db, "DELETE FROM user_course_progress WHERE user_id = 1 AND course_id = 2")
+
+    by_course = {stats.course_id: stats for stats in stats_repo.get_many()}
+    assert by_course[1].learners == 2
+    assert by_course[1].avg_progress_percent == 80.0
+
+    triggered = _snapshot(stats_repo)
+    stats_repo.reconcile()
+    assert _snapshot(stats_repo) == triggered
+
+
+def test_course_move_does_not_drift_from_reconcile(db, stats_repo):
+    _insert(db, 1, 1, 100)
+    _insert(db, 2, 1, 50)
+    _execute(
+        db,
+        "UPDATE user_course_progress SET course_id = 3, total_answered = 12 "
+        "WHERE user_id = 2 AND course_id = 1",
+    )
+
+    triggered = _snapshot(stats_repo)
+    stats_repo.reconcile()
+    assert _snapshot(stats_repo) == triggered
+    assert [stats.learners for stats in stats_repo.get_many([1, 3])] == [1, 1]
+
+
+def _assert_in_sync(repo):
+    triggered = _snapshot(repo)
+    repo.reconcile()
+    assert _snapshot(repo) == triggered
+
+
+def test_write_during_reconcile_is_not_lost(file_db):
+    progress = UserCourseProgressRepository(file_db)
+    progress.upsert_progress(1, 1, progress_percent=20, total_answered=4, total_correct=2)
+    paused = _PausedReconcile(file_db)
+    reconcile = threading.Thread(target=CourseStatsRepository(paused).reconcile)
+    reconcile.start()
+    assert paused.paused.wait(5)
+
+    write = threading.Thread(
+        target=progress.upsert_progress, args=(2, 1), kwargs={"progress_percent": 100, "total_answered": 6}
+    )
+    write.start()
+    write.join(0.2)
+    assert write.is_alive()  # waits for the reconcile to commit
+
+    paused.resume.set()
+    reconcile.join(5)
+    write.join(5)
+
+    stats = CourseStatsRepository(file_db)
+    assert [(s.learners, s.total_answered) for s in stats.get_many([1])] == [(2, 10)]
+    _assert_in_sync(stats)
+
+
+def test_reconcile_waits_for_an_open_write(file_db):
+    _insert(file_db, 1, 1, 20)
+    written = threading.Event()
+    commit = threading.Event()
+
+    def write():
+        with file_db.get_connection() as conn:
+            conn.begin()
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE user_course_progress SET total_answered = 30 WHERE user_id = 1")
+            written.set()
+            commit.wait(5)
+            conn.commit()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    assert written.wait(5)
+    stats = CourseStatsRepository(file_db)
+    reconcile = threading.Thread(target=stats.reconcile)
+    reconcile.start()
+    reconcile.join(0.2)
+    assert reconcile.is_alive()
+
+    commit.set()
+    writer.join(5)
+    reconcile.join(5)
+
+    assert stats.get_many([1])[0].total_answered == 30
+    _assert_in_sync(stats)
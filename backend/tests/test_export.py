@@ -0,0 +1,36 @@
+import logging
+
+import pytest
+
+from app import create_app
+from config import AppConfig
+
+
+@pytest.fixture
+def app(db):
+    app = create_app(AppConfig(admin_token="admin-secret", warmup="off"), db=db)
+    yield app
+    app.extensions["exammaster"].close()
+
+
+def test_export_failure_mid_stream_is_logged(app, caplog):
+    def failing_export(*args, **kwargs):
+        yield [(1, 1, 1, 50, 10, 5, 50.0, None)]
+        raise RuntimeError("connection lost")
+
+    app.extensions["exammaster"].progress_repo.iter_export = failing_export
+    client = app.test_client()
+
+    with caplog.at_level(logging.ERROR):
+        response = client.get(
+            "/api/admin/progress/export?format=ndjson",
+            headers={"Authorization": "Bearer admin-secret"},
+        )
+        # Headers went out before the rows: the body is cut short instead
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).count("\n") == 1
+
+    assert any(
+        record.getMessage() == "Progress export failed" and record.exc_info
+        for record in caplog.records
+    )
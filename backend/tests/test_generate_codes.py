@@ -0,0 +1,47 @@
+import io
+
+import pytest
+
+import code_verifier
+import generate_codes
+from generate_codes import RECORD_SIZE, CodeLookup, render_chunk, write_codes
+
+_MASK32 = 0xFFFFFFFF
+
+
+@pytest.fixture
+def short_hash_salt(monkeypatch):
+    """Pick the salt term so ``T00003`` hashes to 0x5A, i.e. the 9-character code ``T00003-5A``."""
+
+    salt_hash = (0x5A - code_verifier._rolling_hash("T00003") * code_verifier._SALT_POW) & _MASK32
+    monkeypatch.setattr(code_verifier, "_SALT_HASH", salt_hash)
+    assert code_verifier.generate_code(3) == "T00003-5A"
+
+
+def test_bin_records_stay_fixed_width_without_numpy(short_hash_salt, monkeypatch, tmp_path):
+    monkeypatch.setattr(generate_codes, "np", None)
+    data = render_chunk(("T", 0, 10, "bin"))
+
+    assert len(data) == 10 * RECORD_SIZE
+    assert data[3 * RECORD_SIZE : 4 * RECORD_SIZE] == b"T00003-5A\0"
+
+    path = tmp_path / "codes.bin"
+    with open(path, "wb") as out:
+        write_codes(out, ["T"], 0, 10, fmt="bin")
+    with CodeLookup(str(path)) as lookup:
+        assert len(lookup) == 10
+        assert "t00003-5a" in lookup
+        assert code_verifier.generate_code(9) in lookup
+        assert "T00003-5A0" not in lookup
+
+
+def test_bin_output_matches_numpy(short_hash_salt, monkeypatch):
+    pytest.importorskip("numpy")
+    vectorized = io.BytesIO()
+    write_codes(vectorized, ["T"], 0, 10, fmt="bin")
+
+    monkeypatch.setattr(generate_codes, "np", None)
+    pure = io.BytesIO()
+    write_codes(pure, ["T"], 0, 10, fmt="bin")
+
+    assert vectorized.getvalue() == pure.getvalue()
@@ -0,0 +1,108 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from db import ReplicatedDatabase, UserRepository, start_request_routing
+from sqlite_db import SQLiteDatabase
+from token_cache import TokenCache
+
+
+class _DownReplica:
+    """Stands in for a replica that refuses connections."""
+
+    dialect = "sqlite"
+
+    @contextmanager
+    def get_connection(self):
+        raise sqlite3.OperationalError("unable to open database file")
+        yield
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    # Separate files, so a row written through the primary is missing on the "replica"
+    database = ReplicatedDatabase(
+        SQLiteDatabase(str(tmp_path / "primary.db")),
+        [SQLiteDatabase(str(tmp_path / "replica.db"))],
+        health_interval=0,
+    )
+    start_request_routing()
+    yield database
+    start_request_routing()
+    database.close()
+
+
+def test_reads_go_to_the_replica(replicated):
+    with replicated.get_read_connection():
+        pass
+
+    assert replicated.stats()["replica0_reads"] == 1
+    assert replicated.primary_reads == 0
+
+
+def test_reads_after_a_write_stay_on_the_primary(replicated):
+    users = UserRepository(replicated)
+    users.create("T00001-ABC")
+
+    assert users.get_by_code("T00001-ABC") is not None
+    assert replicated.primary_reads == 1
+    assert replicated.stats()["replica0_reads"] == 0
+
+    start_request_routing()
+    assert users.get_by_code("T00001-ABC") is None
+    assert replicated.stats()["replica0_reads"] == 1
+
+
+def test_code_miss_on_the_replica_stays_there(replicated):
+    users = UserRepository(replicated)
+
+    assert users.get_by_code("T99999-ZZZ") is None
+    assert replicated.primary_reads == 0
+
+    # A miss does not pin the request either
+    with replicated.get_read_connection():
+        pass
+    assert replicated.stats()["replica0_reads"] == 2
+
+
+@pytest.mark.parametrize("token_cache", [None, TokenCache()], ids=["uncached", "cached"])
+def test_fresh_login_resolves_against_a_stale_replica(replicated, token_cache):
+    users = UserRepository(replicated, token_cache=token_cache)
+    user = users.login_with_code("T00001-ABC", "fresh-token")
+
+    # Next request: the replica has not seen the login yet
+    start_request_routing()
+    found = users.get_by_token("fresh-token")
+    assert found is not None and found.id == user.id
+    assert users.get_by_token("unknown-token") is None
+
+
+def test_unknown_token_is_cached_as_a_miss(replicated):
+    cache = TokenCache()
+    users = UserRepository(replicated, token_cache=cache)
+
+    assert users.get_by_token("unknown-token") is None
+    assert users.get_by_token("unknown-token") is None
+    assert cache.negative_hits == 1
+
+
+def test_unavailable_replica_fails_over_to_the_primary(tmp_path):
+    database = ReplicatedDatabase(SQLiteDatabase(str(tmp_path / "primary.db")), [_DownReplica()], health_interval=0)
+    start_request_routing()
+    try:
+        with database.get_read_connection():
+            pass
+        with database.get_read_connection():
+            pass
+
+        stats = database.stats()
+        assert database.primary_reads == 2
+        assert database.failovers == 1  # skipped while out of rotation
+        assert stats["replica0_up"] == 0
+        assert stats["replica0_failures"] == 1
+    finally:
+        database.close()
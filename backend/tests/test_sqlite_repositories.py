@@ -0,0 +1,52 @@
+from db import ProgressUpdate
+
+
+def test_upsert_progress_inserts_then_updates_only_given_fields(users, progress):
+    user = users.create("T00001-ABC", name="A")
+
+    row = progress.upsert_progress(user.id, 7, progress_percent=40, total_answered=10, total_correct=5)
+    assert (row.progress_percent, row.total_answered, row.total_correct) == (40, 10, 5)
+    assert row.correct_rate == 50.0
+
+    row = progress.upsert_progress(user.id, 7, total_answered=20, total_correct=15)
+    assert (row.progress_percent, row.total_answered, row.total_correct) == (40, 20, 15)
+    assert row.correct_rate == 75.0
+    assert len(progress.get_for_user(user.id)) == 1
+
+
+def test_upsert_progress_without_fetch_returns_none(users, progress):
+    user = users.create("T00001-ABC")
+
+    assert progress.upsert_progress(user.id, 1, progress_percent=10, fetch=False) is None
+    assert progress.get_for_user(user.id, course_id=1)[0].progress_percent == 10
+
+
+def test_upsert_many_matches_single_row_semantics(users, progress):
+    user = users.create("T00001-ABC")
+    progress.upsert_progress(user.id, 1, progress_percent=30, total_answered=4, total_correct=2)
+
+    progress.upsert_many([
+        ProgressUpdate(user_id=user.id, course_id=1, progress_percent=60),
+        ProgressUpdate(user_id=user.id, course_id=2, total_answered=8, total_correct=8),
+    ])
+
+    rows = {row.course_id: row for row in progress.get_for_user(user.id)}
+    assert (rows[1].progress_percent, rows[1].total_answered, rows[1].total_correct) == (60, 4, 2)
+    assert (rows[2].total_answered, rows[2].correct_rate) == (8, 100.0)
+
+
+def test_bulk_create_skips_existing_codes(users):
+    users.create("T00001-ABC")
+
+    assert users.bulk_create(["T00001-ABC", "T00002-DEF", "T00003-123"]) == 2
+    assert users.bulk_create(["T00002-DEF"]) == 0
+    assert users.get_by_code("T00003-123") is not None
+
+
+def test_login_with_code_creates_once_and_rotates_token(users):
+    first = users.login_with_code("T00001-ABC", "token-1")
+    second = users.login_with_code("T00001-ABC", "token-2")
+
+    assert first.id == second.id
+    assert users.get_by_token("token-2").id == first.id
+    assert users.get_by_token("token-1") is None
@@ -0,0 +1,160 @@
+"""In-process cache for token -> user lookups.
+
+Every authenticated request resolves its Bearer token through
+``UserRepository.get_by_token``. The answer almost never changes between
+requests, so it is kept here in a bounded LRU with per-entry deadlines:
+
+- Positive entries live until ``min(token_expires_at, now + ttl)``.
+- Unknown/expired tokens are cached as negative entries for ``negative_ttl``.
+- ``invalidate_user`` drops whatever token is cached for a user; it is called
+  by ``UserRepository.update_token`` when a token is rotated.
+
+The cache is per process. With several workers, a rotated token may keep
+resolving in other workers for at most ``ttl`` seconds.
+
+Configuration (see ``TokenCache.from_env``):
+- TOKEN_CACHE_SIZE (default: 10000 entries; 0 disables the cache)
+- TOKEN_CACHE_TTL (default: 60 seconds)
+- TOKEN_CACHE_NEGATIVE_TTL (default: 5 seconds)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+# Returned by ``TokenCache.get`` when the token is not cached at all
+# (as opposed to a cached negative entry, which is returned as None).
+MISSING: Any = object()
+
+
+class TokenCache:
+    """Bounded, thread-safe LRU cache with expiry-aware TTLs."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0, negative_ttl: float = 5.0) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        # token -> (user or None, monotonic deadline)
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # user_id -> token, so token rotation can invalidate by user
+        self._by_user: Dict[int, str] = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["TokenCache"]:
+        """Build a cache from TOKEN_CACHE_* variables, or None if disabled."""
+
+        maxsize = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+        if maxsize <= 0:
+            return None
+        return cls(
+            maxsize=maxsize,
+            ttl=float(os.getenv("TOKEN_CACHE_TTL", "60")),
+            negative_ttl=float(os.getenv("TOKEN_CACHE_NEGATIVE_TTL", "5")),
+        )
+
+    def get(self, token: str) -> Any:
+        """Return the cached user, None for a cached negative entry, or MISSING."""
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            user, deadline = entry
+            if deadline <= now:
+                self._remove(token)
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(token)
+            if user is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return user
+
+    def put(self, token: str, user: Any) -> None:
+        """Cache a resolved user until its token expires or the TTL elapses."""
+
+        ttl = self._ttl
+        expires_at: Optional[datetime] = getattr(user, "token_expires_at", None)
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.now()).total_seconds())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._store(token, user, time.monotonic() + ttl)
+            previous = self._by_user.get(user.id)
+            if previous is not None and previous != token:
+                self._remove(previous)
+            self._by_user[user.id] = token
+
+    def put_missing(self, token: str) -> None:
+        """Cache the fact that a token does not resolve to a user."""
+
+        if self._negative_ttl <= 0:
+            return
+        with self._lock:
+            self._store(token, None, time.monotonic() + self._negative_ttl)
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._remove(token)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            token = self._by_user.get(user_id)
+            if token is not None:
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self._maxsize,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self._hit_ratio(),
+            }
+
+    # Callers must hold self._lock for the helpers below.
+
+    def _hit_ratio(self) -> float:
+        lookups = self.hits + self.negative_hits + self.misses
+        return (self.hits + self.negative_hits) / lookups if lookups else 0.0
+
+    def _store(self, token: str, user: Any, deadline: float) -> None:
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = (user, deadline)
+        while len(self._entries) > self._maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user = entry[0]
+        if user is not None and self._by_user.get(user.id) == token:
+            del self._by_user[user.id]
@@ -0,0 +1,24 @@
+"""Request payload validation helpers shared by the API front-ends."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+
+def parse_optional_int(
+    payload: Dict[str, Any], name: str, minimum: int = 0, maximum: Optional[int] = None
+) -> Optional[int]:
+    """Read an optional integer field, raising ValueError with an API message."""
+
+    value = payload.get(name)
+    if value is None:
+        return None
+    try:
+        int_value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer")
+    if int_value < minimum:
+        raise ValueError(f"'{name}' must be >= {minimum}")
+    if maximum is not None and int_value > maximum:
+        raise ValueError(f"'{name}' must be <= {maximum}")
+    return int_value
@@ -0,0 +1,128 @@
+"""Startup warm-up and readiness reporting.
+
+``Warmup`` runs a list of named steps (open database connections, load
+content, preload caches, ...) once at startup, times each one and logs the
+breakdown, e.g.::
+
+    startup: imports 412.3ms, services 8.1ms, db 21.7ms (2 connections),
+    content 64.0ms (12 chapters, 40 courses), ... total 531.0ms
+
+``/readyz`` reports ``status()``: a worker only takes traffic once its
+warm-up has succeeded, so a rolling deploy never sends requests to a cold
+process. A failed warm-up (say, the database is not reachable yet) is
+retried in the background every ``retry_interval`` seconds.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A step returns an optional detail for the log line, e.g. "2 connections"
+Step = Tuple[str, Callable[[], Optional[str]]]
+
+
+class Warmup:
+    """Runs warm-up steps in order and keeps their timings."""
+
+    def __init__(
+        self,
+        steps: Optional[List[Step]] = None,
+        retry_interval: float = 5.0,
+        log: Optional[logging.Logger] = None,
+    ) -> None:
+        self.steps: List[Step] = list(steps or [])
+        self._log = log or logger
+        self._retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "pending"  # pending -> running -> ready | failed
+        self.attempts = 0
+        self.error: Optional[str] = None
+        # Phases timed before warm-up began (imports, building services)
+        self.startup: Dict[str, float] = {}
+        self.timings: Dict[str, float] = {}
+        self.details: Dict[str, str] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Add a startup phase that ran outside the warm-up steps."""
+
+        self.startup[phase] = seconds
+
+    def mark_ready(self) -> None:
+        """Skip warm-up (WARMUP=off): report ready straight away."""
+
+        self.state = "ready"
+
+    def run(self) -> bool:
+        """Run every step once; return True if all succeeded."""
+
+        with self._lock:
+            self.state = "running"
+            self.attempts += 1
+            self.timings = {}
+            self.details = {}
+            for name, step in self.steps:
+                started = time.perf_counter()
+                try:
+                    detail = step()
+                except Exception as exc:
+                    self.timings[name] = time.perf_counter() - started
+                    self.state = "failed"
+                    self.error = f"{name}: {exc}"
+                    self._log.warning("Warm-up step %r failed (attempt %d): %s", name, self.attempts, exc)
+                    return False
+                self.timings[name] = time.perf_counter() - started
+                if detail:
+                    self.details[name] = detail
+            self.state = "ready"
+            self.error = None
+        self._log.info("startup: %s", self.summary())
+        return True
+
+    def start_background(self) -> None:
+        """Keep running the steps in a thread until they succeed."""
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run_until_ready, name="warmup", daemon=True)
+            self._thread.start()
+
+    def _run_until_ready(self) -> None:
+        while not self.run():
+            if self._stop.wait(self._retry_interval):
+                return
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def summary(self) -> str:
+        parts = []
+        for name, seconds in list(self.startup.items()) + list(self.timings.items()):
+            detail = self.details.get(name)
+            parts.append(f"{name} {seconds * 1000:.1f}ms" + (f" ({detail})" if detail else ""))
+        total = sum(self.startup.values()) + sum(self.timings.values())
+        return ", ".join(parts + [f"total {total * 1000:.1f}ms"])
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": self.state,
+            "attempts": self.attempts,
+            "error": self.error,
+            "phases_ms": {
+                name: round(seconds * 1000, 1)
+                for name, seconds in list(self.startup.items()) + list(self.timings.items())
+            },
+            "details": dict(self.details),
+        }
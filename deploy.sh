@@ -10,8 +10,11 @@
 PROJECT_NAME="exammaster-trial"
 BUILD_DIR="dist"
 
+echo "Building practice content..."
+npm run build:content || exit 1
+
 echo "Building..."
-npm run build
+VITE_PRACTICE_MANIFEST=/content/manifest.json npm run build
 
 # echo "Copying functions into build..."
 # cp -r functions $BUILD_DIR
@@ -16,6 +16,7 @@ export default function Practice() {
   const userAnswers = useLessonStore((state) => state.userAnswers);
   const setUserAnswer = useLessonStore((state) => state.setUserAnswer);
   const submitPractice = useLessonStore((state) => state.submitPractice);
+  const gradePracticeOnServer = useLessonStore((state) => state.gradePracticeOnServer);
   const practiceHistory = useLessonStore((state) => state.practiceHistory);
 
   const [currentParagraphIndex, setCurrentParagraphIndex] = useState(0);
@@ -91,15 +92,38 @@ export default function Practice() {
     }
   };
 
-  const handleSubmit = () => {
+  const showResult = (correctCount, totalCount) => {
+    setResultData({
+      correctCount,
+      totalCount,
+      rate: Math.round((correctCount / totalCount) * 100),
+      paragraphTitle: currentParagraph.title,
+    });
+    setShowResultDialog(true);
+  };
+
+  const handleSubmit = async () => {
     if (!currentParagraph) return;
 
+    if (currentPractice.serverGraded) {
+      // Graded by the backend, which also records the course progress
+      try {
+        const graded = await gradePracticeOnServer(practiceId, currentParagraph.id);
+        if (!graded) return;
+        setSubmitted(true);
+        showResult(graded.correctCount, graded.totalCount);
+      } catch (err) {
+        // eslint-disable-next-line no-console
+        console.warn('Failed to submit practice', err);
+      }
+      return;
+    }
+
     const correctCount = currentParagraph.questions.reduce((count, question) => {
       return userAnswers[question.id] === question.correctAnswer ? count + 1 : count;
     }, 0);
 
     const totalCount = currentParagraph.questions.length;
-    const rate = Math.round((correctCount / totalCount) * 100);
 
     submitPractice(currentParagraph.id);
     setSubmitted(true);
@@ -113,14 +137,8 @@ export default function Practice() {
         totalCorrect: correctCount,
       });
     }
-    
-    setResultData({
-      correctCount,
-      totalCount,
-      rate,
-      paragraphTitle: currentParagraph.title,
-    });
-    setShowResultDialog(true);
+
+    showResult(correctCount, totalCount);
   };
 
   const handleCloseDialog = () => {
@@ -186,24 +204,31 @@ export default function Practice() {
           {/* Passage */}
           <div className="mb-8">
             
-            <div className="prose prose-sm max-w-none text-gray-700 leading-relaxed">
-              <ReactMarkdown
-                rehypePlugins={[[rehypeRaw]]}
-                components={{
-                  h1: ({ node, ...props }) => <h1 className="text-2xl font-bold my-3" {...props} />,
-                  h2: ({ node, ...props }) => <h2 className="text-xl font-bold my-2" {...props} />,
-                  h3: ({ node, ...props }) => <h3 className="text-lg font-bold my-2" {...props} />,
-                  p: ({ node, ...props }) => <p className="my-2" {...props} />,
-                  ul: ({ node, ...props }) => <ul className="list-disc list-inside my-2" {...props} />,
-                  ol: ({ node, ...props }) => <ol className="list-decimal list-inside my-2" {...props} />,
-                  li: ({ node, ...props }) => <li className="my-1" {...props} />,
-                  strong: ({ node, ...props }) => <strong className="font-bold" {...props} />,
-                  em: ({ node, ...props }) => <em className="italic" {...props} />,
-                }}
-              >
-                {currentParagraph.passage}
-              </ReactMarkdown>
-            </div>
+            {currentParagraph.passageHtml ? (
+              <div
+                className="prose prose-sm max-w-none text-gray-700 leading-relaxed"
+                dangerouslySetInnerHTML={{ __html: currentParagraph.passageHtml }}
+              />
+            ) : (
+              <div className="prose prose-sm max-w-none text-gray-700 leading-relaxed">
+                <ReactMarkdown
+                  rehypePlugins={[[rehypeRaw]]}
+                  components={{
+                    h1: ({ node, ...props }) => <h1 className="text-2xl font-bold my-3" {...props} />,
+                    h2: ({ node, ...props }) => <h2 className="text-xl font-bold my-2" {...props} />,
+                    h3: ({ node, ...props }) => <h3 className="text-lg font-bold my-2" {...props} />,
+                    p: ({ node, ...props }) => <p className="my-2" {...props} />,
+                    ul: ({ node, ...props }) => <ul className="list-disc list-inside my-2" {...props} />,
+                    ol: ({ node, ...props }) => <ol className="list-decimal list-inside my-2" {...props} />,
+                    li: ({ node, ...props }) => <li className="my-1" {...props} />,
+                    strong: ({ node, ...props }) => <strong className="font-bold" {...props} />,
+                    em: ({ node, ...props }) => <em className="italic" {...props} />,
+                  }}
+                >
+                  {currentParagraph.passage}
+                </ReactMarkdown>
+              </div>
+            )}
           </div>
 
           {/* Questions */}
@@ -1,7 +1,61 @@
 import { create } from 'zustand';
-import { fetchCourseProgressForUser } from '../utils/progressApi';
+import { fetchCourseProgressForUser, submitPracticeAnswers, PRACTICE_ENDPOINT } from '../utils/progressApi';
 
-export const useLessonStore = create((set) => ({
+// Practice chapters are served by the backend when VITE_PRACTICE_ENDPOINT is set
+// (e.g. http://127.0.0.1:8000/api/practice). Otherwise, with VITE_PRACTICE_MANIFEST
+// (e.g. /content/manifest.json, see backend/content_build.py) the prebuilt hashed
+// bundles are used, falling back to the raw /practice/<id>.json files.
+const PRACTICE_MANIFEST = import.meta.env.VITE_PRACTICE_MANIFEST;
+let practiceManifest = null;
+
+async function loadPracticeManifest() {
+  if (!practiceManifest) {
+    practiceManifest = fetch(PRACTICE_MANIFEST)
+      .then(response => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  const manifest = await practiceManifest;
+  if (!manifest) practiceManifest = null; // retry on the next chapter
+  return manifest;
+}
+
+async function practiceUrl(chapterId) {
+  if (PRACTICE_ENDPOINT) return `${PRACTICE_ENDPOINT}/${chapterId}`;
+  if (PRACTICE_MANIFEST) {
+    const entry = (await loadPracticeManifest())?.chapters?.[chapterId];
+    if (entry) return new URL(entry.file, new URL(PRACTICE_MANIFEST, window.location.href)).href;
+  }
+  return `/practice/${chapterId}.json`;
+}
+
+// Course catalog API (e.g. http://127.0.0.1:8000/api/courses); falls back to /courses.json.
+const COURSES_ENDPOINT = import.meta.env.VITE_COURSES_ENDPOINT;
+
+async function fetchCatalog() {
+  if (!COURSES_ENDPOINT) {
+    const response = await fetch('/courses.json');
+    if (!response.ok) throw new Error('Failed to fetch courses');
+    return response.json();
+  }
+
+  // Follow next_cursor until every page has been loaded
+  let meta = null;
+  const courses = [];
+  let cursor = null;
+  do {
+    const params = new URLSearchParams({ limit: '500' });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${COURSES_ENDPOINT}?${params}`);
+    if (!response.ok) throw new Error('Failed to fetch courses');
+    const page = await response.json();
+    meta = page.meta ?? meta;
+    courses.push(...(page.courses || []));
+    cursor = page.next_cursor;
+  } while (cursor);
+  return { meta, courses };
+}
+
+export const useLessonStore = create((set, get) => ({
   lessons: [],
   courseMeta: null, // { title, grade }
   currentLesson: null,
@@ -18,9 +72,7 @@ export const useLessonStore = create((set) => ({
       set({ loading: true, error: null });
       (async () => {
         try {
-          const response = await fetch('/courses.json');
-          if (!response.ok) throw new Error('Failed to fetch courses');
-          const payload = await response.json();
+          const payload = await fetchCatalog();
           const meta = payload?.meta || null;
           const courses = Array.isArray(payload?.courses) ? payload.courses : [];
           set({ lessons: courses, courseMeta: meta, loading: false });
@@ -85,6 +137,52 @@ export const useLessonStore = create((set) => ({
     });
   },
 
+  // Grade a paragraph on the backend (used when the chapter was served without
+  // answer keys). Reveals the correct answers and records the practice history.
+  gradePracticeOnServer: async (chapterId, paragraphId) => {
+    const state = get();
+    const paragraph = state.currentPractice?.paragraphs.find(p => p.id === paragraphId);
+    if (!paragraph) return null;
+
+    const answers = {};
+    paragraph.questions.forEach(question => {
+      const index = state.userAnswers[question.id];
+      if (index !== undefined && question.options[index]) {
+        answers[question.id] = question.options[index].id;
+      }
+    });
+
+    const data = await submitPracticeAnswers({ chapterId, practiceId: paragraphId, answers });
+    const correctById = {};
+    data.results.forEach(result => {
+      correctById[result.question_id] = result.correct_option_id;
+    });
+
+    set((current) => {
+      const practice = current.currentPractice;
+      const paragraphs = practice.paragraphs.map(p => (p.id !== paragraphId ? p : {
+        ...p,
+        questions: p.questions.map(q => ({
+          ...q,
+          correctAnswer: q.options.findIndex(opt => opt.id === correctById[q.id]),
+        })),
+      }));
+      const updated = { ...practice, paragraphs };
+      return {
+        currentPractice: updated,
+        practiceData: updated,
+        practiceHistory: {
+          ...current.practiceHistory,
+          [paragraphId]: {
+            rate: Math.round(data.correct_rate),
+            timestamp: new Date().toISOString(),
+          },
+        },
+      };
+    });
+    return { correctCount: data.total_correct, totalCount: data.total_answered };
+  },
+
   resetAnswers: () => {
     set({ userAnswers: {} });
   },
@@ -92,20 +190,26 @@ export const useLessonStore = create((set) => ({
   fetchPractice: async (chapterId) => {
     set({ loading: true, error: null });
     try {
-      const response = await fetch(`/practice/${chapterId}.json`);
+      const response = await fetch(await practiceUrl(chapterId));
       if (!response.ok) {
         throw new Error(`Practice file for chapter ${chapterId} not found`);
       }
       const practiceJson = await response.json();
       
+      // Without answer keys the backend grades submissions (see gradePracticeOnServer)
+      const serverGraded = practiceJson.practices.some(practice =>
+        practice.questions.some(q => q.correctAnswerId === undefined));
+
       // Transform the practice JSON to match the expected format
       const transformedPractice = {
         id: `practice-${chapterId}`,
+        serverGraded,
         title: practiceJson.practices[0]?.title || 'Practice',
         paragraphs: practiceJson.practices.map(practice => ({
           id: practice.practiceId,
           title: practice.title,
           passage: practice.passage || '',
+          passageHtml: practice.passageHtml, // pre-rendered, sanitized at build time
           questions: practice.questions.map(q => ({
             id: q.id,
             text: q.text,
@@ -120,3 +120,35 @@ export async function fetchCourseProgressForUser(userId) {
 
   return data.items || [];
 }
+
+// Practice API base (e.g. http://127.0.0.1:8000/api/practice), shared with lessonStore.
+export const PRACTICE_ENDPOINT = import.meta.env.VITE_PRACTICE_ENDPOINT;
+
+/**
+ * Submit answers for one practice paragraph and let the backend grade them.
+ * The backend also records totalAnswered/totalCorrect for the course.
+ *
+ * @param {Object} params
+ * @param {string|number} params.chapterId  Practice chapter id (= course id)
+ * @param {string} params.practiceId        Paragraph id, e.g. "practice-001"
+ * @param {Object} params.answers           question id -> chosen option id
+ * @returns {Promise<Object>} { results, total_answered, total_correct, correct_rate, progress }
+ */
+export async function submitPracticeAnswers({ chapterId, practiceId, answers }) {
+  const res = await fetch(`${PRACTICE_ENDPOINT}/${chapterId}/submit`, {
+    method: 'POST',
+    headers: getHeaders(),
+    body: JSON.stringify({ practice_id: practiceId, answers }),
+  });
+  const data = await res.json().catch(() => ({}));
+
+  if (data.message === 'Invalid or expired token') {
+    clearAuthData();
+    window.location.href = '/';
+    throw new Error('Token expired. Please log in again.');
+  }
+  if (!res.ok || !data.success) {
+    throw new Error(data.message || 'Failed to submit practice');
+  }
+  return data;
+}